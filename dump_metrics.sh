@@ -22,7 +22,14 @@ sqlite3 -header -csv "$DB_FILE" "
         m.arrows_remaining,
         m.action_generation_errors,
         m.average_response_time,
-        m.total_response_time
+        m.total_response_time,
+        m.strategy_id,
+        m.prompt_tokens,
+        m.cached_prompt_tokens,
+        m.completion_tokens,
+        m.fast_path_actions,
+        m.prompt_version,
+        m.model
     FROM game_metrics m
     ORDER BY m.timestamp DESC;
 " > "$OUTPUT_FILE"
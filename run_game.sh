@@ -6,4 +6,7 @@ export OPENAI_API_KEY="sk-no-key-required"
 # model name from the llamafile with OpenAI compatible endpoint
 export LITELLM_MODEL="openai/mistral-7b-instruct-v0.2.Q4_0.gguf"
 
+# set WUMPUS_ENGINE="builtin" to play against the in-process engine instead
+# of the wumpus binary (optionally with WUMPUS_SEED for a fixed cave layout)
+
 python src/main.py
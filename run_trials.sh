@@ -1,19 +1,22 @@
 #!/usr/bin/env bash
 
-NUM_TRIALS=30
+NUM_TRIALS=${NUM_TRIALS:-30}
+NUM_WORKERS=${NUM_WORKERS:-4}
 STRATEGY_ID=$1
 
 if [ -z "$STRATEGY_ID" ]; then
-    echo "Usage: ./run_trials.sh"
+    echo "Usage: ./run_trials.sh <strategy_id>"
     exit 1
 fi
 
-echo "Running $NUM_TRIALS trials"
+export OPENAI_API_BASE="http://localhost:8080/v1"
+export OPENAI_API_KEY="sk-no-key-required"
 
-for i in $(seq 1 $NUM_TRIALS); do
-    echo -e "\nTrial $i of $NUM_TRIALS"
-    ./run_game.sh
-    sleep 2  # short delay between trials
-done
+# model name from the llamafile with OpenAI compatible endpoint
+export LITELLM_MODEL="openai/mistral-7b-instruct-v0.2.Q4_0.gguf"
+
+echo "Running $NUM_TRIALS trials with $NUM_WORKERS workers"
+
+python src/main.py --trials "$NUM_TRIALS" --workers "$NUM_WORKERS" --strategy-id "$STRATEGY_ID"
 
 echo -e "\n* Completed $NUM_TRIALS trials."
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from game_handler import WumpusGameState
+from game_knowledge import mask_rooms
+
+logger = logging.getLogger(__name__)
+
+# number of disk writes between eviction passes
+EVICT_INTERVAL = 100
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters of an ActionCache."""
+
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    memory_entries: int
+    disk_entries: int
+
+    @property
+    def lookups(self) -> int:
+        return self.memory_hits + self.disk_hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return (self.memory_hits + self.disk_hits) / self.lookups if self.lookups else 0.0
+
+
+def state_fingerprint(
+    game_state: WumpusGameState, arrow_paths: Optional[Dict[int, List[int]]] = None
+) -> str:
+    """
+    Canonical representation of the decision-relevant parts of a game state.
+
+    Two states with the same fingerprint produce the same action prompt apart
+    from the raw game output, so their actions can be shared.
+
+    Args:
+        game_state: State the action is generated for
+        arrow_paths: Arrow paths to the possible Wumpus rooms shown in the
+            prompt, which come from the knowledge base rather than the state
+    """
+    return json.dumps(
+        [
+            game_state.current_room,
+            sorted(game_state.adjacent),
+            game_state.bat_nearby,
+            game_state.draft_felt,
+            game_state.wumpus_smell,
+            mask_rooms(game_state.explored_mask),
+            game_state.arrows_left,
+            sorted((arrow_paths or {}).items()),
+        ],
+        separators=(",", ":"),
+    )
+
+
+class ActionCache:
+    """
+    Two-tier cache of generated actions keyed on normalized game state.
+
+    Lookups go to an in-memory LRU first, then to an optional SQLite file
+    that persists across runs. The disk tier is bounded by entry count and
+    entry age, evicting the least recently used entries first.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        memory_size: int = 1024,
+        max_entries: int = 100_000,
+        max_age: Optional[float] = None,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            db_path: Path to the SQLite file of the disk tier, memory only if None
+            memory_size: Maximum number of entries in the in-memory LRU
+            max_entries: Maximum number of entries kept on disk
+            max_age: Maximum age of disk entries in seconds, unlimited if None
+        """
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._puts_since_evict = 0
+
+        self.conn = None
+        if db_path:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS action_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_action_cache_last_used
+                ON action_cache(last_used)
+            """)
+            self.conn.commit()
+            self._evict()
+
+    @staticmethod
+    def make_key(
+        game_state: WumpusGameState,
+        prompt_version: str,
+        model: Optional[str],
+        arrow_paths: Optional[Dict[int, List[int]]] = None,
+    ) -> str:
+        """
+        Build the cache key for a game state under a given prompt and model.
+
+        Args:
+            game_state: State the action is generated for
+            prompt_version: Version of the prompt template
+            model: Name of the model generating the action
+            arrow_paths: Arrow paths shown in the prompt, see state_fingerprint
+
+        Returns:
+            Hex digest identifying the state, prompt and model
+        """
+        fingerprint = state_fingerprint(game_state, arrow_paths)
+        material = f"{prompt_version}\n{model}\n{fingerprint}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                return value
+
+            if self.conn is not None:
+                row = self.conn.execute(
+                    "SELECT value, created_at FROM action_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and not self._expired(row[1]):
+                    self.conn.execute(
+                        "UPDATE action_cache SET last_used = ? WHERE key = ?",
+                        (time.time(), key),
+                    )
+                    self.conn.commit()
+                    self._remember(key, row[0])
+                    self._disk_hits += 1
+                    return row[0]
+
+            self._misses += 1
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        """Store value under key in both tiers."""
+        with self._lock:
+            self._remember(key, value)
+
+            if self.conn is not None:
+                now = time.time()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO action_cache (key, value, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, value, now, now),
+                )
+                self.conn.commit()
+
+                # eviction scans the table, so only run it every so often
+                self._puts_since_evict += 1
+                if self._puts_since_evict >= EVICT_INTERVAL:
+                    self._evict()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            disk_entries = 0
+            if self.conn is not None:
+                disk_entries = self.conn.execute("SELECT COUNT(*) FROM action_cache").fetchone()[0]
+            return CacheStats(
+                memory_hits=self._memory_hits,
+                disk_hits=self._disk_hits,
+                misses=self._misses,
+                memory_entries=len(self._memory),
+                disk_entries=disk_entries,
+            )
+
+    def close(self) -> None:
+        """Close the disk tier."""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def _remember(self, key: str, value: str) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _expired(self, created_at: float) -> bool:
+        return self.max_age is not None and created_at < time.time() - self.max_age
+
+    def _evict(self) -> None:
+        """Drop expired entries and trim the disk tier to max_entries."""
+        self._puts_since_evict = 0
+        if self.max_age is not None:
+            self.conn.execute(
+                "DELETE FROM action_cache WHERE created_at < ?", (time.time() - self.max_age,)
+            )
+        self.conn.execute(
+            """
+            DELETE FROM action_cache WHERE key IN (
+                SELECT key FROM action_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        """,
+            (self.max_entries,),
+        )
+        self.conn.commit()
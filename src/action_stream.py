@@ -0,0 +1,151 @@
+import json
+from typing import Any, Dict, Optional, Tuple
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+class PartialActionParser:
+    """
+    Incrementally parses the action JSON object of a streamed completion.
+
+    Text is fed as it arrives; every member of the object is decoded once it
+    is complete, so action and room are known long before the reasoning ends.
+    Parsing resumes at the first incomplete member, so each feed only looks
+    at the new text and the member still being streamed.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        # key of the member being streamed and the position of its value
+        self.pending_key: Optional[str] = None
+        self.complete = False
+        self._pos: Optional[int] = None
+        self._value_start: Optional[int] = None
+
+    def feed(self, text: str) -> None:
+        """Append streamed text and decode the members it completes."""
+        if self.complete or not text:
+            return
+        self.text += text
+        if self._pos is None:
+            # skip anything before the object, e.g. a code fence
+            start = self.text.find("{")
+            if start < 0:
+                return
+            self._pos = start + 1
+        while not self.complete and self._parse_member():
+            pass
+
+    def _parse_member(self) -> bool:
+        """Decode the next member, returning False if it is still incomplete."""
+        text = self.text
+        pos = self._skip(self._pos)
+        if pos >= len(text):
+            return False
+        if text[pos] == "}":
+            self.complete = True
+            self.pending_key = None
+            return False
+        if text[pos] == ",":
+            pos = self._skip(pos + 1)
+        try:
+            key, pos = _DECODER.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            return False
+        pos = self._skip(pos)
+        if pos >= len(text) or text[pos] != ":":
+            return False
+        value_start = self._skip(pos + 1)
+        self.pending_key = key
+        self._value_start = value_start
+        try:
+            value, end = _DECODER.raw_decode(text, value_start)
+        except json.JSONDecodeError:
+            return False
+        # a number at the end of the text may still be growing
+        if end >= len(text) and not isinstance(value, (str, list, dict)):
+            return False
+        self.fields[key] = value
+        self.pending_key = None
+        self._value_start = None
+        self._pos = end
+        return True
+
+    def _skip(self, pos: int) -> int:
+        while pos < len(self.text) and self.text[pos] in _WHITESPACE:
+            pos += 1
+        return pos
+
+    def partial_string(self, key: str) -> Optional[str]:
+        """
+        Value of a string member, or as much of it as has been streamed.
+
+        Returns:
+            The string, or None if the member has not started
+        """
+        if key in self.fields:
+            value = self.fields[key]
+            return value if isinstance(value, str) else None
+        if key != self.pending_key or self._value_start is None:
+            return None
+        raw = self.text[self._value_start :]
+        if not raw.startswith('"'):
+            return None
+        raw = raw[1:]
+        try:
+            return json.loads('"' + raw + '"')
+        except json.JSONDecodeError:
+            pass
+        # drop an escape sequence cut off mid-way
+        try:
+            return json.loads('"' + raw[: raw.rfind("\\")] + '"')
+        except json.JSONDecodeError:
+            return raw
+
+    def decision(self, final: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        The action fields once they can no longer change.
+
+        Moves are decided once action and room are complete; shoot actions
+        also wait for the arrow path or the end of the object, since the
+        path may follow the reasoning unless the key order is constrained.
+
+        Args:
+            final: The stream has ended, so a shoot without a path is
+                decided as it stands
+
+        Returns:
+            Dict with "action", "room" and, for shoot actions, "path",
+            or None if undecided
+        """
+        action = self.fields.get("action")
+        room = self.fields.get("room")
+        if action is None or room is None:
+            return None
+        decision = {"action": action, "room": room}
+        if action == "shoot":
+            if "path" in self.fields:
+                decision["path"] = self.fields["path"]
+            elif not (self.complete or final):
+                return None
+        return decision
+
+
+def chunk_content(chunk) -> Tuple[str, Any]:
+    """
+    Text delta and usage of one streamed chat completion chunk.
+
+    Accepts the OpenAI chunk objects yielded by litellm as well as dicts.
+
+    Returns:
+        Tuple of (text, usage or None)
+    """
+    if isinstance(chunk, dict):
+        choices = chunk.get("choices") or []
+        delta = (choices[0].get("delta") or {}) if choices else {}
+        return delta.get("content") or "", chunk.get("usage")
+    choices = getattr(chunk, "choices", None) or []
+    delta = getattr(choices[0], "delta", None) if choices else None
+    return getattr(delta, "content", None) or "", getattr(chunk, "usage", None)
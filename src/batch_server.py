@@ -0,0 +1,220 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+# seconds between checks for a shutdown request while waiting for connections
+ACCEPT_TIMEOUT = 0.5
+SHUTDOWN_COMMAND = "shutdown"
+
+
+class BatchServer:
+    """
+    Runs game jobs received as JSON lines, one reply line per job.
+
+    A job is a JSON object such as {"id": "a", "seed": 3, "strategy_id": "s"};
+    the handler plays it and returns a dict of results, which is sent back
+    with the job's "id". Jobs run on a bounded pool of worker threads, so the
+    handler's shared state (LLM client, database, game pool) stays warm
+    between games. {"command": "shutdown"} stops the server once the jobs
+    already received are done.
+    """
+
+    def __init__(self, handler: Callable[[dict], dict], workers: int = 1) -> None:
+        """
+        Initialize the server.
+
+        Args:
+            handler: Function playing one job and returning its results
+            workers: Number of jobs run at once
+        """
+        self.handler = handler
+        self.jobs = 0
+        self.failures = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def submit(self, job: dict) -> Future:
+        """Queue a job, returning a future of its reply."""
+        return self._executor.submit(self._run, job)
+
+    def _run(self, job: dict) -> dict:
+        try:
+            reply = dict(self.handler(job))
+        except Exception as e:
+            logger.error("* Job %s failed: %s", job.get("id"), str(e))
+            reply = {"error": str(e)}
+        with self._lock:
+            self.jobs += 1
+            if "error" in reply:
+                self.failures += 1
+        if "id" in job:
+            reply["id"] = job["id"]
+        return reply
+
+    def _handle_lines(self, lines, write: Callable[[dict], None]) -> None:
+        """Submit the jobs read from lines, writing each reply as it finishes."""
+        pending: List[Future] = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+                if not isinstance(job, dict):
+                    raise ValueError("job must be a JSON object")
+            except ValueError as e:
+                write({"error": f"invalid job: {e}"})
+                continue
+            if job.get("command") == SHUTDOWN_COMMAND:
+                self._stopped.set()
+                break
+            # the worker writes the reply, so waiting for the jobs also waits
+            # for their replies to be sent
+            pending.append(self._executor.submit(self._reply, job, write))
+        wait(pending)
+
+    def _reply(self, job: dict, write: Callable[[dict], None]) -> None:
+        write(self._run(job))
+
+    def serve_stream(self, infile: TextIO, outfile: TextIO) -> None:
+        """
+        Run the jobs read from infile until end of file or a shutdown command.
+
+        Args:
+            infile: Stream of job lines, e.g. stdin
+            outfile: Stream the reply lines are written to
+        """
+        lock = threading.Lock()
+
+        def write(reply: dict) -> None:
+            with lock:
+                outfile.write(json.dumps(reply) + "\n")
+                outfile.flush()
+
+        self._handle_lines(infile, write)
+
+    def serve_socket(self, path: str, ready: Optional[threading.Event] = None) -> None:
+        """
+        Accept job connections on a Unix socket until a shutdown command.
+
+        Each connection sends job lines and receives one reply line per job,
+        in the order the jobs finish; the server closes the connection once
+        the client has shut down writing and all its jobs are done.
+
+        Args:
+            path: Path of the socket, replaced if it exists
+            ready: Event set once the socket accepts connections
+        """
+        if os.path.exists(path):
+            os.unlink(path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(path)
+        listener.listen()
+        listener.settimeout(ACCEPT_TIMEOUT)
+        logger.info("* Accepting game jobs on %s", path)
+        if ready is not None:
+            ready.set()
+        connections = []
+        try:
+            while not self._stopped.is_set():
+                try:
+                    conn, _ = listener.accept()
+                except socket.timeout:
+                    continue
+                conn.settimeout(None)
+                thread = threading.Thread(target=self._serve_connection, args=(conn,), daemon=True)
+                thread.start()
+                connections.append(thread)
+        finally:
+            listener.close()
+            os.unlink(path)
+        for thread in connections:
+            thread.join()
+
+    def _serve_connection(self, conn: socket.socket) -> None:
+        lock = threading.Lock()
+        with conn, conn.makefile("r", encoding="utf-8") as infile:
+
+            def write(reply: dict) -> None:
+                with lock:
+                    try:
+                        conn.sendall((json.dumps(reply) + "\n").encode("utf-8"))
+                    except OSError:
+                        logger.warning(
+                            "* Client disconnected before job %s finished", reply.get("id")
+                        )
+
+            self._handle_lines(infile, write)
+
+    def shutdown(self) -> None:
+        """Stop accepting connections; jobs already received still finish."""
+        self._stopped.set()
+
+    def close(self) -> None:
+        """Wait for running jobs and stop the workers."""
+        self._stopped.set()
+        self._executor.shutdown(wait=True)
+
+
+def submit_jobs(path: str, jobs: List[dict]) -> List[dict]:
+    """
+    Send jobs to a BatchServer listening on a Unix socket and wait for them.
+
+    Args:
+        path: Path of the server's socket
+        jobs: Jobs to run
+
+    Returns:
+        One reply per job, in the order the jobs finished
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        payload = "".join(json.dumps(job) + "\n" for job in jobs)
+        sock.sendall(payload.encode("utf-8"))
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile("r", encoding="utf-8") as replies:
+            return [json.loads(line) for line in replies if line.strip()]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Submit games to an agent started with main.py --serve SOCKET"
+    )
+    parser.add_argument("socket", help="path of the server's Unix socket")
+    parser.add_argument("--games", type=int, default=1, help="number of games to play")
+    parser.add_argument("--seed", type=int, default=None, help="base seed for the builtin engine")
+    parser.add_argument("--strategy-id", default=None, help="strategy identifier of the games")
+    parser.add_argument(
+        "--shutdown", action="store_true", help="stop the server after the games are done"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    jobs = []
+    for game in range(args.games):
+        job = {"id": game}
+        if args.seed is not None:
+            job["seed"] = args.seed + game
+        if args.strategy_id is not None:
+            job["strategy_id"] = args.strategy_id
+        jobs.append(job)
+    for reply in submit_jobs(args.socket, jobs):
+        print(json.dumps(reply))
+    if args.shutdown:
+        submit_jobs(args.socket, [{"command": SHUTDOWN_COMMAND}])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    main()
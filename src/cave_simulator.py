@@ -0,0 +1,540 @@
+import abc
+import argparse
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from game_db import GameMetrics, WumpusDB
+from game_engine import CAVE, NUM_ARROWS, NUM_ROOMS
+from game_knowledge import MAX_ARROW_ROOMS, CaveKnowledge
+
+logger = logging.getLogger(__name__)
+
+# tunnels of every room (0-indexed) and the same as a boolean adjacency matrix
+TUNNELS = np.array(CAVE, dtype=np.int64)
+ADJACENT = np.zeros((NUM_ROOMS, NUM_ROOMS), dtype=bool)
+ADJACENT[np.repeat(np.arange(NUM_ROOMS), 3), TUNNELS.ravel()] = True
+
+# how a game ended
+PLAYING, WON, PIT, WUMPUS, OUT_OF_ARROWS, OWN_ARROW, TURN_LIMIT = range(7)
+OUTCOMES = ("playing", "won", "pit", "wumpus", "out_of_arrows", "own_arrow", "turn_limit")
+
+
+def _arrow_paths() -> Tuple[np.ndarray, np.ndarray]:
+    """Shortest arrow path and distance between every pair of rooms of the cave."""
+    knowledge = CaveKnowledge()
+    for room, tunnels in enumerate(CAVE):
+        knowledge.observe(room + 1, [t + 1 for t in tunnels], False, False, False)
+    paths = np.full((NUM_ROOMS, NUM_ROOMS, MAX_ARROW_ROOMS), -1, dtype=np.int64)
+    distances = np.zeros((NUM_ROOMS, NUM_ROOMS), dtype=np.int64)
+    for a in range(NUM_ROOMS):
+        for b in range(NUM_ROOMS):
+            distances[a, b] = knowledge.distance(a + 1, b + 1)
+            path = knowledge.arrow_path(a + 1, b + 1)
+            if path:
+                paths[a, b, : len(path)] = [room - 1 for room in path]
+    return paths, distances
+
+
+ARROW_PATHS, DISTANCES = _arrow_paths()
+
+
+class BatchCaveEnv:
+    """
+    Many Hunt the Wumpus games stepped at once with NumPy.
+
+    Follows the rules of WumpusGameEngine (dodecahedron cave, two pits, two
+    bat colonies, a Wumpus that wakes on misses and bumps, crooked arrows of
+    up to five rooms) with one array entry per game, so one step resolves
+    the moves and shots of every game in a handful of vectorized operations.
+    Rooms are 0-indexed. Games that have ended ignore further actions.
+    """
+
+    def __init__(self, num_games: int, seed: Optional[int] = None, max_turns: int = 100) -> None:
+        """
+        Place the hazards of every game.
+
+        Args:
+            num_games: Number of games played at once
+            seed: Seed for cave setups and hazard behaviour
+            max_turns: Turns after which a game still going is ended
+        """
+        self.num_games = num_games
+        self.max_turns = max_turns
+        self.rng = np.random.default_rng(seed)
+        n = num_games
+
+        # the player and every hazard start in distinct rooms
+        locations = np.argsort(self.rng.random((n, NUM_ROOMS)), axis=1)[:, :6]
+        self.player = locations[:, 0].copy()
+        self.wumpus = locations[:, 1].copy()
+        self.pits = locations[:, 2:4].copy()
+        self.bats = locations[:, 4:6].copy()
+
+        self.arrows = np.full(n, NUM_ARROWS, dtype=np.int64)
+        self.turns = np.zeros(n, dtype=np.int64)
+        self.outcome = np.full(n, PLAYING, dtype=np.int64)
+        # rooms moved into, as WumpusGameState.explored_rooms
+        self.explored = np.zeros((n, NUM_ROOMS), dtype=bool)
+        # whether the Wumpus woke up during the last step
+        self.woke = np.zeros(n, dtype=bool)
+        self.smell = np.zeros(n, dtype=bool)
+        self.draft = np.zeros(n, dtype=bool)
+        self.bats_nearby = np.zeros(n, dtype=bool)
+        self._percepts()
+
+    @property
+    def done(self) -> np.ndarray:
+        return self.outcome != PLAYING
+
+    def _percepts(self) -> None:
+        """Report the hazards next to each player, as WumpusGameEngine._describe_room."""
+        tunnels = TUNNELS[self.player]
+        wumpus = tunnels == self.wumpus[:, None]
+        pit = (tunnels[:, :, None] == self.pits[:, None, :]).any(axis=2) & ~wumpus
+        bats = (tunnels[:, :, None] == self.bats[:, None, :]).any(axis=2) & ~wumpus & ~pit
+        self.smell = wumpus.any(axis=1)
+        self.draft = pit.any(axis=1)
+        self.bats_nearby = bats.any(axis=1)
+
+    def _end(self, games: np.ndarray, outcome: int) -> None:
+        self.outcome[games] = outcome
+
+    def _wake_wumpus(self, games: np.ndarray) -> None:
+        """The Wumpus moves to a random tunnel 3 times out of 4 and may eat the player."""
+        if not games.size:
+            return
+        self.woke[games] = True
+        k = self.rng.integers(0, 4, games.size)
+        moves = k < 3
+        self.wumpus[games[moves]] = TUNNELS[self.wumpus[games[moves]], k[moves]]
+        eaten = games[self.wumpus[games] == self.player[games]]
+        self._end(eaten, WUMPUS)
+
+    def _enter_rooms(self, games: np.ndarray) -> None:
+        """Resolve the hazards in the players' rooms, following bat snatches."""
+        while games.size:
+            bumped = games[self.player[games] == self.wumpus[games]]
+            self._wake_wumpus(bumped)
+            games = games[self.outcome[games] == PLAYING]
+            fell = (self.pits[games] == self.player[games, None]).any(axis=1)
+            self._end(games[fell], PIT)
+            games = games[~fell]
+            snatched = (self.bats[games] == self.player[games, None]).any(axis=1)
+            games = games[snatched]
+            self.player[games] = self.rng.integers(0, NUM_ROOMS, games.size)
+
+    def _shoot(self, games: np.ndarray, paths: np.ndarray) -> None:
+        """Fly an arrow through each game's path; -1 marks the end of a path."""
+        arrow = self.player[games].copy()
+        # last two rooms accepted into the path; doubling back is rejected
+        last = np.full(games.size, -1)
+        before_last = np.full(games.size, -1)
+        accepted = np.zeros(games.size, dtype=np.int64)
+        flying = np.ones(games.size, dtype=bool)
+        for step in range(MAX_ARROW_ROOMS):
+            target = paths[:, step]
+            valid = flying & (target >= 0) & ~((accepted >= 2) & (target == before_last))
+            before_last = np.where(valid, last, before_last)
+            last = np.where(valid, target, last)
+            accepted += valid
+            # without a tunnel to the requested room the arrow goes astray
+            tunnel = (TUNNELS[arrow] == target[:, None]).any(axis=1)
+            astray = TUNNELS[arrow, self.rng.integers(0, 3, games.size)]
+            arrow = np.where(valid, np.where(tunnel, target, astray), arrow)
+            hit = valid & (arrow == self.wumpus[games])
+            own = valid & ~hit & (arrow == self.player[games])
+            self._end(games[hit], WON)
+            self._end(games[own], OWN_ARROW)
+            flying &= ~(hit | own)
+
+        self.arrows[games] -= 1
+        missed = games[flying]
+        self._wake_wumpus(missed)
+        missed = missed[self.outcome[missed] == PLAYING]
+        self._end(missed[self.arrows[missed] <= 0], OUT_OF_ARROWS)
+
+    def step(self, shoot: np.ndarray, targets: np.ndarray) -> None:
+        """
+        Play one turn of every game still going.
+
+        Args:
+            shoot: Bool array, True to shoot and False to move
+            targets: Int array (games, 5) of 0-indexed rooms; a move goes to
+                the first room, a shot flies through the rooms up to the
+                first -1
+        """
+        self.woke[:] = False
+        playing = self.outcome == PLAYING
+        self.turns[playing] += 1
+
+        movers = np.flatnonzero(playing & ~shoot)
+        target = targets[movers, 0]
+        # a move without a tunnel to the room is refused, as by the game
+        possible = (TUNNELS[self.player[movers]] == target[:, None]).any(axis=1)
+        possible |= target == self.player[movers]
+        movers = movers[possible]
+        self.player[movers] = target[possible]
+        self.explored[movers, target[possible]] = True
+        self._enter_rooms(movers)
+
+        shooters = np.flatnonzero(playing & shoot)
+        if shooters.size:
+            self._shoot(shooters, targets[shooters])
+
+        out_of_turns = (self.outcome == PLAYING) & (self.turns >= self.max_turns)
+        self._end(np.flatnonzero(out_of_turns), TURN_LIMIT)
+        self._percepts()
+
+    def run(self, policy: "BatchPolicy") -> None:
+        """Play every game to its end with a policy."""
+        policy.reset(self)
+        while not self.done.all():
+            shoot, targets = policy.act(self)
+            self.step(shoot, targets)
+
+    def game_metrics(
+        self, strategy_id: str, timestamp: Optional[datetime] = None
+    ) -> List[GameMetrics]:
+        """
+        Outcome of every game as game_metrics rows, with the LLM columns empty.
+
+        Args:
+            strategy_id: Strategy identifier stored with the games
+            timestamp: Start time recorded for the games, now by default
+
+        Returns:
+            One GameMetrics per game
+        """
+        timestamp = timestamp or datetime.now()
+        rows = zip(
+            self.turns.tolist(),
+            self.explored.sum(axis=1).tolist(),
+            self.outcome.tolist(),
+            self.arrows.tolist(),
+        )
+        return [
+            GameMetrics(
+                timestamp=timestamp,
+                num_turns=turns,
+                rooms_explored=explored,
+                death_by_pit=outcome == PIT,
+                death_by_wumpus=outcome == WUMPUS,
+                death_by_arrows=outcome == OUT_OF_ARROWS,
+                game_won=outcome == WON,
+                arrows_remaining=arrows,
+                action_generation_errors=0,
+                average_response_time=0.0,
+                total_response_time=0.0,
+                strategy_id=strategy_id,
+                game_uuid=uuid.uuid4().hex,
+                model="simulator",
+            )
+            for turns, explored, outcome, arrows in rows
+        ]
+
+
+class Beliefs:
+    """
+    What each game's agent has learned from its percepts, as boolean room
+    arrays of shape (games, rooms); the batch counterpart of CaveKnowledge.
+    """
+
+    def __init__(self, num_games: int) -> None:
+        shape = (num_games, NUM_ROOMS)
+        self.visited = np.zeros(shape, dtype=bool)
+        self.no_pit = np.zeros(shape, dtype=bool)
+        self.no_wumpus = np.zeros(shape, dtype=bool)
+        self.no_bats = np.zeros(shape, dtype=bool)
+        self.draft_rooms = np.zeros(shape, dtype=bool)
+        self.smell_rooms = np.zeros(shape, dtype=bool)
+        self.bat_rooms = np.zeros(shape, dtype=bool)
+
+    def observe(self, env: BatchCaveEnv) -> None:
+        """Add the percepts of every player's current room."""
+        games = np.arange(env.num_games)
+        # the Wumpus may have moved, so where it is not is no longer known
+        self.smell_rooms[env.woke] = False
+        self.no_wumpus[env.woke] = False
+
+        room = env.player
+        near = ADJACENT[room]
+        for known in (self.visited, self.no_pit, self.no_wumpus, self.no_bats):
+            known[games, room] = True
+        self.draft_rooms[games, room] |= env.draft
+        self.smell_rooms[games, room] |= env.smell
+        self.bat_rooms[games, room] |= env.bats_nearby
+        self.no_wumpus |= near & ~env.smell[:, None]
+        # as in CaveKnowledge.observe, a room that may hold the Wumpus may
+        # also hold a pit or bats, whose percept the smell replaces
+        hidden = near & ~self.no_wumpus
+        self.no_pit |= near & ~env.draft[:, None] & ~hidden
+        self.no_bats |= near & ~env.bats_nearby[:, None] & ~hidden
+
+    @staticmethod
+    def _hazard_probability(
+        percept_rooms: np.ndarray, ruled_out: np.ndarray, count: int
+    ) -> np.ndarray:
+        """
+        Approximate chance of each room holding one of count hazards.
+
+        A room next to a percept gets 1 / (suspects next to that percept),
+        the highest over its percept rooms; other rooms not ruled out share
+        the prior of the hazards not explained by a percept.
+        """
+        open_rooms = ~ruled_out
+        suspects = open_rooms.astype(np.int64) @ ADJACENT.T
+        share = np.where(percept_rooms & (suspects > 0), 1.0 / np.maximum(suspects, 1), 0.0)
+        near_percept = (share[:, :, None] * ADJACENT[None]).max(axis=1)
+        unexplained = np.clip(count - percept_rooms.sum(axis=1), 0, count)
+        elsewhere = open_rooms & (near_percept == 0)
+        prior = unexplained / np.maximum(elsewhere.sum(axis=1), 1)
+        return np.where(open_rooms, np.maximum(near_percept, elsewhere * prior[:, None]), 0.0)
+
+    def pit_probability(self) -> np.ndarray:
+        return self._hazard_probability(self.draft_rooms, self.no_pit, 2)
+
+    def bat_probability(self) -> np.ndarray:
+        return self._hazard_probability(self.bat_rooms, self.no_bats, 2)
+
+    def wumpus_probability(self) -> np.ndarray:
+        """Uniform over the rooms next to every smell since the Wumpus last moved."""
+        smells = self.smell_rooms.sum(axis=1)
+        next_to_all = (self.smell_rooms.astype(np.int64) @ ADJACENT) == smells[:, None]
+        candidates = ~self.no_wumpus & next_to_all
+        return candidates / np.maximum(candidates.sum(axis=1, keepdims=True), 1)
+
+
+class BatchPolicy(abc.ABC):
+    """Chooses the actions of every game of a BatchCaveEnv at once."""
+
+    name = "policy"
+
+    def reset(self, env: BatchCaveEnv) -> None:
+        self.rng = np.random.default_rng(env.rng.integers(2**32))
+
+    @abc.abstractmethod
+    def act(self, env: BatchCaveEnv) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            Tuple of (shoot flags, target rooms) as taken by BatchCaveEnv.step
+        """
+
+    def _pick(self, scores: np.ndarray) -> np.ndarray:
+        """Index of the highest score per row, ties broken at random."""
+        noise = self.rng.random(scores.shape) * 1e-6
+        return np.argmax(scores + noise, axis=1)
+
+    @staticmethod
+    def _actions(
+        env: BatchCaveEnv, shoot: np.ndarray, move_to: np.ndarray, shot_paths: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        targets = np.where(shoot[:, None], shot_paths, -1)
+        targets[~shoot, 0] = move_to[~shoot]
+        return shoot, targets
+
+
+class RandomWalkPolicy(BatchPolicy):
+    """Moves through a random tunnel; shoots into a random tunnel when the Wumpus is smelled."""
+
+    name = "random_walk"
+
+    def act(self, env: BatchCaveEnv) -> Tuple[np.ndarray, np.ndarray]:
+        tunnels = TUNNELS[env.player]
+        choice = tunnels[np.arange(env.num_games), self.rng.integers(0, 3, env.num_games)]
+        shoot = env.smell & (env.arrows > 0)
+        paths = np.full((env.num_games, MAX_ARROW_ROOMS), -1)
+        paths[:, 0] = choice
+        return self._actions(env, shoot, choice, paths)
+
+
+class CautiousPolicy(BatchPolicy):
+    """
+    The planner's rules without the LLM: shoot once the Wumpus's room is
+    certain, otherwise prefer unvisited rooms proven safe, then safe rooms,
+    then unvisited rooms not suspected of a pit or the Wumpus, then any
+    unsuspected room (the fast path and the fallback policy). Ties are
+    broken at random so the agent does not pace between two rooms.
+    """
+
+    name = "cautious"
+
+    def reset(self, env: BatchCaveEnv) -> None:
+        super().reset(env)
+        self.beliefs = Beliefs(env.num_games)
+
+    def act(self, env: BatchCaveEnv) -> Tuple[np.ndarray, np.ndarray]:
+        beliefs = self.beliefs
+        beliefs.observe(env)
+        games = np.arange(env.num_games)
+        tunnels = TUNNELS[env.player]
+
+        p_wumpus = beliefs.wumpus_probability()
+        wumpus_room = p_wumpus.argmax(axis=1)
+        certain = beliefs.smell_rooms.any(axis=1) & (p_wumpus.max(axis=1) == 1.0)
+        paths = ARROW_PATHS[env.player, wumpus_room]
+        shoot = certain & (env.arrows > 0) & (paths[:, 0] >= 0)
+
+        safe = (beliefs.no_pit & beliefs.no_wumpus & beliefs.no_bats)[games[:, None], tunnels]
+        unvisited = ~beliefs.visited[games[:, None], tunnels]
+        suspects = (beliefs.pit_probability() > 0) & ~beliefs.no_pit
+        suspects |= (p_wumpus > 0) & beliefs.smell_rooms.any(axis=1, keepdims=True)
+        unsuspected = ~suspects[games[:, None], tunnels]
+        scores = (
+            8.0 * (safe & unvisited) + 4.0 * safe + 2.0 * (unsuspected & unvisited) + unsuspected
+        )
+        move_to = tunnels[games, self._pick(scores)]
+        return self._actions(env, shoot, move_to, paths)
+
+
+class BeliefPolicy(BatchPolicy):
+    """
+    Acts on approximate hazard probabilities from every percept so far, as
+    a baseline for the best a percept-limited agent can do.
+
+    Shoots along the shortest arrow path at the most likely Wumpus room once
+    it holds the Wumpus with at least shoot_threshold probability, otherwise
+    moves through the tunnel with the lowest risk of a pit or the Wumpus,
+    with a small penalty for bats and a bonus for unvisited rooms.
+    """
+
+    name = "belief"
+
+    def __init__(
+        self, shoot_threshold: float = 0.5, bat_risk: float = 0.1, explore_bonus: float = 0.05
+    ) -> None:
+        self.shoot_threshold = shoot_threshold
+        self.bat_risk = bat_risk
+        self.explore_bonus = explore_bonus
+
+    def reset(self, env: BatchCaveEnv) -> None:
+        super().reset(env)
+        self.beliefs = Beliefs(env.num_games)
+
+    def act(self, env: BatchCaveEnv) -> Tuple[np.ndarray, np.ndarray]:
+        beliefs = self.beliefs
+        beliefs.observe(env)
+        games = np.arange(env.num_games)
+        tunnels = TUNNELS[env.player]
+
+        p_wumpus = beliefs.wumpus_probability()
+        wumpus_room = self._pick(p_wumpus)
+        paths = ARROW_PATHS[env.player, wumpus_room]
+        shoot = (
+            beliefs.smell_rooms.any(axis=1)
+            & (p_wumpus[games, wumpus_room] >= self.shoot_threshold)
+            & (env.arrows > 0)
+            & (paths[:, 0] >= 0)
+        )
+
+        risk = beliefs.pit_probability() + p_wumpus + self.bat_risk * beliefs.bat_probability()
+        risk = risk - self.explore_bonus * ~beliefs.visited
+        move_to = tunnels[games, self._pick(-risk[games[:, None], tunnels])]
+        return self._actions(env, shoot, move_to, paths)
+
+
+POLICIES = {policy.name: policy for policy in (RandomWalkPolicy, CautiousPolicy, BeliefPolicy)}
+
+
+@dataclass
+class SimulationResult:
+    """Outcome distribution of one policy over a batch of caves."""
+
+    policy: str
+    games: int
+    wall_time: float
+    outcomes: Dict[str, float]
+    mean_turns: float
+
+    @property
+    def win_rate(self) -> float:
+        return self.outcomes["won"]
+
+    @property
+    def games_per_second(self) -> float:
+        return self.games / self.wall_time if self.wall_time else 0.0
+
+
+def simulate(
+    policy: BatchPolicy, num_games: int, seed: Optional[int] = None, max_turns: int = 100
+) -> Tuple[BatchCaveEnv, SimulationResult]:
+    """
+    Play a batch of games with a policy.
+
+    Args:
+        policy: Policy choosing every game's actions
+        num_games: Number of cave setups played
+        seed: Seed for the cave setups, hazards and the policy's tie breaks
+        max_turns: Turns after which a game is ended as a loss
+
+    Returns:
+        Tuple of (the finished environment, summary of the outcomes)
+    """
+    start = time.perf_counter()
+    env = BatchCaveEnv(num_games, seed=seed, max_turns=max_turns)
+    env.run(policy)
+    wall_time = time.perf_counter() - start
+    counts = np.bincount(env.outcome, minlength=len(OUTCOMES))
+    result = SimulationResult(
+        policy=policy.name,
+        games=num_games,
+        wall_time=wall_time,
+        outcomes={name: counts[i] / num_games for i, name in enumerate(OUTCOMES) if i != PLAYING},
+        mean_turns=float(env.turns.mean()),
+    )
+    return env, result
+
+
+def format_results(results: Sequence[SimulationResult]) -> str:
+    names = OUTCOMES[1:]
+    header = f"{'policy':<12} {'games':>7} {'turns':>6} " + " ".join(f"{n:>13}" for n in names)
+    lines = [header + f" {'games/s':>9}"]
+    for r in results:
+        rates = " ".join(f"{r.outcomes[n]:>13.1%}" for n in names)
+        lines.append(
+            f"{r.policy:<12} {r.games:>7} {r.mean_turns:>6.1f} {rates} {r.games_per_second:>9.0f}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Evaluate baseline policies over many simulated cave setups"
+    )
+    parser.add_argument("--games", type=int, default=10_000, help="games per policy")
+    parser.add_argument("--policies", nargs="+", choices=list(POLICIES), default=list(POLICIES))
+    parser.add_argument("--max-turns", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--db",
+        default=None,
+        help="record every game in this metrics database, as strategy baseline:<policy>",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> List[SimulationResult]:
+    args = parse_args(argv)
+    db = WumpusDB(args.db) if args.db else None
+    # every policy plays the same cave setups, so their outcomes are paired
+    seed = args.seed if args.seed is not None else np.random.SeedSequence().entropy
+    logger.info("* Simulating %d games per policy with seed %d", args.games, seed)
+    results = []
+    for name in args.policies:
+        env, result = simulate(POLICIES[name](), args.games, seed=seed, max_turns=args.max_turns)
+        results.append(result)
+        if db:
+            db.add_many_game_metrics(env.game_metrics(f"baseline:{name}"))
+    if db:
+        db.close()
+    print(format_results(results))
+    return results
+
+
+if __name__ == "__main__":
+    main()
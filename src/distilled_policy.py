@@ -0,0 +1,390 @@
+import argparse
+import json
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from game_db import WumpusDB
+from game_knowledge import CaveKnowledge, room_bit
+
+logger = logging.getLogger(__name__)
+
+# per-candidate features; moves and shots get separate weights
+FEATURES = (
+    "shoot",
+    "move_unvisited",
+    "move_safe",
+    "move_possible_pit",
+    "move_known_pit",
+    "move_possible_wumpus",
+    "move_possible_bats",
+    "move_rank",
+    "shoot_smell",
+    "shoot_possible_wumpus",
+    "shoot_wumpus_certain",
+    "shoot_arrows",
+    "shoot_rank",
+)
+_INDEX = {name: i for i, name in enumerate(FEATURES)}
+# three tunnels per room, each either moved through or shot into
+NUM_CANDIDATES = 6
+# decision sources of the turns the policy learns from
+LLM_SOURCES = ("llm", "speculative", "cache")
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95)
+
+
+@dataclass
+class PolicyDecision:
+    """Action proposed by the distilled policy and its probability."""
+
+    action: str
+    room: int
+    confidence: float
+
+
+@dataclass
+class TrainingSet:
+    """Candidate features of logged turns and the index of the action taken."""
+
+    features: np.ndarray  # (turns, NUM_CANDIDATES, len(FEATURES))
+    valid: np.ndarray  # (turns, NUM_CANDIDATES) bool, False for missing tunnels
+    labels: np.ndarray  # (turns,)
+    games: int
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def split(self, holdout: float, seed: int = 0) -> Tuple["TrainingSet", "TrainingSet"]:
+        """Random split into a training and a held-out set."""
+        order = np.random.default_rng(seed).permutation(len(self))
+        cut = len(self) - int(len(self) * holdout)
+        parts = []
+        for index in (order[:cut], order[cut:]):
+            parts.append(
+                TrainingSet(self.features[index], self.valid[index], self.labels[index], self.games)
+            )
+        return parts[0], parts[1]
+
+
+def candidate_features(
+    room: int,
+    adjacent: Sequence[int],
+    wumpus_smell: bool,
+    arrows_left: int,
+    knowledge: CaveKnowledge,
+) -> Tuple[List[Tuple[str, int]], np.ndarray]:
+    """
+    Features of every move and shot from a room.
+
+    Only relations that hold in any cave are used (visited, proven safe,
+    suspected hazards, the tunnel's position among the sorted tunnels), not
+    room numbers, so the policy generalizes across cave layouts.
+
+    Args:
+        room: Room the agent is in
+        adjacent: Rooms the tunnels lead to
+        wumpus_smell: Whether the Wumpus is smelled
+        arrows_left: Arrows remaining
+        knowledge: Knowledge base including the percepts of this room
+
+    Returns:
+        Tuple of (candidate (action, room) pairs, float array of their features)
+    """
+    possible_pits = knowledge.possible_pits()
+    known_pits = knowledge.known_pits()
+    possible_wumpus = knowledge.possible_wumpus() if knowledge.smell_rooms else 0
+    possible_bats = knowledge.possible_bats()
+    wumpus_room = knowledge.wumpus_room()
+    rooms = sorted(adjacent)[: NUM_CANDIDATES // 2]
+    candidates = []
+    features = np.zeros((len(rooms) * 2, len(FEATURES)))
+    for rank, target in enumerate(rooms):
+        bit = room_bit(target)
+        values = {
+            "move_unvisited": not knowledge.is_visited(target),
+            "move_safe": knowledge.is_safe(target),
+            "move_possible_pit": bool(possible_pits & bit),
+            "move_known_pit": bool(known_pits & bit),
+            "move_possible_wumpus": bool(possible_wumpus & bit),
+            "move_possible_bats": bool(possible_bats & bit),
+            "move_rank": rank / 2,
+        }
+        for name, value in values.items():
+            features[2 * rank, _INDEX[name]] = value
+        candidates.append(("move", target))
+        values = {
+            "shoot": 1.0,
+            "shoot_smell": wumpus_smell,
+            "shoot_possible_wumpus": bool(possible_wumpus & bit),
+            "shoot_wumpus_certain": wumpus_room == target,
+            "shoot_arrows": arrows_left / 5,
+            "shoot_rank": rank / 2,
+        }
+        for name, value in values.items():
+            features[2 * rank + 1, _INDEX[name]] = value
+        candidates.append(("shoot", target))
+    return candidates, features
+
+
+class DistilledPolicy:
+    """
+    Softmax policy over the moves and shots of a turn, distilled from logged
+    LLM decisions.
+
+    Each candidate is scored by a linear function of its features and the
+    scores are normalized over the turn's candidates (a conditional logit
+    model), so a decision costs a few microseconds of NumPy instead of an
+    LLM request. The probability of the best candidate is its confidence.
+    """
+
+    def __init__(self, weights: np.ndarray, metadata: Optional[dict] = None) -> None:
+        self.weights = np.asarray(weights, dtype=float)
+        self.metadata = metadata or {}
+
+    def probabilities(self, features: np.ndarray, valid: Optional[np.ndarray] = None) -> np.ndarray:
+        """Candidate probabilities, over the last but one axis of features."""
+        scores = features @ self.weights
+        if valid is not None:
+            scores = np.where(valid, scores, -np.inf)
+        scores = scores - scores.max(axis=-1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def decide(self, game_state, knowledge: CaveKnowledge) -> Optional[PolicyDecision]:
+        """
+        Most probable action in a state.
+
+        Args:
+            game_state: Current WumpusGameState
+            knowledge: The game's knowledge base
+
+        Returns:
+            PolicyDecision, or None without tunnels to choose from
+        """
+        if not game_state.adjacent:
+            return None
+        candidates, features = candidate_features(
+            game_state.current_room,
+            game_state.adjacent,
+            game_state.wumpus_smell,
+            game_state.arrows_left,
+            knowledge,
+        )
+        valid = np.array([a == "move" or game_state.arrows_left > 0 for a, _ in candidates])
+        probabilities = self.probabilities(features, valid)
+        best = int(np.argmax(probabilities))
+        action, room = candidates[best]
+        return PolicyDecision(action, room, float(probabilities[best]))
+
+    def evaluate(self, data: TrainingSet, thresholds: Sequence[float] = THRESHOLDS) -> List[dict]:
+        """
+        Coverage and agreement with the logged actions per confidence threshold.
+
+        Returns:
+            One dict per threshold with the share of turns the policy would
+            answer ("coverage") and how often it agrees with the logged
+            action on those turns ("accuracy")
+        """
+        probabilities = self.probabilities(data.features, data.valid)
+        confidence = probabilities.max(axis=1)
+        correct = probabilities.argmax(axis=1) == data.labels
+        results = []
+        for threshold in thresholds:
+            answered = confidence >= threshold
+            results.append(
+                {
+                    "threshold": threshold,
+                    "coverage": float(answered.mean()) if len(data) else 0.0,
+                    "accuracy": float(correct[answered].mean()) if answered.any() else 0.0,
+                }
+            )
+        return results
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "features": list(FEATURES),
+                    "weights": self.weights.tolist(),
+                    "metadata": self.metadata,
+                },
+                f,
+                indent=2,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "DistilledPolicy":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data["features"] != list(FEATURES):
+            raise ValueError(f"Policy {path} was trained on different features")
+        return cls(np.array(data["weights"]), data.get("metadata"))
+
+
+def load_training_set(
+    db: WumpusDB,
+    won_only: bool = True,
+    strategy_id: Optional[str] = None,
+    sources: Sequence[str] = LLM_SOURCES,
+) -> TrainingSet:
+    """
+    Candidate features and actions of the LLM-decided turns in the database.
+
+    The states recorded in turn_events are replayed in order through a
+    CaveKnowledge per game, forgetting where the Wumpus is not after every
+    shot the game continued past, so the features match what the planner's
+    knowledge base knows when it asks the policy.
+
+    Args:
+        db: Database with turn_events and game_metrics
+        won_only: Only learn from games that were won
+        strategy_id: Only learn from games of this strategy
+        sources: Decision sources of the turns to learn from
+
+    Returns:
+        TrainingSet of the turns whose action is one of the candidates
+    """
+    query = """
+        SELECT t.game_uuid, t.action, t.room, t.state_before, t.decision_source
+        FROM turn_events t JOIN game_metrics g ON g.game_uuid = t.game_uuid
+        WHERE t.action IS NOT NULL
+    """
+    params: list = []
+    if won_only:
+        query += " AND g.game_won = 1"
+    if strategy_id is not None:
+        query += " AND g.strategy_id = ?"
+        params.append(strategy_id)
+    query += " ORDER BY t.game_uuid, t.turn"
+
+    features, valid, labels = [], [], []
+    knowledge: Dict[str, CaveKnowledge] = defaultdict(CaveKnowledge)
+    # games whose last replayed turn was a shot
+    shot: Dict[str, bool] = {}
+    for game_uuid, action, room, state_json, source in db.conn.execute(query, params):
+        state = json.loads(state_json)
+        if not state["adjacent"]:
+            continue
+        game_knowledge = knowledge[game_uuid]
+        if shot.get(game_uuid):
+            # a shot the game went on after missed and woke the Wumpus, as
+            # WumpusGameInterface reports before the next room's percepts
+            game_knowledge.wumpus_moved()
+        shot[game_uuid] = action == "shoot"
+        game_knowledge.observe(
+            state["room"], state["adjacent"], state["draft"], state["smell"], state["bats"]
+        )
+        if source not in sources:
+            continue
+        candidates, rows = candidate_features(
+            state["room"], state["adjacent"], state["smell"], state["arrows"], game_knowledge
+        )
+        if (action, room) not in candidates:
+            continue
+        padded = np.zeros((NUM_CANDIDATES, len(FEATURES)))
+        padded[: len(candidates)] = rows
+        mask = np.zeros(NUM_CANDIDATES, dtype=bool)
+        mask[: len(candidates)] = [a == "move" or state["arrows"] > 0 for a, _ in candidates]
+        features.append(padded)
+        valid.append(mask)
+        labels.append(candidates.index((action, room)))
+
+    return TrainingSet(
+        np.array(features).reshape(-1, NUM_CANDIDATES, len(FEATURES)),
+        np.array(valid, dtype=bool).reshape(-1, NUM_CANDIDATES),
+        np.array(labels, dtype=int),
+        games=len(knowledge),
+    )
+
+
+def train_policy(
+    data: TrainingSet,
+    epochs: int = 500,
+    learning_rate: float = 0.5,
+    l2: float = 1e-3,
+) -> DistilledPolicy:
+    """
+    Fit the policy's weights by gradient descent on the log-likelihood of
+    the logged actions.
+
+    Args:
+        data: TrainingSet to fit
+        epochs: Number of full-batch gradient steps
+        learning_rate: Step size
+        l2: L2 penalty on the weights
+
+    Returns:
+        Trained DistilledPolicy
+    """
+    if not len(data):
+        raise ValueError("No logged LLM decisions to train on")
+    policy = DistilledPolicy(np.zeros(len(FEATURES)))
+    chosen = data.features[np.arange(len(data)), data.labels]
+    for _ in range(epochs):
+        probabilities = policy.probabilities(data.features, data.valid)
+        expected = np.einsum("nc,ncf->nf", probabilities, data.features)
+        gradient = (expected - chosen).mean(axis=0) + l2 * policy.weights
+        policy.weights -= learning_rate * gradient
+    probabilities = policy.probabilities(data.features, data.valid)
+    log_likelihood = np.log(probabilities[np.arange(len(data)), data.labels] + 1e-12).mean()
+    policy.metadata = {
+        "games": data.games,
+        "turns": len(data),
+        "log_likelihood": float(log_likelihood),
+    }
+    return policy
+
+
+def format_evaluation(results: Sequence[dict]) -> str:
+    lines = [f"{'threshold':>9} {'coverage':>9} {'accuracy':>9}"]
+    for r in results:
+        lines.append(f"{r['threshold']:>9.2f} {r['coverage']:>9.1%} {r['accuracy']:>9.1%}")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Train a local policy from the LLM decisions in the metrics database"
+    )
+    parser.add_argument("--db", default="wumpus_metrics.db", help="path to the metrics database")
+    parser.add_argument("--out", default="policy.json", help="path to write the policy to")
+    parser.add_argument(
+        "--all-games", action="store_true", help="learn from lost games too, not only won games"
+    )
+    parser.add_argument("--strategy-id", default=None, help="only learn from this strategy")
+    parser.add_argument(
+        "--holdout", type=float, default=0.2, help="share of turns held out for evaluation"
+    )
+    parser.add_argument("--epochs", type=int, default=500)
+    parser.add_argument("--l2", type=float, default=1e-3)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> Optional[DistilledPolicy]:
+    args = parse_args(argv)
+    db = WumpusDB(args.db)
+    data = load_training_set(db, won_only=not args.all_games, strategy_id=args.strategy_id)
+    db.close()
+    if not len(data):
+        print("* No logged LLM decisions to train on")
+        return None
+
+    train, holdout = data.split(args.holdout, seed=args.seed)
+    policy = train_policy(train, epochs=args.epochs, l2=args.l2)
+    print(f"* Trained on {len(train)} turns of {data.games} games")
+    if len(holdout):
+        print(f"* Held-out turns: {len(holdout)}")
+        print(format_evaluation(policy.evaluate(holdout)))
+    # the saved policy is refit on every turn
+    policy = train_policy(data, epochs=args.epochs, l2=args.l2)
+    policy.save(args.out)
+    print(f"* Wrote policy to {args.out}")
+    return policy
+
+
+if __name__ == "__main__":
+    main()
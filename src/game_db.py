@@ -1,10 +1,24 @@
 import logging
+import math
 import sqlite3
-from dataclasses import dataclass
+import threading
+from collections import defaultdict
+from dataclasses import astuple, dataclass, fields
 from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
+# columns game_summary can be grouped by, besides the hour games started in
+SUMMARY_KEYS = ("strategy_id", "prompt_version", "model")
+# length of the "YYYY-MM-DD HH:00" period prefix identifying each time window
+WINDOWS = {"hour": 16, "day": 10, "month": 7}
+# ratio between consecutive response time histogram buckets, so response time
+# percentiles are exact to within about 5%
+LATENCY_BUCKET_RATIO = 1.1
+# histogram bucket of games without a measured response time
+ZERO_LATENCY_BUCKET = -(2**31)
+
 
 @dataclass
 class GameMetrics:
@@ -21,27 +35,157 @@ class GameMetrics:
     action_generation_errors: int
     average_response_time: float
     total_response_time: float
+    strategy_id: Optional[str] = None
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    completion_tokens: int = 0
+    fast_path_actions: int = 0
+    game_uuid: Optional[str] = None
+    prompt_version: Optional[str] = None
+    model: Optional[str] = None
+    speculations: int = 0
+    speculation_hits: int = 0
+    speculation_time_saved: float = 0.0
+    validation_retries: int = 0
+    fallback_actions: int = 0
+    context_compactions: int = 0
+    # seconds from the start of run_game until the game was started
+    setup_time: float = 0.0
+    policy_actions: int = 0
+    llm_calls: int = 0
+    # missed speculations whose LLM request was sent anyway
+    wasted_speculations: int = 0
+
+
+@dataclass
+class TurnEvent:
+    """Represents telemetry of a single turn, linked to its game by game_uuid."""
+
+    game_uuid: str
+    turn: int
+    timestamp: datetime
+    action: Optional[str]
+    room: Optional[int]
+    state_before: str
+    state_after: str
+    decision_source: Optional[str]
+    turn_time: float
+    llm_latency: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    retries: int = 0
+    io_wait: float = 0.0
+    timeouts: int = 0
+    error: Optional[str] = None
+    endpoint: Optional[str] = None
+    decision_latency: float = 0.0
+    cached_tokens: int = 0
+    prompt_ms: Optional[float] = None
+
+
+@dataclass
+class EndpointMetrics:
+    """Represents the LLM requests one game sent to a single endpoint."""
+
+    game_uuid: str
+    endpoint: str
+    requests: int
+    total_latency: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.requests if self.requests else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        """Completion tokens generated per second of request latency."""
+        return self.completion_tokens / self.total_latency if self.total_latency else 0.0
+
+
+@dataclass
+class SummaryRow:
+    """Aggregated results of the games in one group of game_summary."""
+
+    group: Dict[str, Optional[str]]
+    games: int
+    games_won: int
+    death_by_pit: int
+    death_by_wumpus: int
+    death_by_arrows: int
+    total_turns: int
+    total_response_time: float
+
+    @property
+    def win_rate(self) -> float:
+        return self.games_won / self.games if self.games else 0.0
+
+    @property
+    def mean_turns(self) -> float:
+        return self.total_turns / self.games if self.games else 0.0
+
+    @property
+    def mean_response_time(self) -> float:
+        return self.total_response_time / self.games if self.games else 0.0
+
+    def death_rates(self) -> Dict[str, float]:
+        """Fraction of games lost to each cause of death."""
+        return {
+            cause: getattr(self, cause) / self.games if self.games else 0.0
+            for cause in ("death_by_pit", "death_by_wumpus", "death_by_arrows")
+        }
+
+
+def _period(timestamp: Union[datetime, str]) -> str:
+    """Hour a game started in, as "YYYY-MM-DD HH:00"."""
+    return str(timestamp)[:13] + ":00"
+
+
+def _latency_bucket(seconds: float) -> int:
+    if seconds <= 0:
+        return ZERO_LATENCY_BUCKET
+    return math.floor(math.log(seconds, LATENCY_BUCKET_RATIO))
+
+
+def _latency_value(bucket: int) -> float:
+    if bucket == ZERO_LATENCY_BUCKET:
+        return 0.0
+    return LATENCY_BUCKET_RATIO ** (bucket + 0.5)
 
 
 class WumpusDB:
-    def __init__(self, db_path: str = "wumpus_metrics.db") -> None:
+    def __init__(
+        self, db_path: str = "wumpus_metrics.db", turn_flush_threshold: int = 500
+    ) -> None:
         """
         Initialize database connection and ensure schema exists.
 
         Args:
             db_path: Path to the SQLite database file
+            turn_flush_threshold: Number of buffered turn events that triggers
+                a bulk write before the game ends
         """
         self.db_path = db_path
         self.conn = None
+        self.turn_flush_threshold = turn_flush_threshold
+        self._turn_buffer: List[TurnEvent] = []
+        # serializes writes from concurrent trial workers sharing this connection
+        self._lock = threading.Lock()
         # initialize schema on creation
         self._connect()
         self._init_schema()
 
     def _connect(self) -> None:
         """Establish database connection with proper configuration."""
-        self.conn = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+        self.conn = sqlite3.connect(
+            self.db_path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False
+        )
         # enable foreign key constraints
         self.conn.execute("PRAGMA foreign_keys = ON")
+        # WAL lets readers (notebook, dump script) run while games are written
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
 
     def _init_schema(self) -> None:
         """Initialize database schema if it doesn't exist."""
@@ -63,18 +207,186 @@ class WumpusDB:
                 arrows_remaining INTEGER NOT NULL,
                 action_generation_errors INTEGER DEFAULT 0,
                 average_response_time FLOAT,
-                total_response_time FLOAT
+                total_response_time FLOAT,
+                strategy_id TEXT,
+                prompt_tokens INTEGER DEFAULT 0,
+                cached_prompt_tokens INTEGER DEFAULT 0,
+                completion_tokens INTEGER DEFAULT 0,
+                fast_path_actions INTEGER DEFAULT 0,
+                game_uuid TEXT,
+                prompt_version TEXT,
+                model TEXT,
+                speculations INTEGER DEFAULT 0,
+                speculation_hits INTEGER DEFAULT 0,
+                speculation_time_saved FLOAT DEFAULT 0,
+                validation_retries INTEGER DEFAULT 0,
+                fallback_actions INTEGER DEFAULT 0,
+                context_compactions INTEGER DEFAULT 0,
+                setup_time FLOAT DEFAULT 0,
+                policy_actions INTEGER DEFAULT 0,
+                llm_calls INTEGER DEFAULT 0,
+                wasted_speculations INTEGER DEFAULT 0
             )
         """)
 
+        # add columns introduced after the initial schema to existing databases
+        self._ensure_columns(
+            cursor,
+            "game_metrics",
+            {
+                "strategy_id": "TEXT",
+                "prompt_tokens": "INTEGER DEFAULT 0",
+                "cached_prompt_tokens": "INTEGER DEFAULT 0",
+                "completion_tokens": "INTEGER DEFAULT 0",
+                "fast_path_actions": "INTEGER DEFAULT 0",
+                "game_uuid": "TEXT",
+                "prompt_version": "TEXT",
+                "model": "TEXT",
+                "speculations": "INTEGER DEFAULT 0",
+                "speculation_hits": "INTEGER DEFAULT 0",
+                "speculation_time_saved": "FLOAT DEFAULT 0",
+                "validation_retries": "INTEGER DEFAULT 0",
+                "fallback_actions": "INTEGER DEFAULT 0",
+                "context_compactions": "INTEGER DEFAULT 0",
+                "setup_time": "FLOAT DEFAULT 0",
+                "policy_actions": "INTEGER DEFAULT 0",
+                "llm_calls": "INTEGER DEFAULT 0",
+                "wasted_speculations": "INTEGER DEFAULT 0",
+            },
+        )
+
         # create index for commonly queried columns
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_game_metrics_timestamp 
             ON game_metrics(timestamp)
         """)
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_game_metrics_game_uuid
+            ON game_metrics(game_uuid)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_game_metrics_group
+            ON game_metrics(strategy_id, prompt_version, model, timestamp)
+        """)
+
+        # per-turn telemetry, joined to game_metrics on game_uuid; rows may be
+        # flushed before their game's metrics row exists, so no foreign key
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS turn_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                game_uuid TEXT NOT NULL,
+                turn INTEGER NOT NULL,
+                timestamp DATETIME NOT NULL,
+                action TEXT,
+                room INTEGER,
+                state_before TEXT,
+                state_after TEXT,
+                decision_source TEXT,
+                turn_time FLOAT,
+                llm_latency FLOAT DEFAULT 0,
+                prompt_tokens INTEGER DEFAULT 0,
+                completion_tokens INTEGER DEFAULT 0,
+                retries INTEGER DEFAULT 0,
+                io_wait FLOAT DEFAULT 0,
+                timeouts INTEGER DEFAULT 0,
+                error TEXT,
+                endpoint TEXT,
+                decision_latency FLOAT DEFAULT 0,
+                cached_tokens INTEGER DEFAULT 0,
+                prompt_ms FLOAT
+            )
+        """)
+        self._ensure_columns(
+            cursor,
+            "turn_events",
+            {
+                "endpoint": "TEXT",
+                "decision_latency": "FLOAT DEFAULT 0",
+                "cached_tokens": "INTEGER DEFAULT 0",
+                "prompt_ms": "FLOAT",
+            },
+        )
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_turn_events_game_uuid
+            ON turn_events(game_uuid, turn)
+        """)
+
+        # LLM requests per game and endpoint, joined to game_metrics on game_uuid
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS endpoint_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                game_uuid TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                requests INTEGER NOT NULL,
+                total_latency FLOAT NOT NULL,
+                prompt_tokens INTEGER DEFAULT 0,
+                completion_tokens INTEGER DEFAULT 0
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_endpoint_metrics_game_uuid
+            ON endpoint_metrics(game_uuid)
+        """)
+
+        # aggregates per strategy, prompt version, model and hour, updated with
+        # every game; NULL keys are stored as '' so groups can be upserted
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS game_summary (
+                strategy_id TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                period TEXT NOT NULL,
+                games INTEGER NOT NULL,
+                games_won INTEGER NOT NULL,
+                death_by_pit INTEGER NOT NULL,
+                death_by_wumpus INTEGER NOT NULL,
+                death_by_arrows INTEGER NOT NULL,
+                total_turns INTEGER NOT NULL,
+                total_response_time FLOAT NOT NULL,
+                PRIMARY KEY (strategy_id, prompt_version, model, period)
+            )
+        """)
+        # distributions of turns (exact) and response time (log buckets) for
+        # percentile queries
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS game_summary_histogram (
+                strategy_id TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                period TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (strategy_id, prompt_version, model, period, metric, bucket)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_game_summary_period ON game_summary(period)
+        """)
+
+        # databases created before the summary existed are aggregated once
+        has_games = cursor.execute("SELECT 1 FROM game_metrics LIMIT 1").fetchone()
+        has_summary = cursor.execute("SELECT 1 FROM game_summary LIMIT 1").fetchone()
+        if has_games and not has_summary:
+            self._rebuild_summary(cursor)
 
         self.conn.commit()
 
+    def _ensure_columns(self, cursor: sqlite3.Cursor, table: str, columns: dict) -> None:
+        """
+        Add any missing columns to an existing table.
+
+        Args:
+            cursor: Cursor to run the schema changes with
+            table: Name of the table to migrate
+            columns: Mapping of column name to SQL column definition
+        """
+        existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        for name, definition in columns.items():
+            if name not in existing:
+                logger.info("* Adding column %s.%s", table, name)
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
     def __enter__(self):
         """Context manager entry."""
         if self.conn is None:
@@ -85,6 +397,7 @@ class WumpusDB:
         """Context manager exit."""
         if self.conn:
             if exc_type is None:
+                self.flush_turn_events()
                 self.conn.commit()
             else:
                 self.conn.rollback()
@@ -92,47 +405,355 @@ class WumpusDB:
             self.conn = None
 
     def close(self):
-        """Close the database connection."""
+        """Flush buffered turn events and close the database connection."""
         if self.conn:
+            self.flush_turn_events()
             self.conn.close()
             self.conn = None
 
-    def add_game_metrics(self, metrics: GameMetrics) -> None:
+    def add_game_metrics(
+        self, metrics: GameMetrics, endpoints: Sequence[EndpointMetrics] = ()
+    ) -> None:
         """
         Record metrics for a completed game.
 
         Args:
             metrics: GameMetrics object containing the game results
+            endpoints: Requests the game sent to each LLM endpoint
 
         Raises:
             sqlite3.Error: If the database operation fails
         """
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                """
-                INSERT INTO game_metrics (
-                    timestamp, num_turns, rooms_explored,
-                    death_by_pit, death_by_wumpus, death_by_arrows,
-                    game_won, arrows_remaining, action_generation_errors, 
-                    average_response_time, total_response_time
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    metrics.timestamp,
-                    metrics.num_turns,
-                    metrics.rooms_explored,
-                    metrics.death_by_pit,
-                    metrics.death_by_wumpus,
-                    metrics.death_by_arrows,
-                    metrics.game_won,
-                    metrics.arrows_remaining,
-                    metrics.action_generation_errors,
-                    metrics.average_response_time,
-                    metrics.total_response_time,
-                ),
+        with self._lock:
+            try:
+                self._insert_games(self.conn.cursor(), [metrics])
+                if endpoints:
+                    endpoint_columns = [f.name for f in fields(EndpointMetrics)]
+                    self.conn.executemany(
+                        f"INSERT INTO endpoint_metrics ({', '.join(endpoint_columns)}) "
+                        f"VALUES ({', '.join('?' for _ in endpoint_columns)})",
+                        [astuple(endpoint) for endpoint in endpoints],
+                    )
+                # write the game's buffered turns in the same transaction
+                self._write_turn_events()
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+
+    def add_many_game_metrics(self, games: Sequence[GameMetrics]) -> None:
+        """
+        Record the metrics of many games in a single transaction, e.g. the
+        outcomes of simulated baseline policies.
+
+        Args:
+            games: GameMetrics of every game
+
+        Raises:
+            sqlite3.Error: If the database operation fails
+        """
+        with self._lock:
+            try:
+                self._insert_games(self.conn.cursor(), games)
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+
+    def _insert_games(self, cursor: sqlite3.Cursor, games: Sequence[GameMetrics]) -> None:
+        """Insert game_metrics rows and add them to the summary."""
+        columns = [f.name for f in fields(GameMetrics)]
+        cursor.executemany(
+            f"INSERT INTO game_metrics ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})",
+            [astuple(metrics) for metrics in games],
+        )
+        for metrics in games:
+            self._update_summary(
+                cursor,
+                (metrics.strategy_id, metrics.prompt_version, metrics.model, metrics.timestamp),
+                metrics.game_won,
+                metrics.death_by_pit,
+                metrics.death_by_wumpus,
+                metrics.death_by_arrows,
+                metrics.num_turns,
+                metrics.average_response_time,
             )
-            self.conn.commit()
-        except sqlite3.Error:
-            self.conn.rollback()
-            raise
+
+    def record_turn(self, event: TurnEvent) -> None:
+        """
+        Buffer a turn event; buffered events are written in bulk with the game's
+        metrics or once turn_flush_threshold events have accumulated.
+
+        Args:
+            event: TurnEvent of the completed turn
+        """
+        with self._lock:
+            self._turn_buffer.append(event)
+            if len(self._turn_buffer) < self.turn_flush_threshold:
+                return
+            try:
+                self._write_turn_events()
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+
+    def flush_turn_events(self) -> None:
+        """Write all buffered turn events to the database."""
+        with self._lock:
+            if not self._turn_buffer:
+                return
+            try:
+                self._write_turn_events()
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+
+    def _write_turn_events(self) -> None:
+        if not self._turn_buffer:
+            return
+        columns = [f.name for f in fields(TurnEvent)]
+        self.conn.executemany(
+            f"INSERT INTO turn_events ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})",
+            [astuple(event) for event in self._turn_buffer],
+        )
+        self._turn_buffer = []
+
+    def _update_summary(
+        self,
+        cursor: sqlite3.Cursor,
+        group: tuple,
+        game_won: bool,
+        death_by_pit: bool,
+        death_by_wumpus: bool,
+        death_by_arrows: bool,
+        num_turns: int,
+        response_time: Optional[float],
+    ) -> None:
+        """Add one game to its game_summary group and histograms."""
+        strategy_id, prompt_version, model, timestamp = group
+        key = (strategy_id or "", prompt_version or "", model or "", _period(timestamp))
+        response_time = response_time or 0.0
+        cursor.execute(
+            """
+            INSERT INTO game_summary VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (strategy_id, prompt_version, model, period) DO UPDATE SET
+                games = games + 1,
+                games_won = games_won + excluded.games_won,
+                death_by_pit = death_by_pit + excluded.death_by_pit,
+                death_by_wumpus = death_by_wumpus + excluded.death_by_wumpus,
+                death_by_arrows = death_by_arrows + excluded.death_by_arrows,
+                total_turns = total_turns + excluded.total_turns,
+                total_response_time = total_response_time + excluded.total_response_time
+            """,
+            key
+            + (
+                int(bool(game_won)),
+                int(bool(death_by_pit)),
+                int(bool(death_by_wumpus)),
+                int(bool(death_by_arrows)),
+                num_turns,
+                response_time,
+            ),
+        )
+        cursor.executemany(
+            """
+            INSERT INTO game_summary_histogram VALUES (?, ?, ?, ?, ?, ?, 1)
+            ON CONFLICT (strategy_id, prompt_version, model, period, metric, bucket)
+            DO UPDATE SET count = count + 1
+            """,
+            [
+                key + ("turns", num_turns),
+                key + ("response_time", _latency_bucket(response_time)),
+            ],
+        )
+
+    def _rebuild_summary(self, cursor: sqlite3.Cursor) -> None:
+        """Recompute game_summary and its histograms from game_metrics."""
+        logger.info("* Building game summary from existing game metrics")
+        cursor.execute("DELETE FROM game_summary")
+        cursor.execute("DELETE FROM game_summary_histogram")
+        rows = cursor.execute("""
+            SELECT strategy_id, prompt_version, model, timestamp, game_won, death_by_pit,
+                death_by_wumpus, death_by_arrows, num_turns, average_response_time
+            FROM game_metrics
+        """).fetchall()
+        for row in rows:
+            self._update_summary(cursor, row[:4], *row[4:])
+
+    def rebuild_summary(self) -> None:
+        """Recompute the pre-aggregated summary, e.g. after editing game_metrics by hand."""
+        with self._lock:
+            try:
+                self._rebuild_summary(self.conn.cursor())
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+
+    def _summary_query(
+        self,
+        table: str,
+        columns: str,
+        group_by: Sequence[str],
+        window: Optional[str],
+        since: Optional[datetime],
+        until: Optional[datetime],
+        metric: Optional[str] = None,
+    ) -> Tuple[List[str], list]:
+        """Run a grouped aggregate over one of the summary tables."""
+        for key in group_by:
+            if key not in SUMMARY_KEYS:
+                raise ValueError(f"Cannot group by {key}, expected one of {SUMMARY_KEYS}")
+        if window is not None and window not in WINDOWS:
+            raise ValueError(f"Unknown window {window}, expected one of {list(WINDOWS)}")
+
+        keys = [f"NULLIF({key}, '')" for key in group_by]
+        names = list(group_by)
+        if window:
+            keys.append(f"substr(period, 1, {WINDOWS[window]})")
+            names.append("period")
+
+        conditions, params = [], []
+        if metric is not None:
+            conditions.append("metric = ?")
+            params.append(metric)
+        if since is not None:
+            conditions.append("period >= ?")
+            params.append(_period(since))
+        if until is not None:
+            conditions.append("period < ?")
+            params.append(_period(until))
+
+        select = ", ".join(keys + [columns])
+        query = f"SELECT {select} FROM {table}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        grouping = keys + (["bucket"] if metric else [])
+        if grouping:
+            query += f" GROUP BY {', '.join(grouping)} ORDER BY {', '.join(grouping)}"
+        return names, self.conn.execute(query, params).fetchall()
+
+    def endpoint_summary(self, since: Optional[datetime] = None) -> List[EndpointMetrics]:
+        """
+        Requests, latency and tokens per endpoint over all recorded games.
+
+        Args:
+            since: Only include games started at or after this time
+
+        Returns:
+            EndpointMetrics per endpoint, with game_uuid set to "", ordered by endpoint
+        """
+        query = """
+            SELECT '', endpoint, SUM(requests), SUM(total_latency),
+                SUM(prompt_tokens), SUM(completion_tokens)
+            FROM endpoint_metrics
+        """
+        params = []
+        if since is not None:
+            query += """
+                WHERE game_uuid IN (SELECT game_uuid FROM game_metrics WHERE timestamp >= ?)
+            """
+            params.append(since)
+        query += " GROUP BY endpoint ORDER BY endpoint"
+        return [EndpointMetrics(*row) for row in self.conn.execute(query, params)]
+
+    def summary(
+        self,
+        group_by: Sequence[str] = ("strategy_id",),
+        window: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[SummaryRow]:
+        """
+        Win rate, causes of death, turns and response time per group of games.
+
+        Reads the pre-aggregated game_summary table, so the cost does not grow
+        with the number of games played.
+
+        Args:
+            group_by: Any of "strategy_id", "prompt_version" and "model"
+            window: Also group by "hour", "day" or "month" the games started in
+            since: Only include games started in this hour or later
+            until: Only include games started before this hour
+
+        Returns:
+            SummaryRow per group, ordered by group
+        """
+        names, rows = self._summary_query(
+            "game_summary",
+            "SUM(games), SUM(games_won), SUM(death_by_pit), SUM(death_by_wumpus), "
+            "SUM(death_by_arrows), SUM(total_turns), SUM(total_response_time)",
+            group_by,
+            window,
+            since,
+            until,
+        )
+        n = len(names)
+        return [
+            SummaryRow(dict(zip(names, row[:n])), *row[n:])
+            for row in rows
+            if row[n]
+        ]
+
+    def percentiles(
+        self,
+        metric: str = "turns",
+        quantiles: Sequence[float] = (50, 90, 99),
+        group_by: Sequence[str] = ("strategy_id",),
+        window: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[tuple, Dict[float, float]]:
+        """
+        Percentiles of turns per game or average response time per group.
+
+        Turns are exact, response times come from logarithmic histogram buckets
+        and are exact to within about 5%.
+
+        Args:
+            metric: "turns" or "response_time"
+            quantiles: Percentiles to compute, between 0 and 100
+            group_by: Any of "strategy_id", "prompt_version" and "model"
+            window: Also group by "hour", "day" or "month" the games started in
+            since: Only include games started in this hour or later
+            until: Only include games started before this hour
+
+        Returns:
+            Mapping of group key tuple (in group_by order, then period) to a
+            mapping of percentile to value
+        """
+        if metric not in ("turns", "response_time"):
+            raise ValueError(f"Unknown metric {metric}")
+        names, rows = self._summary_query(
+            "game_summary_histogram",
+            "bucket, SUM(count)",
+            group_by,
+            window,
+            since,
+            until,
+            metric=metric,
+        )
+        n = len(names)
+        histograms = defaultdict(list)
+        for row in rows:
+            histograms[tuple(row[:n])].append((row[n], row[n + 1]))
+
+        value = (lambda bucket: float(bucket)) if metric == "turns" else _latency_value
+        result = {}
+        for key, buckets in histograms.items():
+            total = sum(count for _, count in buckets)
+            result[key] = {}
+            for q in quantiles:
+                # nearest-rank percentile over the sorted buckets
+                rank = max(1, math.ceil(q / 100 * total))
+                seen = 0
+                for bucket, count in buckets:
+                    seen += count
+                    if seen >= rank:
+                        result[key][q] = value(bucket)
+                        break
+        return result
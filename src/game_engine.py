@@ -0,0 +1,221 @@
+import logging
+import random
+from typing import List, Optional
+
+from game_handler import GamePrompt, WumpusGameInterface, WumpusGameState, arrow_rooms
+from game_knowledge import CaveKnowledge, room_bit
+
+logger = logging.getLogger(__name__)
+
+# dodecahedron cave layout used by ESR's wumpus (0-indexed, rooms are printed 1-20)
+CAVE = (
+    (1, 4, 7), (0, 2, 9), (1, 3, 11), (2, 4, 13), (0, 3, 5),
+    (4, 6, 14), (5, 7, 16), (0, 6, 8), (7, 9, 17), (1, 8, 10),
+    (9, 11, 18), (2, 10, 12), (11, 13, 19), (3, 12, 14), (5, 13, 15),
+    (14, 16, 19), (6, 15, 17), (8, 16, 18), (10, 17, 19), (12, 15, 18),
+)
+NUM_ROOMS = len(CAVE)
+# tunnels of each room as printed (1-indexed), shared by every game state
+ADJACENT_ROOMS = tuple(tuple(other + 1 for other in rooms) for rooms in CAVE)
+NUM_ARROWS = 5
+
+
+class WumpusGameEngine(WumpusGameInterface):
+    """
+    In-process implementation of ESR's Hunt the Wumpus rules.
+
+    Exposes the same start_game/move/shoot/get_game_state surface as
+    WumpusGameInterface but resolves every command in Python instead of
+    driving the wumpus binary over a pty. Output lines use the binary's
+    wording so downstream code that inspects last_output keeps working.
+    """
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        """
+        Initialize the engine.
+
+        Args:
+            seed: Optional seed for reproducible cave layouts and hazard behaviour
+        """
+        super().__init__(game_cmd=None)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.player = 0
+        self.wumpus = 0
+        self.pits: tuple[int, int] = (0, 0)
+        self.bats: tuple[int, int] = (0, 0)
+
+    def start_game(self) -> None:
+        logger.info("* Starting in-process Wumpus game (seed=%s) ...", self.seed)
+        self.game_state = WumpusGameState()
+        self.knowledge = CaveKnowledge()
+
+        # place the player and every hazard in distinct rooms
+        locations = self.rng.sample(range(NUM_ROOMS), 6)
+        self.player, self.wumpus = locations[0], locations[1]
+        self.pits = (locations[2], locations[3])
+        self.bats = (locations[4], locations[5])
+
+        self._record(None, GamePrompt.INSTRUCTIONS)
+        self._record("N")
+        output: List[str] = []
+        self._describe_room(output)
+        self._finish(output)
+        logger.info("* Game started. Initial state: %s", self.game_state)
+
+    def move(self, room) -> None:
+        logger.info("* Attempting to move to: %s", room)
+        self._record("M", GamePrompt.MOVE_TARGET)
+        self._record(f"{room}")
+        output: List[str] = []
+        target = int(room) - 1
+
+        if target not in CAVE[self.player] and target != self.player:
+            output.append("NOT POSSIBLE -")
+            self._finish(output, GamePrompt.MOVE_TARGET)
+            return
+
+        self.player = target
+        self._enter_room(output)
+        self._finish(output)
+        logger.info("* Move completed. New state: %s", self.game_state)
+        self.game_state.explored_mask |= room_bit(int(room))
+
+    def shoot(self, room) -> None:
+        logger.info("* Attempting to shoot arrow into: %s", room)
+        # paths the binary would ask to correct are rejected before any input
+        rooms = arrow_rooms(room)
+        self._record("S", GamePrompt.ARROW_COUNT)
+        self._record(f"{len(rooms)}", GamePrompt.ARROW_ROOM)
+        for i, target in enumerate(rooms):
+            self._record(f"{target}", GamePrompt.ARROW_ROOM if i < len(rooms) - 1 else None)
+
+        output: List[str] = []
+        path = [target - 1 for target in rooms]
+
+        # follow the arrow; without a tunnel to the requested room it goes astray
+        arrow = self.player
+        hit = False
+        for target in path:
+            arrow = target if target in CAVE[arrow] else self.rng.choice(CAVE[arrow])
+            if arrow == self.wumpus:
+                output.append("AHA! YOU GOT THE WUMPUS!")
+                self._end_game(output, won=True)
+                hit = True
+                break
+            if arrow == self.player:
+                output.append("OUCH! ARROW GOT YOU!")
+                self._end_game(output, won=False)
+                hit = True
+                break
+
+        self.game_state.arrows_left -= 1
+        if not hit:
+            output.append("MISSED")
+            self._move_wumpus(output)
+            if not self.game_state.game_over and self.game_state.arrows_left <= 0:
+                output.append("YOU RAN OUT OF ARROWS")
+                self._end_game(output, won=False)
+            if not self.game_state.game_over:
+                self._describe_room(output)
+
+        self._finish(output)
+        logger.info("* Shot completed. New state: %s", self.game_state)
+
+    def exit_game(self) -> None:
+        logger.info("* Exiting game ...")
+        self.game_state.game_over = True
+
+    def _enter_room(self, output: List[str]) -> None:
+        """Resolve hazards in the player's room, following bat snatches."""
+        while True:
+            if self.player == self.wumpus:
+                output.append("... OOPS! BUMPED A WUMPUS!")
+                self._move_wumpus(output)
+                if self.game_state.game_over:
+                    return
+            if self.player in self.pits:
+                output.append("YYYIIIIEEEE . . . FELL IN PIT")
+                self._end_game(output, won=False)
+                return
+            if self.player in self.bats:
+                output.append("ZAP--SUPER BAT SNATCH! ELSEWHEREVILLE FOR YOU!")
+                self.player = self.rng.randrange(NUM_ROOMS)
+                continue
+            break
+
+        self._describe_room(output)
+
+    def _move_wumpus(self, output: List[str]) -> None:
+        """Wake the Wumpus: it moves to a random tunnel 3 times out of 4."""
+        self.knowledge.wumpus_moved()
+        k = self.rng.randrange(4)
+        if k < 3:
+            self.wumpus = CAVE[self.wumpus][k]
+        if self.wumpus == self.player:
+            output.append("TSK TSK TSK - WUMPUS GOT YOU!")
+            self._end_game(output, won=False)
+
+    def _describe_room(self, output: List[str]) -> None:
+        """Report nearby hazards and the current room, as the binary does."""
+        state = self.game_state
+        state.bat_nearby = False
+        state.draft_felt = False
+        state.wumpus_smell = False
+
+        output.append("")
+        for room in CAVE[self.player]:
+            if room == self.wumpus:
+                output.append("I SMELL A WUMPUS!")
+                state.wumpus_smell = True
+            elif room in self.pits:
+                output.append("I FEEL A DRAFT")
+                state.draft_felt = True
+            elif room in self.bats:
+                output.append("BATS NEARBY!")
+                state.bat_nearby = True
+
+        state.current_room = self.player + 1
+        state.adjacent = ADJACENT_ROOMS[self.player]
+        self.knowledge.observe(
+            state.current_room,
+            state.adjacent,
+            state.draft_felt,
+            state.wumpus_smell,
+            state.bat_nearby,
+        )
+        output.append(f"YOU ARE IN ROOM {state.current_room}")
+        output.append("TUNNELS LEAD TO " + " ".join(str(r) for r in state.adjacent))
+        output.append("")
+
+    def _end_game(self, output: List[str], won: bool) -> None:
+        if won:
+            output.append("HEE HEE HEE - THE WUMPUS'LL GET YOU NEXT TIME!!")
+        else:
+            output.append("HA HA HA - YOU LOSE!")
+        self.game_state.game_over = True
+        self.game_state.win_state = won
+
+    def _record(self, command: Optional[str], prompt: Optional[GamePrompt] = None) -> None:
+        """
+        Record a command and, if given, the empty output up to the next prompt
+        in the same shape as a session with the wumpus binary, so transcripts
+        of both can be replayed through WumpusGameInterface.
+        """
+        if not self.recorder:
+            return
+        if command is not None:
+            self.recorder.command(command)
+        if prompt is not None:
+            self.recorder.output("", prompt, 0.0)
+
+    def _finish(self, output: List[str], prompt: Optional[GamePrompt] = None) -> None:
+        # same lines WumpusGameInterface parses from the binary's output, so
+        # prompts built from last_output match between live and replayed games
+        text = "\n".join(output).strip()
+        self.game_state.raw_output = text
+        logger.debug("* Engine output: %s", output)
+        if self.recorder:
+            if prompt is None:
+                prompt = GamePrompt.SAME_SETUP if self.game_state.game_over else GamePrompt.ACTION
+            self.recorder.output(text, prompt, 0.0)
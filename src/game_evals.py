@@ -0,0 +1,433 @@
+import argparse
+import logging
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from game_db import WumpusDB
+
+logger = logging.getLogger(__name__)
+
+# evaluation metric name to its game_metrics column
+METRICS = {
+    "win_rate": "game_won",
+    "turns": "num_turns",
+    "latency": "average_response_time",
+}
+# upper bound on resampled values held in memory at once
+MAX_BATCH_VALUES = 10_000_000
+
+
+@dataclass
+class Interval:
+    """Point estimate with a bootstrap confidence interval."""
+
+    estimate: float
+    low: float
+    high: float
+
+    @property
+    def half_width(self) -> float:
+        return (self.high - self.low) / 2
+
+
+@dataclass
+class StopDecision:
+    """Outcome of a sequential stopping check on a comparison."""
+
+    stop: bool
+    reason: str
+    games: int
+    p_value: float
+    # nominal p-value boundary of this look
+    alpha: float
+
+
+@dataclass
+class Comparison:
+    """A strategy's metric compared with the baseline strategy."""
+
+    strategy: Optional[str]
+    games: int
+    value: Interval
+    difference: Optional[Interval] = None
+    p_value: Optional[float] = None
+    decision: Optional[StopDecision] = None
+
+
+def load_outcomes(
+    db: WumpusDB, metric: str = "win_rate", group_by: str = "strategy_id"
+) -> Dict[Optional[str], np.ndarray]:
+    """
+    Per-game values of a metric from game_metrics, grouped by a column.
+
+    Args:
+        db: Database to read from
+        metric: "win_rate", "turns" or "latency"
+        group_by: game_metrics column to group by, e.g. "strategy_id" or "model"
+
+    Returns:
+        Mapping of group to float array of per-game values in play order
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric}, expected one of {list(METRICS)}")
+    if group_by not in ("strategy_id", "prompt_version", "model"):
+        raise ValueError(f"Cannot group by {group_by}")
+
+    rows = db.conn.execute(
+        f"SELECT {group_by}, {METRICS[metric]} FROM game_metrics ORDER BY id"
+    ).fetchall()
+    groups: Dict[Optional[str], List[float]] = {}
+    for group, value in rows:
+        groups.setdefault(group, []).append(float(value or 0.0))
+    return {group: np.asarray(values, dtype=np.float64) for group, values in groups.items()}
+
+
+def _batches(n_resamples: int, size: int):
+    """Split n_resamples into batches of at most MAX_BATCH_VALUES resampled values."""
+    batch = max(1, MAX_BATCH_VALUES // max(size, 1))
+    for start in range(0, n_resamples, batch):
+        yield min(batch, n_resamples - start)
+
+
+def bootstrap_means(
+    values: np.ndarray, n_resamples: int = 10_000, rng: Optional[np.random.Generator] = None
+) -> np.ndarray:
+    """Means of n_resamples bootstrap resamples, drawn as one index array per batch."""
+    rng = rng or np.random.default_rng()
+    n = len(values)
+    means = [
+        values[rng.integers(0, n, size=(batch, n))].mean(axis=1)
+        for batch in _batches(n_resamples, n)
+    ]
+    return np.concatenate(means)
+
+
+def _interval(estimate: float, samples: np.ndarray, confidence: float) -> Interval:
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(samples, [tail, 100 - tail])
+    return Interval(float(estimate), float(low), float(high))
+
+
+def bootstrap_ci(
+    values: np.ndarray,
+    n_resamples: int = 10_000,
+    confidence: float = 0.95,
+    rng: Optional[np.random.Generator] = None,
+) -> Interval:
+    """
+    Percentile bootstrap confidence interval of the mean.
+
+    Args:
+        values: Per-game values
+        n_resamples: Number of bootstrap resamples
+        confidence: Confidence level of the interval
+        rng: NumPy random generator, for reproducible intervals
+
+    Returns:
+        Interval around the sample mean
+    """
+    return _interval(values.mean(), bootstrap_means(values, n_resamples, rng), confidence)
+
+
+def bootstrap_diff_ci(
+    a: np.ndarray,
+    b: np.ndarray,
+    n_resamples: int = 10_000,
+    confidence: float = 0.95,
+    rng: Optional[np.random.Generator] = None,
+) -> Interval:
+    """Percentile bootstrap confidence interval of mean(a) - mean(b)."""
+    rng = rng or np.random.default_rng()
+    samples = bootstrap_means(a, n_resamples, rng) - bootstrap_means(b, n_resamples, rng)
+    return _interval(a.mean() - b.mean(), samples, confidence)
+
+
+def permutation_test(
+    a: np.ndarray,
+    b: np.ndarray,
+    n_resamples: int = 10_000,
+    rng: Optional[np.random.Generator] = None,
+) -> float:
+    """
+    Two-sided permutation test of the difference in means.
+
+    Every permutation of the pooled games is an argsort of a row of random
+    keys, so a batch of permutations is a single array operation.
+
+    Args:
+        a: Per-game values of the first group
+        b: Per-game values of the second group
+        n_resamples: Number of random permutations
+        rng: NumPy random generator, for reproducible p-values
+
+    Returns:
+        p-value of the observed difference
+    """
+    rng = rng or np.random.default_rng()
+    pooled = np.concatenate([a, b])
+    n_a = len(a)
+    observed = abs(a.mean() - b.mean())
+
+    extreme = 0
+    for batch in _batches(n_resamples, len(pooled)):
+        permuted = pooled[rng.random((batch, len(pooled))).argsort(axis=1)]
+        diffs = permuted[:, :n_a].mean(axis=1) - permuted[:, n_a:].mean(axis=1)
+        # small tolerance so ties with the observed difference count as extreme
+        extreme += int(np.count_nonzero(np.abs(diffs) >= observed - 1e-12))
+    return (extreme + 1) / (n_resamples + 1)
+
+
+def obrien_fleming_alpha(games: int, max_games: int, alpha: float = 0.05) -> float:
+    """
+    Two-sided alpha spent after games of max_games, by the O'Brien-Fleming-type
+    Lan-DeMets spending function.
+
+    Little alpha is spent at early looks, so checking after every batch of
+    trials keeps the overall false positive rate close to alpha.
+    """
+    fraction = min(max(games / max_games, 1e-9), 1.0)
+    normal = NormalDist()
+    z = normal.inv_cdf(1 - alpha / 2)
+    return 2 * (1 - normal.cdf(z / fraction**0.5))
+
+
+def obrien_fleming_boundaries(fractions: Sequence[float], alpha: float = 0.05) -> List[float]:
+    """
+    Nominal two-sided p-value boundary of each look of a group sequential test.
+
+    Each look spends the O'Brien-Fleming-type alpha added since the previous
+    look. Its boundary is the one whose crossing probability, given that no
+    earlier look crossed its boundary, equals that increment. The score
+    statistic's distribution over the earlier continuation regions is
+    integrated numerically on a grid (Armitage, McPherson and Rowe).
+
+    Args:
+        fractions: Increasing information fractions (games / max games) of the looks
+        alpha: Overall significance level
+
+    Returns:
+        p-value boundary per look; a look with no alpha to spend gets 0
+    """
+    normal = NormalDist()
+    # score statistic S = Z * sqrt(t); O'Brien-Fleming boundaries stay near |S| = 2
+    step = 0.005
+    half = np.arange(0, 8 + step, step)
+    grid = np.concatenate((-half[:0:-1], half))
+    density = None
+    previous, spent = 0.0, 0.0
+    boundaries = []
+    for fraction in fractions:
+        fraction = min(max(fraction, 1e-9), 1.0)
+        increment = obrien_fleming_alpha(fraction, 1, alpha) - spent
+        if increment <= 0 or fraction <= previous:
+            boundaries.append(0.0)
+            continue
+        sd = (fraction - previous) ** 0.5
+        if density is None:
+            density = np.exp(-0.5 * (grid / sd) ** 2) / (sd * (2 * np.pi) ** 0.5)
+        else:
+            kernel_half = np.arange(0, min(8, 10 * sd) + step, step)
+            kernel_grid = np.concatenate((-kernel_half[:0:-1], kernel_half))
+            kernel = np.exp(-0.5 * (kernel_grid / sd) ** 2) / (sd * (2 * np.pi) ** 0.5)
+            density = np.convolve(density, kernel, mode="same") * step
+
+        # probability of |S| >= each grid value >= 0, decreasing along half
+        centre = len(half) - 1
+        both = density[centre:] + density[centre::-1]
+        tail = (np.cumsum(both[::-1])[::-1] - both / 2) * step
+        log_tail = np.log(np.maximum(tail, 1e-300))
+        bound = float(np.interp(-np.log(increment), -log_tail, half))
+
+        z = bound / fraction**0.5
+        boundaries.append(2 * (1 - normal.cdf(z)))
+        density[np.abs(grid) >= bound] = 0.0
+        previous, spent = fraction, spent + increment
+    return boundaries
+
+
+def sequential_decision(
+    a: np.ndarray,
+    b: np.ndarray,
+    max_games: int = 100,
+    alpha: float = 0.05,
+    margin: Optional[float] = None,
+    min_games: int = 10,
+    n_resamples: int = 10_000,
+    rng: Optional[np.random.Generator] = None,
+    look_every: Optional[int] = None,
+) -> StopDecision:
+    """
+    Decide whether a comparison of two strategies has enough games to stop.
+
+    Stops when the permutation p-value falls below the nominal boundary of
+    this look (see obrien_fleming_boundaries), assuming the comparison was
+    also checked after every look_every games before; when the bootstrap
+    interval of the difference is narrower than margin on both sides of
+    zero (the strategies are equivalent within margin); or when max_games
+    games per strategy have been played.
+
+    Args:
+        a: Per-game values of the candidate strategy
+        b: Per-game values of the baseline strategy
+        max_games: Planned maximum number of games per strategy
+        alpha: Overall significance level
+        margin: Differences smaller than this are not of interest
+        min_games: Never stop before this many games per strategy
+        n_resamples: Number of permutations and bootstrap resamples
+        rng: NumPy random generator
+        look_every: Games between earlier looks, min_games if None
+
+    Returns:
+        StopDecision with the reason to stop or continue
+    """
+    rng = rng or np.random.default_rng()
+    games = min(len(a), len(b))
+    look_every = look_every or min_games
+    looks = [n for n in range(look_every, min(games, max_games), look_every)]
+    looks.append(min(games, max_games))
+    boundary = obrien_fleming_boundaries([n / max_games for n in looks], alpha)[-1]
+    if games < min_games:
+        return StopDecision(False, f"fewer than {min_games} games", games, 1.0, boundary)
+
+    p_value = permutation_test(a, b, n_resamples, rng)
+    if p_value <= boundary:
+        return StopDecision(True, "significant difference", games, p_value, boundary)
+    if margin is not None:
+        diff = bootstrap_diff_ci(a, b, n_resamples, 1 - alpha, rng)
+        if -margin < diff.low and diff.high < margin:
+            return StopDecision(True, f"equivalent within {margin}", games, p_value, boundary)
+    if games >= max_games:
+        return StopDecision(True, "reached max games", games, p_value, boundary)
+    return StopDecision(False, "continue", games, p_value, boundary)
+
+
+def compare_strategies(
+    outcomes: Dict[Optional[str], np.ndarray],
+    baseline: Optional[str] = None,
+    n_resamples: int = 10_000,
+    confidence: float = 0.95,
+    max_games: int = 100,
+    margin: Optional[float] = None,
+    seed: Optional[int] = None,
+    look_every: Optional[int] = None,
+) -> List[Comparison]:
+    """
+    Bootstrap intervals per strategy and tests of every strategy against a baseline.
+
+    Args:
+        outcomes: Per-game values per strategy, as returned by load_outcomes
+        baseline: Strategy to compare against, the one with most games if None
+        n_resamples: Number of bootstrap resamples and permutations
+        confidence: Confidence level of the intervals
+        max_games: Planned maximum number of games per strategy
+        margin: Differences smaller than this are not of interest
+        seed: Seed for reproducible results
+        look_every: Games between the looks of the sequential test
+
+    Returns:
+        Comparison per strategy, the baseline first
+    """
+    rng = np.random.default_rng(seed)
+    if baseline is None:
+        baseline = max(outcomes, key=lambda strategy: len(outcomes[strategy]))
+    if baseline not in outcomes:
+        raise ValueError(f"No games for baseline strategy {baseline}")
+
+    base = outcomes[baseline]
+    results = [Comparison(baseline, len(base), bootstrap_ci(base, n_resamples, confidence, rng))]
+    for strategy, values in sorted(outcomes.items(), key=lambda item: str(item[0])):
+        if strategy == baseline or not len(values):
+            continue
+        results.append(
+            Comparison(
+                strategy,
+                len(values),
+                bootstrap_ci(values, n_resamples, confidence, rng),
+                bootstrap_diff_ci(values, base, n_resamples, confidence, rng),
+                permutation_test(values, base, n_resamples, rng),
+                sequential_decision(
+                    values,
+                    base,
+                    max_games=max_games,
+                    alpha=1 - confidence,
+                    margin=margin,
+                    n_resamples=n_resamples,
+                    rng=rng,
+                    look_every=look_every,
+                ),
+            )
+        )
+    return results
+
+
+def format_comparisons(metric: str, comparisons: Sequence[Comparison]) -> str:
+    header = f"{'strategy':<20} {'games':>6} {metric:>22} {'diff vs baseline':>24} {'p':>7}"
+    lines = [header + "  decision"]
+    for c in comparisons:
+        value = f"{c.value.estimate:.3f} [{c.value.low:.3f}, {c.value.high:.3f}]"
+        if c.difference is None:
+            lines.append(f"{str(c.strategy):<20} {c.games:>6} {value:>22} {'(baseline)':>24}")
+            continue
+        diff = f"{c.difference.estimate:+.3f} [{c.difference.low:+.3f}, {c.difference.high:+.3f}]"
+        decision = f"{'stop' if c.decision.stop else 'continue'} ({c.decision.reason})"
+        row = f"{str(c.strategy):<20} {c.games:>6} {value:>22} {diff:>24} {c.p_value:>7.4f}"
+        lines.append(f"{row}  {decision}")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare strategies with resampling statistics")
+    parser.add_argument("--db", default="wumpus_metrics.db", help="path to the metrics database")
+    parser.add_argument("--metric", choices=list(METRICS), default="win_rate")
+    parser.add_argument(
+        "--group-by",
+        choices=["strategy_id", "prompt_version", "model"],
+        default="strategy_id",
+    )
+    parser.add_argument("--baseline", default=None, help="group to compare against")
+    parser.add_argument("--resamples", type=int, default=10_000)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument(
+        "--max-games", type=int, default=100, help="planned maximum games per strategy"
+    )
+    parser.add_argument(
+        "--margin", type=float, default=None, help="smallest difference of interest"
+    )
+    parser.add_argument(
+        "--look-every",
+        type=int,
+        default=None,
+        help="games between checks of the sequential test (default: every 10 games)",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> List[Comparison]:
+    args = parse_args(argv)
+    db = WumpusDB(args.db)
+    outcomes = load_outcomes(db, args.metric, args.group_by)
+    db.close()
+    if not outcomes:
+        print("* No games recorded")
+        return []
+
+    comparisons = compare_strategies(
+        outcomes,
+        baseline=args.baseline,
+        n_resamples=args.resamples,
+        confidence=args.confidence,
+        max_games=args.max_games,
+        margin=args.margin,
+        seed=args.seed,
+        look_every=args.look_every,
+    )
+    print(format_comparisons(args.metric, comparisons))
+    return comparisons
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,350 @@
 import logging
-from dataclasses import dataclass, field
-from typing import List
+import re
+import time
+from collections.abc import MutableSet
+from enum import Enum
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 
 import pexpect
 
+from game_knowledge import (
+    MAX_ARROW_ROOMS,
+    NUM_ROOMS,
+    CaveKnowledge,
+    mask_rooms,
+    room_bit,
+    room_mask,
+)
+from tracing import traced
+
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+class GamePrompt(Enum):
+    """Input prompts printed by ESR's wumpus."""
+
+    INSTRUCTIONS = "INSTRUCTIONS (Y-N)"
+    ACTION = "SHOOT OR MOVE (S-M)"
+    MOVE_TARGET = "WHERE TO"
+    ARROW_COUNT = "NO. OF ROOMS (1-5)"
+    ARROW_ROOM = "ROOM #"
+    SAME_SETUP = "SAME SETUP (Y-N)"
+    EOF = "EOF"
+    UNKNOWN = "UNKNOWN"
+
+
+# prompts in the order of PROMPT_PATTERNS, which pexpect matches against the
+# raw pty output; the question mark is part of the prompt and is consumed
+PROMPTS = [
+    GamePrompt.INSTRUCTIONS,
+    GamePrompt.ACTION,
+    GamePrompt.MOVE_TARGET,
+    GamePrompt.ARROW_COUNT,
+    GamePrompt.ARROW_ROOM,
+    GamePrompt.SAME_SETUP,
+    GamePrompt.EOF,
+]
+PROMPT_PATTERNS = [
+    re.compile(rb"INSTRUCTIONS \(Y-N\)\?", re.IGNORECASE),
+    re.compile(rb"SHOOT OR MOVE \(S-M\)\?", re.IGNORECASE),
+    re.compile(rb"WHERE TO\?", re.IGNORECASE),
+    re.compile(rb"NO\. OF ROOMS \(1-5\)\?", re.IGNORECASE),
+    re.compile(rb"ROOM #\?", re.IGNORECASE),
+    re.compile(rb"SAME SETUP \(Y-N\)\?", re.IGNORECASE),
+    pexpect.EOF,
+]
+# prompts are short, so only the tail of the buffer needs to be searched
+PROMPT_SEARCH_WINDOW = 64
+
+# every game output line event, matched in a single pass per line
+OUTPUT_PATTERN = re.compile(
+    r"YOU ARE IN ROOM\s+(?P<room>\d+)"
+    r"|TUNNELS LEAD TO\s+(?P<tunnels>\d+(?:\s+\d+)*)"
+    r"|(?P<bats>BATS NEARBY)"
+    r"|(?P<draft>FEEL A DRAFT)"
+    r"|(?P<smell>SMELL A WUMPUS)"
+    r"|(?P<woke>BUMPED A WUMPUS|MISSED)"
+    r"|(?P<lost>WUMPUS GOT YOU|YOU RAN OUT OF ARROWS|FELL IN PIT|ARROW GOT YOU)"
+    r"|(?P<won>YOU GOT THE WUMPUS)",
+    re.IGNORECASE,
+)
+
+
+def arrow_rooms(room: Union[int, Iterable[int]]) -> List[int]:
+    """
+    Rooms an arrow is shot through, checked against what the game accepts.
+
+    The wumpus binary answers a path of more than 5 rooms, or a room equal to
+    the one two before it, by asking for it again, which a shot sent as a
+    whole cannot answer; such paths raise ValueError instead.
+
+    Args:
+        room: Room to shoot into, or the list of rooms the arrow flies through
+
+    Returns:
+        List of 1-indexed rooms
+    """
+    rooms = [int(r) for r in room] if isinstance(room, (list, tuple)) else [int(room)]
+    if not 1 <= len(rooms) <= MAX_ARROW_ROOMS:
+        raise ValueError(f"An arrow flies through 1-{MAX_ARROW_ROOMS} rooms, not {len(rooms)}")
+    for k in range(2, len(rooms)):
+        if rooms[k] == rooms[k - 2]:
+            raise ValueError(f"Arrow path {rooms} doubles back to room {rooms[k]}")
+    return rooms
+
+
+class RoomSet(MutableSet):
+    """Set view of the explored rooms of a WumpusGameState, backed by its bitmask."""
+
+    __slots__ = ("_state",)
+
+    def __init__(self, state: "WumpusGameState") -> None:
+        self._state = state
+
+    def __contains__(self, room) -> bool:
+        return isinstance(room, int) and 1 <= room <= NUM_ROOMS and bool(
+            self._state.explored_mask & room_bit(room)
+        )
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(mask_rooms(self._state.explored_mask))
+
+    def __len__(self) -> int:
+        return self._state.explored_mask.bit_count()
+
+    def add(self, room: int) -> None:
+        self._state.explored_mask |= room_bit(int(room))
+
+    def discard(self, room: int) -> None:
+        self._state.explored_mask &= ~room_bit(int(room))
+
+    def __repr__(self) -> str:
+        return repr(set(self))
+
+
+class GameStateSnapshot(NamedTuple):
+    """Immutable copy of a WumpusGameState, taken once per turn."""
+
+    room: int
+    adjacent: Tuple[int, ...]
+    explored: int
+    bat_nearby: bool
+    draft_felt: bool
+    wumpus_smell: bool
+    arrows_left: int
+    game_over: bool
+    win_state: bool
+    # raw game output, only kept if asked for
+    output: Optional[str] = None
+
+    @property
+    def explored_rooms(self) -> List[int]:
+        return mask_rooms(self.explored)
+
+    def summary(self) -> dict:
+        """Same view as WumpusGameState.summary()."""
+        return {
+            "room": self.room,
+            "adjacent": list(self.adjacent),
+            "explored": mask_rooms(self.explored),
+            "bats": self.bat_nearby,
+            "draft": self.draft_felt,
+            "smell": self.wumpus_smell,
+            "arrows": self.arrows_left,
+            "game_over": self.game_over,
+            "won": self.win_state,
+        }
+
+
 class WumpusGameState:
-    current_room: int = 0
-    adjacent_rooms: List[int] = field(default_factory=list)
-    explored_rooms: set[int] = field(default_factory=set)
-    bat_nearby: bool = False
-    draft_felt: bool = False
-    wumpus_smell: bool = False
-    arrows_left: int = 5
-    game_over: bool = False
-    win_state: bool = False
-    last_output: str = ""
+    """
+    Mutable state of a game as parsed from its output.
+
+    Kept compact for many concurrent games: explored rooms are a 20-bit mask
+    (explored_rooms is a set view of it), the tunnels a tuple, and the raw
+    output a single string that is split into last_output lines only when
+    read. snapshot() returns an immutable copy for per-turn history.
+    """
+
+    __slots__ = (
+        "current_room",
+        "adjacent",
+        "explored_mask",
+        "bat_nearby",
+        "draft_felt",
+        "wumpus_smell",
+        "arrows_left",
+        "game_over",
+        "win_state",
+        "raw_output",
+    )
+
+    def __init__(
+        self,
+        current_room: int = 0,
+        adjacent_rooms: Iterable[int] = (),
+        explored_rooms: Iterable[int] = (),
+        bat_nearby: bool = False,
+        draft_felt: bool = False,
+        wumpus_smell: bool = False,
+        arrows_left: int = 5,
+        game_over: bool = False,
+        win_state: bool = False,
+        last_output: Union[str, List[str]] = "",
+    ) -> None:
+        self.current_room = current_room
+        self.adjacent: Tuple[int, ...] = tuple(adjacent_rooms)
+        self.explored_mask = room_mask(explored_rooms)
+        self.bat_nearby = bat_nearby
+        self.draft_felt = draft_felt
+        self.wumpus_smell = wumpus_smell
+        self.arrows_left = arrows_left
+        self.game_over = game_over
+        self.win_state = win_state
+        # None until the game printed something, so an unstarted state shows
+        # an empty last_output as before
+        self.raw_output: Optional[str] = None
+        self.last_output = last_output
+
+    @property
+    def adjacent_rooms(self) -> List[int]:
+        return list(self.adjacent)
+
+    @adjacent_rooms.setter
+    def adjacent_rooms(self, rooms: Iterable[int]) -> None:
+        self.adjacent = tuple(rooms)
+
+    @property
+    def explored_rooms(self) -> RoomSet:
+        return RoomSet(self)
+
+    @explored_rooms.setter
+    def explored_rooms(self, rooms: Iterable[int]) -> None:
+        self.explored_mask = room_mask(rooms)
+
+    @property
+    def last_output(self) -> Union[str, List[str]]:
+        """Lines of the last game output, or "" before any output."""
+        if self.raw_output is None:
+            return ""
+        return [line.rstrip() for line in self.raw_output.split("\n")]
+
+    @last_output.setter
+    def last_output(self, output: Union[str, List[str]]) -> None:
+        if isinstance(output, str):
+            self.raw_output = output or None
+        else:
+            self.raw_output = "\n".join(output)
+
+    def snapshot(self, output: bool = False) -> GameStateSnapshot:
+        """
+        Immutable copy of the state.
+
+        Args:
+            output: Also keep the raw game output
+
+        Returns:
+            GameStateSnapshot sharing the tunnels tuple with the state
+        """
+        return GameStateSnapshot(
+            self.current_room,
+            self.adjacent,
+            self.explored_mask,
+            self.bat_nearby,
+            self.draft_felt,
+            self.wumpus_smell,
+            self.arrows_left,
+            self.game_over,
+            self.win_state,
+            self.raw_output if output else None,
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: GameStateSnapshot) -> "WumpusGameState":
+        state = cls(
+            snapshot.room,
+            snapshot.adjacent,
+            (),
+            snapshot.bat_nearby,
+            snapshot.draft_felt,
+            snapshot.wumpus_smell,
+            snapshot.arrows_left,
+            snapshot.game_over,
+            snapshot.win_state,
+        )
+        state.explored_mask = snapshot.explored
+        state.raw_output = snapshot.output
+        return state
+
+    def summary(self) -> dict:
+        """Compact, JSON-serializable view of the state without the raw output."""
+        return self.snapshot().summary()
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, WumpusGameState):
+            return NotImplemented
+        return self.snapshot(output=True) == other.snapshot(output=True)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        # logged on every move, so the output is left out
+        return (
+            f"WumpusGameState(room={self.current_room}, adjacent={self.adjacent}, "
+            f"explored={mask_rooms(self.explored_mask)}, bats={self.bat_nearby}, "
+            f"draft={self.draft_felt}, smell={self.wumpus_smell}, "
+            f"arrows={self.arrows_left}, game_over={self.game_over}, won={self.win_state})"
+        )
 
 
 class WumpusGameInterface:
-    def __init__(self, game_cmd="wumpus") -> None:
+    def __init__(self, game_cmd="wumpus", pool=None) -> None:
         self.game_cmd = game_cmd
         self.game_process = None
+        # optional GamePool handing out processes waiting at the first move prompt
+        self.pool = pool
+        self.pooled_game = None
         self.game_state = WumpusGameState()
+        self.knowledge = CaveKnowledge()
+        # cumulative time spent waiting on game output and timeouts hit
+        self.io_wait = 0.0
+        self.timeouts = 0
+        # (command, seconds until the game's next prompt) for every read
+        self.command_waits: List[Tuple[Optional[str], float]] = []
+        self.last_command: Optional[str] = None
+        self.prompt: Optional[GamePrompt] = None
+        # echo every game output line to stdout
+        self.echo_output = True
+        # optional SessionRecorder receiving every command and game output
+        self.recorder = None
 
     def start_game(self) -> None:
         logger.info("* Starting Wumpus game ...")
-        self.game_process = pexpect.spawn(self.game_cmd)
-        self._process_game_output()
-        self._send_command("N")
-        self._process_game_output()
+        if self.pool is not None:
+            self._start_pooled_game()
+        else:
+            self.game_process = self._spawn()
+            self._process_game_output()
+            self._send_command("N")
+            self._process_game_output()
         logger.info("* Game started. Initial state: %s", self.game_state)
 
+    def _start_pooled_game(self) -> None:
+        """Take a process from the pool that has already answered the instructions prompt."""
+        self.pooled_game = self.pool.acquire()
+        self.game_process = self.pooled_game.process
+        if self.recorder:
+            # record the startup the pool did, so the transcript replays like a fresh spawn
+            self.recorder.output("", GamePrompt.INSTRUCTIONS, 0.0)
+            self.recorder.command("N")
+            self.recorder.output(self.pooled_game.output, GamePrompt.ACTION, 0.0)
+        self.last_command = "N"
+        self._handle_game_output(self.pooled_game.output, GamePrompt.ACTION)
+
+    def _spawn(self):
+        """Start the game process."""
+        return pexpect.spawn(self.game_cmd)
+
     def move(self, room) -> None:
         logger.info("* Attempting to move to: %s", room)
         self._send_command("M")
@@ -42,16 +352,28 @@ class WumpusGameInterface:
         self._send_command(f"{room}")
         self._process_game_output()
         logger.info("* Move completed. New state: %s", self.game_state)
-        self.game_state.explored_rooms.add(room)
+        self.game_state.explored_mask |= room_bit(int(room))
+
+    def shoot(self, room) -> None:
+        """
+        Shoot an arrow into a room, or through a crooked path of up to 5 rooms.
 
-    def shoot(self, room, num_rooms=1) -> None:
-        logger.info("* Attempting to shoot arrow into: %s", room)
+        Args:
+            room: Room to shoot into, or the list of rooms the arrow flies through
+
+        Raises:
+            ValueError: If the game would ask for a room of the path again
+        """
+        rooms = arrow_rooms(room)
+        logger.info("* Attempting to shoot arrow through: %s", rooms)
         self._send_command("S")
         self._process_game_output()
-        self._send_command(f"{num_rooms}")
-        self._process_game_output()
-        self._send_command(f"{room}")
+        self._send_command(f"{len(rooms)}")
         self._process_game_output()
+        # the game asks "ROOM #" once per room of the path
+        for target in rooms:
+            self._send_command(f"{target}")
+            self._process_game_output()
         self.game_state.arrows_left -= 1
         logger.info("* Shot completed. New state: %s", self.game_state)
 
@@ -60,6 +382,13 @@ class WumpusGameInterface:
 
     def exit_game(self) -> None:
         logger.info("* Exiting game ...")
+        if self.pooled_game is not None:
+            pooled_game, self.pooled_game = self.pooled_game, None
+            self.game_process = None
+            self.game_state.game_over = True
+            # a finished game waits at the play again prompt and can be reused
+            self.pool.release(pooled_game, reusable=self.prompt is GamePrompt.SAME_SETUP)
+            return
         if self.game_process:
             try:
                 # check if the process is still alive
@@ -79,59 +408,102 @@ class WumpusGameInterface:
 
     def _send_command(self, command) -> None:
         if self.game_process:
+            self.last_command = command
+            if self.recorder:
+                self.recorder.command(command)
             self.game_process.sendline(command)
 
-    def _process_game_output(self, timeout=5) -> None:
-        if not self.game_process:
-            return
+    def _read_until_prompt(self, timeout=5) -> Tuple[str, GamePrompt]:
+        """
+        Read game output until the next input prompt is recognized.
+
+        pexpect searches the output as it arrives and returns as soon as one
+        of the game's prompts appears, so no time is spent waiting on output
+        that is already complete.
 
+        Args:
+            timeout: Seconds to wait before giving up on an unknown prompt
+
+        Returns:
+            Tuple of (output before the prompt, the prompt recognized)
+        """
+        start = time.perf_counter()
         try:
-            self.game_process.expect(r"\?", timeout=timeout)
-            output = self.game_process.before.decode("utf-8").strip()
+            index = self.game_process.expect_list(
+                PROMPT_PATTERNS, timeout=timeout, searchwindowsize=PROMPT_SEARCH_WINDOW
+            )
+            prompt = PROMPTS[index]
+            if prompt is GamePrompt.EOF:
+                logger.warning("* Game process ended unexpectedly.")
         except pexpect.TIMEOUT:
             logger.warning("* Timeout reached while waiting for game output.")
-            output = self.game_process.before.decode("utf-8").strip()
-        except pexpect.EOF:
-            logger.warning("* Game process ended unexpectedly.")
-            output = self.game_process.before.decode("utf-8").strip()
+            self.timeouts += 1
+            prompt = GamePrompt.UNKNOWN
+        wait = time.perf_counter() - start
 
-        self.game_state.last_output = [s.rstrip() for s in output.split("\n")]
+        self.io_wait += wait
+        self.command_waits.append((self.last_command, wait))
+        output = self.game_process.before.decode("utf-8").strip()
+        if self.recorder:
+            self.recorder.output(output, prompt, wait)
+        return output, prompt
+
+    @traced("game.process_output")
+    def _process_game_output(self, timeout=5) -> None:
+        if not self.game_process:
+            return
+
+        output, prompt = self._read_until_prompt(timeout)
+        self._handle_game_output(output, prompt)
+
+    def _handle_game_output(self, output: str, prompt: GamePrompt) -> None:
+        """Update the game state from the output read before a prompt."""
+        self.prompt = prompt
+        self.game_state.raw_output = output
 
         # reset environment flags
         self.game_state.bat_nearby = False
         self.game_state.draft_felt = False
         self.game_state.wumpus_smell = False
 
-        for line in self.game_state.last_output:
-            self._update_game_state(line)
+        for line in output.split("\n"):
+            self._update_game_state(line.rstrip())
         logger.debug("* Processed game output: %s", output)
 
         if self.game_state.game_over:
             self.exit_game()
 
     def _update_game_state(self, output) -> None:
-        # convert to uppercase to handle all-caps text
-        output = output.upper()
-
-        print(output)
-
-        if "YOU ARE IN ROOM" in output:
-            self.game_state.current_room = int(output.split()[-1])
-        if "TUNNELS LEAD TO" in output:
-            self.game_state.adjacent_rooms = [int(room) for room in output.split()[-3:]]
-        if "BATS NEARBY" in output:
-            self.game_state.bat_nearby = True
-        if "FEEL A DRAFT" in output:
-            self.game_state.draft_felt = True
-        if "SMELL A WUMPUS" in output:
-            self.game_state.wumpus_smell = True
-        if (
-            "WUMPUS GOT YOU" in output
-            or "YOU RAN OUT OF ARROWS" in output
-            or "FELL IN PIT" in output
-        ):
-            self.game_state.game_over = True
-            self.game_state.win_state = False
-        if "YOU GOT THE WUMPUS" in output:
-            self.game_state.game_over = True
-            self.game_state.win_state = True
+        if self.echo_output:
+            # convert to uppercase to handle all-caps text
+            print(output.upper())
+
+        for match in OUTPUT_PATTERN.finditer(output):
+            event = match.lastgroup
+            if event == "room":
+                self.game_state.current_room = int(match.group("room"))
+            elif event == "tunnels":
+                tunnels = match.group("tunnels").split()
+                self.game_state.adjacent = tuple(int(room) for room in tunnels)
+                # the tunnels line follows the percepts and room of the same report
+                self.knowledge.observe(
+                    self.game_state.current_room,
+                    self.game_state.adjacent,
+                    self.game_state.draft_felt,
+                    self.game_state.wumpus_smell,
+                    self.game_state.bat_nearby,
+                )
+            elif event == "bats":
+                self.game_state.bat_nearby = True
+            elif event == "draft":
+                self.game_state.draft_felt = True
+            elif event == "smell":
+                self.game_state.wumpus_smell = True
+            elif event == "woke":
+                self.knowledge.wumpus_moved()
+            elif event == "lost":
+                self.game_state.game_over = True
+                self.game_state.win_state = False
+            elif event == "won":
+                self.game_state.game_over = True
+                self.game_state.win_state = True
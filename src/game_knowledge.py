@@ -0,0 +1,240 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+NUM_ROOMS = 20
+ALL_ROOMS = (1 << NUM_ROOMS) - 1
+# an arrow flies through at most this many rooms
+MAX_ARROW_ROOMS = 5
+# distance between rooms not connected by known tunnels
+UNREACHABLE = NUM_ROOMS + 1
+
+
+def room_bit(room: int) -> int:
+    """Bit representing a 1-indexed room in a room set bitmask, 0 outside the cave."""
+    # a move to a room that does not exist is answered with NOT POSSIBLE
+    # and must neither raise nor set bits outside ALL_ROOMS
+    return 1 << (room - 1) if 1 <= room <= NUM_ROOMS else 0
+
+
+def room_mask(rooms: Iterable[int]) -> int:
+    """Bitmask of a collection of 1-indexed rooms, ignoring rooms outside the cave."""
+    mask = 0
+    for room in rooms:
+        if 1 <= room <= NUM_ROOMS:
+            mask |= 1 << (room - 1)
+    return mask
+
+
+def mask_rooms(mask: int) -> List[int]:
+    """Sorted 1-indexed rooms contained in a bitmask."""
+    rooms = []
+    while mask:
+        low = mask & -mask
+        rooms.append(low.bit_length())
+        mask ^= low
+    return rooms
+
+
+class CaveKnowledge:
+    """
+    Incremental knowledge base of what the agent has learned about the cave.
+
+    Room sets are stored as 20-bit integer masks so every percept updates the
+    belief state with a handful of bitwise operations. The cave graph is built
+    from the "TUNNELS LEAD TO" lines as rooms are visited, together with an
+    all-pairs shortest path index over the known tunnels that is updated
+    with every new tunnel, so arrow paths are looked up rather than searched.
+    """
+
+    def __init__(self) -> None:
+        self.tunnels: Dict[int, Tuple[int, ...]] = {}
+        self.neighbours: Dict[int, int] = {}
+        self.visited = 0
+        # rooms proven free of each hazard
+        self.no_pit = 0
+        self.no_wumpus = 0
+        self.no_bats = 0
+        # rooms in which each percept was observed
+        self.draft_rooms = 0
+        self.smell_rooms = 0
+        self.bat_rooms = 0
+        # distances over the known tunnels and the first room on a shortest
+        # path, indexed by 1-indexed room
+        size = NUM_ROOMS + 1
+        self.distances = [[UNREACHABLE] * size for _ in range(size)]
+        self.next_room = [[0] * size for _ in range(size)]
+        for room in range(size):
+            self.distances[room][room] = 0
+
+    def observe(
+        self,
+        room: int,
+        adjacent_rooms: Iterable[int],
+        draft_felt: bool,
+        wumpus_smell: bool,
+        bat_nearby: bool,
+    ) -> None:
+        """
+        Update the belief state with the percepts of the room the agent is in.
+
+        Args:
+            room: Room the agent is in
+            adjacent_rooms: Rooms the tunnels lead to
+            draft_felt: Whether a draft was felt (adjacent pit)
+            wumpus_smell: Whether the Wumpus was smelled (adjacent Wumpus)
+            bat_nearby: Whether bats were heard (adjacent bats)
+        """
+        adjacent = tuple(adjacent_rooms)
+        if room not in self.tunnels:
+            self.tunnels[room] = adjacent
+            self.neighbours[room] = room_mask(adjacent)
+            # tunnels go both ways
+            for other in adjacent:
+                self.neighbours[other] = self.neighbours.get(other, 0) | room_bit(room)
+                self._add_tunnel(room, other)
+
+        bit = room_bit(room)
+        near = self.neighbours[room]
+
+        # the agent is standing in this room, so it holds no hazard
+        self.visited |= bit
+        self.no_pit |= bit
+        self.no_wumpus |= bit
+        self.no_bats |= bit
+
+        # the game reports one percept per tunnel, the Wumpus before a pit
+        # before bats, so the Wumpus hides a pit or bats sharing its room
+        # (pits and bats never share one); without a draft or bat percept
+        # only the rooms that cannot hold the Wumpus are cleared
+        if wumpus_smell:
+            self.smell_rooms |= bit
+            hidden = near & ~self.no_wumpus
+        else:
+            self.no_wumpus |= near
+            hidden = 0
+        if draft_felt:
+            self.draft_rooms |= bit
+        else:
+            self.no_pit |= near & ~hidden
+        if bat_nearby:
+            self.bat_rooms |= bit
+        else:
+            self.no_bats |= near & ~hidden
+
+    def wumpus_moved(self) -> None:
+        """Forget where the Wumpus is not, after it woke up and may have moved."""
+        self.smell_rooms = 0
+        self.no_wumpus = 0
+
+    def is_visited(self, room: int) -> bool:
+        return bool(self.visited & room_bit(room))
+
+    def safe_rooms(self) -> int:
+        """Rooms proven free of pits, the Wumpus and bats."""
+        return self.no_pit & self.no_wumpus & self.no_bats
+
+    def is_safe(self, room: int) -> bool:
+        return bool(self.safe_rooms() & room_bit(room))
+
+    def possible_pits(self) -> int:
+        """Rooms next to a draft that have not been ruled out as pits."""
+        return self._suspects(self.draft_rooms, self.no_pit)
+
+    def known_pits(self) -> int:
+        """Rooms that must hold a pit: the only suspect next to some draft."""
+        return self._certain(self.draft_rooms, self.no_pit)
+
+    def possible_bats(self) -> int:
+        """Rooms next to a bat percept that have not been ruled out as bat rooms."""
+        return self._suspects(self.bat_rooms, self.no_bats)
+
+    def possible_wumpus(self) -> int:
+        """Rooms the Wumpus may be in given every smell observed since it last moved."""
+        candidates = ALL_ROOMS & ~self.no_wumpus
+        for room in mask_rooms(self.smell_rooms):
+            candidates &= self.neighbours[room]
+        return candidates
+
+    def wumpus_room(self) -> Optional[int]:
+        """The Wumpus's room if the percepts pin it down, otherwise None."""
+        if not self.smell_rooms:
+            return None
+        candidates = self.possible_wumpus()
+        if candidates and candidates & (candidates - 1) == 0:
+            return candidates.bit_length()
+        return None
+
+    def _add_tunnel(self, a: int, b: int) -> None:
+        """Update the shortest path index with a newly seen tunnel between a and b."""
+        if self.distances[a][b] == 1:
+            return
+        distances, next_room = self.distances, self.next_room
+        rooms = range(1, NUM_ROOMS + 1)
+        # every shortest path that improves goes through the new tunnel
+        for start, end in ((a, b), (b, a)):
+            to_start = [distances[i][start] for i in rooms]
+            from_end = distances[end]
+            for i in rooms:
+                if to_start[i - 1] >= UNREACHABLE:
+                    continue
+                row = distances[i]
+                first = end if i == start else next_room[i][start]
+                via = to_start[i - 1] + 1
+                for j in rooms:
+                    d = via + from_end[j]
+                    if d < row[j]:
+                        row[j] = d
+                        next_room[i][j] = first
+
+    def distance(self, a: int, b: int) -> Optional[int]:
+        """Number of tunnels between two rooms over known tunnels, None if unknown."""
+        d = self.distances[a][b]
+        return d if d < UNREACHABLE else None
+
+    def shortest_path(self, a: int, b: int) -> Optional[List[int]]:
+        """Rooms after a on a shortest known path to b, None if unknown."""
+        if self.distances[a][b] >= UNREACHABLE:
+            return None
+        path = []
+        while a != b:
+            a = self.next_room[a][b]
+            path.append(a)
+        return path
+
+    def arrow_path(self, start: int, target: int) -> Optional[List[int]]:
+        """Shortest arrow path from start into target, None if longer than an arrow flies."""
+        if self.distances[start][target] > MAX_ARROW_ROOMS or start == target:
+            return None
+        return self.shortest_path(start, target)
+
+    def is_valid_arrow_path(self, start: int, path: List[int]) -> bool:
+        """
+        Whether an arrow shot from start follows path exactly: 1-5 rooms
+        joined by known tunnels, never doubling back to the room before last.
+        """
+        if not 1 <= len(path) <= MAX_ARROW_ROOMS:
+            return False
+        previous, current = None, start
+        for room in path:
+            if not 1 <= room <= NUM_ROOMS or self.distances[current][room] != 1:
+                return False
+            if room == previous:
+                return False
+            previous, current = current, room
+        return True
+
+    def _suspects(self, percept_rooms: int, ruled_out: int) -> int:
+        suspects = 0
+        for room in mask_rooms(percept_rooms):
+            suspects |= self.neighbours[room] & ~ruled_out
+        return suspects
+
+    def _certain(self, percept_rooms: int, ruled_out: int) -> int:
+        certain = 0
+        for room in mask_rooms(percept_rooms):
+            suspects = self.neighbours[room] & ~ruled_out
+            if suspects and suspects & (suspects - 1) == 0:
+                certain |= suspects
+        return certain
@@ -0,0 +1,165 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from game_handler import WumpusGameState
+
+logger = logging.getLogger(__name__)
+
+# rough token estimate used for the context budget
+CHARS_PER_TOKEN = 4
+# most recent rooms listed in the summary of compacted turns
+SUMMARY_PATH_ROOMS = 30
+
+
+@dataclass
+class TurnRecord:
+    """One turn of the conversation: the state prompt and the action taken."""
+
+    prompt: str
+    action: object
+    room: int
+    hazards: List[str]
+    # size counted against the budget when the turn was added
+    chars: int = 0
+
+    @property
+    def response(self) -> str:
+        # serialized on use, as a streamed action's reasoning arrives after
+        # the turn is added
+        return self.action.model_dump_json(exclude_none=True)
+
+
+def state_hazards(game_state: WumpusGameState) -> List[str]:
+    """Names of the hazards sensed in a state."""
+    hazards = []
+    if game_state.draft_felt:
+        hazards.append("draft")
+    if game_state.wumpus_smell:
+        hazards.append("smell")
+    if game_state.bat_nearby:
+        hazards.append("bats")
+    return hazards
+
+
+class ConversationMemory:
+    """
+    Append-only message history of one game, bounded by a token budget.
+
+    Every request repeats the previous request's messages and adds the last
+    action and the new state, so the server can reuse the KV cache of the
+    whole history. Once the history exceeds the budget, all but the most
+    recent turns are folded into a structured summary message; the summary
+    then stays unchanged until the next compaction, so only compactions
+    invalidate the cached prefix.
+    """
+
+    def __init__(
+        self, system_prompt: str, token_budget: int = 2048, keep_turns: int = 4
+    ) -> None:
+        """
+        Initialize an empty history.
+
+        Args:
+            system_prompt: Static system message placed first in every request
+            token_budget: Estimated tokens of history, without the system
+                message, above which older turns are compacted
+            keep_turns: Number of recent turns kept verbatim on compaction
+        """
+        self.system_prompt = system_prompt
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.turns: List[TurnRecord] = []
+        self.compactions = 0
+        self.compacted_turns = 0
+        # summary of compacted turns: rooms in visiting order, hazards per room
+        # and arrows shot
+        self._path: List[int] = []
+        self._hazards: Dict[int, List[str]] = {}
+        self._shots: List[int] = []
+        self._summary: Optional[str] = None
+        self._history_chars = 0
+
+    def messages(self, state_prompt: str) -> List[dict]:
+        """
+        Build the chat messages for a request in the current state.
+
+        Args:
+            state_prompt: Per-turn state message of the current turn
+
+        Returns:
+            System message, summary, earlier turns and the new state message
+        """
+        messages = [{"role": "system", "content": self.system_prompt}]
+        if self._summary:
+            messages.append({"role": "user", "content": self._summary})
+            messages.append({"role": "assistant", "content": "Understood."})
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn.prompt})
+            messages.append({"role": "assistant", "content": turn.response})
+        messages.append({"role": "user", "content": state_prompt})
+        return messages
+
+    def add_turn(self, game_state: WumpusGameState, state_prompt: str, action) -> None:
+        """
+        Append a turn, compacting older turns if the budget is exceeded.
+
+        Args:
+            game_state: State the action was chosen in
+            state_prompt: State message the action was chosen for
+            action: GameAction taken
+        """
+        record = TurnRecord(
+            prompt=state_prompt,
+            action=action,
+            room=game_state.current_room,
+            hazards=state_hazards(game_state),
+        )
+        record.chars = len(record.prompt) + len(record.response)
+        self.turns.append(record)
+        self._history_chars += record.chars
+        if self.context_tokens > self.token_budget and len(self.turns) > self.keep_turns:
+            self.compact()
+
+    @property
+    def context_tokens(self) -> int:
+        """Estimated tokens of the summary and the turns kept verbatim."""
+        return (len(self._summary or "") + self._history_chars) // CHARS_PER_TOKEN
+
+    def compact(self) -> None:
+        """Fold all but the most recent keep_turns turns into the summary."""
+        cut = len(self.turns) - self.keep_turns
+        if cut <= 0:
+            return
+        for turn in self.turns[:cut]:
+            self._history_chars -= turn.chars
+            if not self._path or self._path[-1] != turn.room:
+                self._path.append(turn.room)
+            if turn.hazards:
+                self._hazards[turn.room] = turn.hazards
+            if turn.action.action == "shoot":
+                self._shots.append(turn.action.room)
+        self.turns = self.turns[cut:]
+        self.compacted_turns += cut
+        self.compactions += 1
+        self._summary = self._format_summary()
+        logger.info(
+            "* Compacted %d turns into the summary (~%d tokens of context left)",
+            cut,
+            self.context_tokens,
+        )
+
+    def _format_summary(self) -> str:
+        path = self._path[-SUMMARY_PATH_ROOMS:]
+        lines = [
+            f"Summary of the first {self.compacted_turns} turns of this game:",
+            "- Rooms visited in order: " + " -> ".join(str(room) for room in path),
+        ]
+        if self._hazards:
+            hazards = "; ".join(
+                f"room {room}: {', '.join(names)}" for room, names in sorted(self._hazards.items())
+            )
+            lines.append(f"- Hazards sensed: {hazards}")
+        if self._shots:
+            lines.append("- Arrows shot into rooms: " + ", ".join(str(r) for r in self._shots))
+        return "\n".join(lines)
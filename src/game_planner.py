@@ -1,15 +1,185 @@
 import logging
 import os
-from typing import Literal, Tuple
+import textwrap
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, List, Literal, Optional, Tuple
 
-import instructor
-from litellm import completion
 from pydantic import BaseModel, Field
 
+from action_cache import ActionCache, state_fingerprint
+from action_stream import PartialActionParser, chunk_content
+from game_engine import CAVE
 from game_handler import WumpusGameInterface, WumpusGameState
+from game_knowledge import MAX_ARROW_ROOMS, mask_rooms, room_bit
+from game_memory import ConversationMemory
+from llm_dispatcher import ActionDispatcher
+from llm_router import EndpointRouter
+from tracing import span
 
 logger = logging.getLogger(__name__)
 
+# bump whenever the action prompt changes so cached actions are not reused
+PROMPT_VERSION = "4"
+
+# static part of the prompt, byte-identical across turns and games so the
+# server can reuse the KV cache for it; keep per-turn values out of here
+SYSTEM_PROMPT = textwrap.dedent("""\
+    You are a game-playing agent that must respond with ONLY a JSON object.
+    DO NOT include any other text, explanations, or code blocks.
+    The JSON must have exactly these fields:
+    - "action": either "move" or "shoot"
+    - "room": an integer room number
+    - "path": (only for shoot actions) list of 1-5 rooms the arrow flies through, starting with "room"
+    - "reasoning": brief explanation (maximum 200 characters)
+
+    Strategy to follow: To win the game of Hunt the Wumpus, I will adopt a strategic approach that prioritizes safe exploration,
+    efficient use of hazard indicators, and optimal arrow usage. Here's a high-level strategy:
+
+    1. Safe exploration:
+    I will start by exploring adjacent rooms and use the hazard indicators to identify dangerous areas. I will avoid rooms with
+    drafts, foul smells, or bat sounds, as they may contain the Wumpus or pits. I will also keep track of the room connectivity
+    and navigate through safe paths.
+
+    2. Using hazard indicators:
+    I will pay close attention to the hazard indicators (drafts, smells, bat sounds) and use them to make informed decisions about
+    which rooms to explore next. For instance, if I detect a draft or a foul smell in a room, I will avoid it and move on to the
+    next room. If I hear bat sounds, I will mark that room as a potential location of the Wumpus and avoid it for the time being.
+
+    3. Risk assessment for movements:
+    I will assess the risk of each movement carefully before making a decision. I will consider the information I have gathered
+    from the hazard indicators and the connectivity of the rooms. I will also prioritize exploring rooms that are less risky based
+    on the available information.
+
+    4. Optimal arrow usage:
+    I will use my arrows strategically to eliminate potential Wumpus locations. I will aim for rooms that have a high probability
+    of containing the Wumpus based on the hazard indicators and room connectivity. I will also consider the risk of each shot and
+    avoid taking unnecessary risks. I will try to save at least one arrow for the final shot, if possible.
+
+    5. Room connectivity and navigation:
+    I will keep track of the room connectivity and use it to navigate through the caves efficiently. I will try to explore rooms
+    that are connected to each other, as they are less risky than exploring rooms that are isolated. I will also try to create a
+    mental map of the cave system to help me navigate through it more effectively.
+
+    By following this strategy, I aim to explore the cave system safely, identify the location of the Wumpus, and eliminate it using
+    my arrows efficiently.
+
+    When deciding on the next action, consider:
+    1. Prioritize unexplored rooms unless there is a clear danger based on detected hazards
+    2. If you smell a Wumpus and have arrows, consider shooting before moving
+    3. NEVER enter a room where you've detected a Wumpus smell unless you've shot an arrow first
+    4. Avoid moving back to the previous room unless absolutely necessary
+    5. If all adjacent rooms have been explored:
+       - If you smell a Wumpus, SHOOT in the most likely direction
+       - Otherwise, move through an explored room to reach unexplored areas
+
+    RESPOND WITH ONLY A SINGLE JSON OBJECT:
+    For move actions:
+    {"action": "move", "room": <adjacent_room>, "reasoning": "<brief_reason>"}
+
+    For shoot actions (the arrow flies through every room of the path, each connected to the one before):
+    {"action": "shoot", "room": <adjacent_room>, "path": [<adjacent_room>, ...], "reasoning": "<brief_reason>"}
+
+    REQUIREMENTS:
+    1. reasoning must be less than 200 characters
+    2. room must be an integer
+    3. DO NOT include code blocks, explanations, or any other text
+    4. DO NOT use placeholders like <adjacent_room> - use actual numbers
+""")
+
+
+def format_state_prompt(
+    game_state: WumpusGameState, arrow_paths: Optional[Dict[int, List[int]]] = None
+) -> str:
+    """
+    Format the per-turn part of the prompt describing the current game state.
+
+    Args:
+        game_state: Current WumpusGameState
+        arrow_paths: Arrow paths to the rooms the Wumpus may be in, by room
+
+    Returns:
+        User message placed after the static system prompt
+    """
+    unexplored_adjacent = [
+        room for room in game_state.adjacent if not game_state.explored_mask & room_bit(room)
+    ]
+    smell_warning = " (IMMEDIATE DANGER - CONSIDER SHOOTING!)" if game_state.wumpus_smell else ""
+    arrow_line = ""
+    if arrow_paths:
+        paths = "; ".join(f"room {room}: {path}" for room, path in sorted(arrow_paths.items()))
+        arrow_line = f"\n        - Arrow paths to possible Wumpus rooms: {paths}"
+
+    return textwrap.dedent(f"""\
+        Current game state:
+        - You are in room {game_state.current_room}
+        - Adjacent rooms: {game_state.adjacent_rooms}
+        - UNEXPLORED adjacent rooms: {', '.join(str(x) for x in sorted(unexplored_adjacent))}
+        - Already explored rooms: {', '.join(str(x) for x in mask_rooms(game_state.explored_mask))}
+        - Hazards detected:
+          * Bats nearby: {game_state.bat_nearby}
+          * Draft felt: {game_state.draft_felt}
+          * Wumpus smell: {game_state.wumpus_smell}{smell_warning}
+        - Arrows remaining: {game_state.arrows_left}{arrow_line}
+        - Previous game output: {game_state.last_output}
+
+        Based on the current game state and strategy, what should be the next action?
+    """)
+
+
+@dataclass
+class LLMCallStats:
+    """Token usage and timing of a single LLM call."""
+
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    latency: float
+    prompt_ms: Optional[float] = None
+    retries: int = 0
+    endpoint: Optional[str] = None
+    # time until the action was known, before the rest of a streamed response
+    decision_latency: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        if self.decision_latency is None:
+            self.decision_latency = self.latency
+
+    @classmethod
+    def from_completion(cls, completion, latency: float, retries: int = 0) -> "LLMCallStats":
+        """
+        Extract usage from a raw completion response.
+
+        Uses the OpenAI usage fields and, when present, the llama.cpp "timings"
+        block, which reports how many prompt tokens were actually evaluated.
+        """
+        usage = getattr(completion, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+
+        prompt_ms = None
+        timings = getattr(completion, "timings", None)
+        if isinstance(timings, dict):
+            prompt_ms = timings.get("prompt_ms")
+            if "cache_n" in timings:
+                cached_tokens = timings["cache_n"]
+            elif "prompt_n" in timings and prompt_tokens:
+                cached_tokens = max(prompt_tokens - timings["prompt_n"], 0)
+
+        # the server that answered, as recorded by litellm or the EndpointRouter
+        hidden = getattr(completion, "_hidden_params", None)
+        endpoint = hidden.get("api_base") if isinstance(hidden, dict) else None
+
+        return cls(
+            prompt_tokens, completion_tokens, cached_tokens, latency, prompt_ms, retries, endpoint
+        )
+
 
 class GameAction(BaseModel):
     """
@@ -30,12 +200,14 @@ class GameAction(BaseModel):
         examples=[1, 13, 11],
     )
 
-    # num_rooms: int = Field(
-    #     description="The number of rooms to shoot through with an arrow. Must be a positive integer, 1-5.",
-    #     ge=1,
-    #     le=5,
-    #     examples=[1, 2, 3, 4, 5]
-    # )
+    path: Optional[List[int]] = Field(
+        default=None,
+        description="Only for shoot actions: the 1-5 rooms the arrow flies through, starting with room. "
+        "Each room must be connected to the one before it.",
+        min_length=1,
+        max_length=MAX_ARROW_ROOMS,
+        examples=[[2], [2, 10, 9]],
+    )
 
     reasoning: str = Field(
         description="A brief explanation of why this action was chosen, considering strategy and available information "
@@ -49,136 +221,845 @@ class GameAction(BaseModel):
         ],
     )
 
+    def arrow_path(self) -> List[int]:
+        """Rooms the arrow of a shoot action flies through, starting with room."""
+        if not self.path:
+            return [self.room]
+        path = self.path if self.path[0] == self.room else [self.room] + self.path
+        return path[:MAX_ARROW_ROOMS]
+
+
+class ActionGenerationError(Exception):
+    """
+    Raised when no valid action could be generated, with the retries spent on
+    it and the stats of a completed LLM call whose response was rejected.
+    """
+
+    def __init__(
+        self, message: str, retries: int = 0, call: Optional["LLMCallStats"] = None
+    ) -> None:
+        super().__init__(message)
+        self.retries = retries
+        self.call = call
+
+
+class SpeculationCancelled(Exception):
+    """Raised by a discarded speculation that gave up before sending its request."""
+
+
+def action_schema(game_state: WumpusGameState) -> dict:
+    """
+    JSON schema of GameAction with room limited to the current adjacent rooms.
+
+    Passed to the server as a response_format constraint, which llama.cpp
+    compiles into a grammar, so the model can only produce legal actions.
+
+    Args:
+        game_state: Current WumpusGameState
+
+    Returns:
+        JSON schema dict
+    """
+    schema = GameAction.model_json_schema()
+    if game_state.adjacent:
+        schema["properties"]["room"]["enum"] = sorted(game_state.adjacent)
+    schema["additionalProperties"] = False
+    return schema
+
+
+def create_client():
+    """Create the instructor client used to generate actions."""
+    # imported on first use: litellm and instructor take seconds to import,
+    # which tests and DB-only tools should not pay for
+    import instructor
+    from litellm import completion
+
+    return instructor.from_litellm(completion, mode=instructor.Mode.JSON)
+
+
+def stream_completion(**kwargs) -> Iterator:
+    """Stream the raw chunks of a chat completion through litellm."""
+    from litellm import completion
+
+    return completion(stream=True, stream_options={"include_usage": True}, **kwargs)
+
+
+# placeholder reasoning of a streamed action until its reasoning has arrived
+STREAMING_REASONING = "Decided while streaming, reasoning pending."
+
+
+@dataclass
+class _PendingStream:
+    """The rest of a streamed response, read after its action was decided."""
+
+    chunks: Iterator
+    parser: PartialActionParser
+    action: GameAction
+    call: LLMCallStats
+    start: float
+    tokens: int
+    usage: object
+    cache_key: Optional[str]
+    thread: Optional[threading.Thread] = None
+
 
 class GamePlanner:
-    def __init__(self, game_handler: WumpusGameInterface) -> None:
+    def __init__(
+        self,
+        game_handler: WumpusGameInterface,
+        llm_semaphore: Optional[threading.Semaphore] = None,
+        dispatcher: Optional[ActionDispatcher] = None,
+        cache: Optional[ActionCache] = None,
+        cache_prompt: bool = True,
+        fast_path: bool = False,
+        max_retries: int = 1,
+        client=None,
+        speculate: bool = False,
+        constrained: bool = False,
+        fallback: bool = False,
+        stream: bool = False,
+        stream_max_tokens: Optional[int] = None,
+        stream_client: Optional[Callable[..., Iterator]] = None,
+        conversation: bool = False,
+        context_budget: int = 2048,
+        policy=None,
+        policy_threshold: float = 0.9,
+    ) -> None:
         """
         Initialize the game planner with a game handler instance.
 
         Args:
             game_handler: Instance of the WumpusGameInterface
+            llm_semaphore: Optional semaphore shared between planners to cap
+                the number of in-flight LLM requests
+            dispatcher: Optional ActionDispatcher shared between planners that
+                coalesces their requests into batches
+            cache: Optional ActionCache consulted before calling the LLM,
+                unused with conversation
+            cache_prompt: Ask the server to reuse its KV cache for the shared
+                prompt prefix (llama.cpp "cache_prompt" option)
+            fast_path: Act without an LLM call when the game handler's
+                knowledge base proves the move safe or locates the Wumpus
+            max_retries: Number of attempts instructor makes to get a valid
+                action, failed attempts are counted as retries
+            client: instructor client to use instead of creating one, e.g. an
+                EndpointRouter spreading requests over several servers
+            speculate: While a move is executed, generate the action for the
+                predicted resulting state in the background and use it if the
+                observed state matches. A missed speculation still waiting for
+                the LLM semaphore gives up; one whose request was already sent
+                cannot be cancelled and is counted in wasted_speculations
+            constrained: Send the action JSON schema, with room limited to the
+                adjacent rooms, as a response_format constraint
+            fallback: Choose a legal move when no valid action can be
+                generated instead of raising
+            stream: Stream the response and act as soon as the action and a
+                valid room are known; the reasoning is read in the background
+                while the action executes. Streamed requests bypass the
+                dispatcher and go to stream_client
+            stream_max_tokens: Stop reading a streamed response after this
+                many tokens, cutting the reasoning short
+            stream_client: Function returning the chunks of a streamed chat
+                completion; the router's if the client is an EndpointRouter,
+                otherwise litellm
+            conversation: Send the game's earlier states and actions with
+                every request as an append-only history
+            context_budget: Estimated tokens of conversation history above
+                which older turns are compacted into a summary
+            policy: Optional DistilledPolicy answering instead of the LLM
+                when its confidence reaches policy_threshold
+            policy_threshold: Minimum probability of the policy's action
         """
         self.game_handler = game_handler
         self.action_generation_errors = 0
+        self.llm_semaphore = llm_semaphore
+        self.dispatcher = dispatcher
+        self.cache = cache
+        self.cache_prompt = cache_prompt
+        self.llm_calls: List[LLMCallStats] = []
+        self.fast_path = fast_path
+        self.fast_path_actions = 0
+        self.max_retries = max_retries
+        self.constrained = constrained
+        self.fallback = fallback
+        # validation retries over all requests and turns decided by the fallback
+        self.validation_retries = 0
+        self.fallback_actions = 0
+        self.policy = policy
+        self.policy_threshold = policy_threshold
+        self.policy_actions = 0
+        # how the last action was decided ("llm", "cache", "fast_path") and
+        # the stats of its LLM call, for per-turn telemetry
+        self.last_decision_source: Optional[str] = None
+        self.last_llm_call: Optional[LLMCallStats] = None
+
+        self.speculate = speculate
+        self.speculations = 0
+        self.speculation_hits = 0
+        # LLM time that overlapped game I/O on speculation hits
+        self.speculation_time_saved = 0.0
+        # missed speculations whose LLM request was sent anyway
+        self.wasted_speculations = 0
+        # (fingerprint of the predicted state, start time, future of _decide,
+        # event cancelling it before its request is sent)
+        self._speculation: Optional[Tuple[str, float, Future, threading.Event]] = None
+        # discarded speculations, counted once they finish
+        self._discarded: List[Future] = []
+        self._executor = ThreadPoolExecutor(max_workers=1) if speculate else None
+
+        self.stream = stream
+        self.stream_max_tokens = stream_max_tokens
+        self.stream_client = stream_client
+        self._pending_stream: Optional[_PendingStream] = None
+
+        self.memory = ConversationMemory(SYSTEM_PROMPT, context_budget) if conversation else None
 
         self.model_name = os.environ.get("LITELLM_MODEL")
-        self.client = instructor.from_litellm(completion, mode=instructor.Mode.JSON)
+        if client is None:
+            client = dispatcher.client if dispatcher else create_client()
+        self.client = client
+        if self.stream_client is None:
+            # streams are spread over the router's endpoints like other requests
+            if isinstance(client, EndpointRouter):
+                self.stream_client = client.stream_completion
+            else:
+                self.stream_client = stream_completion
 
         logger.info("* Initialized GamePlanner")
 
-    def get_next_action(self, game_state: WumpusGameState) -> GameAction:
+    def build_messages(
+        self, game_state: WumpusGameState, arrow_paths: Optional[Dict[int, List[int]]] = None
+    ) -> List[dict]:
         """
-        Determine the next action based on current game state and strategy.
+        Build the chat messages for the action request.
+
+        The system message is identical for every turn and game so the server
+        can reuse its cached prefix, only the user message carries game state.
+        In conversation mode the game's earlier turns come in between.
 
         Args:
             game_state: Current WumpusGameState
+            arrow_paths: Arrow paths shown in the prompt, looked up if None
 
         Returns:
-            GameAction object containing the next action to take
+            List of chat messages
         """
+        state_prompt = self.state_prompt(game_state, arrow_paths)
+        if self.memory:
+            return self.memory.messages(state_prompt)
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": state_prompt},
+        ]
+
+    def state_prompt(
+        self, game_state: WumpusGameState, arrow_paths: Optional[Dict[int, List[int]]] = None
+    ) -> str:
+        """Per-turn user message describing the game state."""
+        if arrow_paths is None:
+            arrow_paths = self.wumpus_arrow_paths(game_state)
+        return format_state_prompt(game_state, arrow_paths)
+
+    def wumpus_arrow_paths(self, game_state: WumpusGameState) -> Dict[int, List[int]]:
+        """
+        Shortest arrow paths from the current room to every room the Wumpus may
+        be in, once it has been smelled.
+
+        Args:
+            game_state: Current WumpusGameState
+
+        Returns:
+            Mapping of possible Wumpus room to arrow path, empty without a smell
+        """
+        knowledge = self.game_handler.knowledge
+        if not knowledge.smell_rooms or game_state.arrows_left <= 0:
+            return {}
+        paths = {}
+        for room in mask_rooms(knowledge.possible_wumpus()):
+            path = knowledge.arrow_path(game_state.current_room, room)
+            if path:
+                paths[room] = path
+        return paths
+
+    def checked_arrow_path(self, game_state: WumpusGameState, action: GameAction) -> List[int]:
+        """
+        Longest prefix of the action's arrow path the arrow can follow.
 
-        # add system message to enforce response format
-        system_message = """
-        You are a game-playing agent that must respond with ONLY a JSON object.
-        DO NOT include any other text, explanations, or code blocks.
-        The JSON must have exactly these fields:
-        - "action": either "move" or "shoot"
-        - "room": an integer room number
-        - "num_rooms": (only for shoot actions) integer 1-5
-        - "reasoning": brief explanation (maximum 200 characters)"""
+        The first room is always kept; later rooms are kept while each one is
+        joined to the previous one by a known tunnel without doubling back.
+        """
+        path = action.arrow_path()
+        knowledge = self.game_handler.knowledge
+        length = 1
+        while length < len(path) and knowledge.is_valid_arrow_path(
+            game_state.current_room, path[: length + 1]
+        ):
+            length += 1
+        return path[:length]
+
+    def deterministic_action(self, game_state: WumpusGameState) -> Optional[GameAction]:
+        """
+        Return the forced action for states the knowledge base can decide alone.
+
+        Shoots when the Wumpus's room is certain and adjacent, otherwise moves
+        to an unvisited adjacent room proven free of pits, the Wumpus and bats.
+
+        Args:
+            game_state: Current WumpusGameState
+
+        Returns:
+            GameAction, or None if the decision needs the LLM
+        """
+        knowledge = self.game_handler.knowledge
+
+        wumpus_room = knowledge.wumpus_room()
+        if wumpus_room is not None and game_state.arrows_left > 0:
+            path = knowledge.arrow_path(game_state.current_room, wumpus_room)
+            if path:
+                return GameAction(
+                    action="shoot",
+                    room=path[0],
+                    path=path,
+                    reasoning=f"The Wumpus can only be in room {wumpus_room}, shooting it.",
+                )
 
-        unexplored_adjacent = [
+        safe_unvisited = [
             room
-            for room in game_state.adjacent_rooms
-            if room not in game_state.explored_rooms
+            for room in sorted(game_state.adjacent)
+            if knowledge.is_safe(room) and not knowledge.is_visited(room)
         ]
+        if safe_unvisited:
+            room = safe_unvisited[0]
+            return GameAction(
+                action="move",
+                room=room,
+                reasoning=f"Room {room} is unexplored and proven free of hazards.",
+            )
 
-        action_prompt = f"""
-        Current game state:
-        - You are in room {game_state.current_room}
-        - Adjacent rooms: {game_state.adjacent_rooms}
-        - UNEXPLORED adjacent rooms: {', '.join(str(x) for x in sorted(unexplored_adjacent))}
-        - Hazards detected:
-          * Bats nearby: {game_state.bat_nearby}
-          * Draft felt: {game_state.draft_felt}
-          * Wumpus smell: {game_state.wumpus_smell} {'(IMMEDIATE DANGER - CONSIDER SHOOTING!)' if game_state.wumpus_smell else ''}
-        - Arrows remaining: {game_state.arrows_left}
-        
-        Strategy to follow: To win the game of Hunt the Wumpus, I will adopt a strategic approach that prioritizes safe exploration, 
-        efficient use of hazard indicators, and optimal arrow usage. Here's a high-level strategy:
-
-        1. Safe exploration:
-        I will start by exploring adjacent rooms and use the hazard indicators to identify dangerous areas. I will avoid rooms with 
-        drafts, foul smells, or bat sounds, as they may contain the Wumpus or pits. I will also keep track of the room connectivity 
-        and navigate through safe paths.
-
-        2. Using hazard indicators:
-        I will pay close attention to the hazard indicators (drafts, smells, bat sounds) and use them to make informed decisions about 
-        which rooms to explore next. For instance, if I detect a draft or a foul smell in a room, I will avoid it and move on to the 
-        next room. If I hear bat sounds, I will mark that room as a potential location of the Wumpus and avoid it for the time being.
-
-        3. Risk assessment for movements:
-        I will assess the risk of each movement carefully before making a decision. I will consider the information I have gathered 
-        from the hazard indicators and the connectivity of the rooms. I will also prioritize exploring rooms that are less risky based 
-        on the available information.
-
-        4. Optimal arrow usage:
-        I will use my arrows strategically to eliminate potential Wumpus locations. I will aim for rooms that have a high probability 
-        of containing the Wumpus based on the hazard indicators and room connectivity. I will also consider the risk of each shot and 
-        avoid taking unnecessary risks. I will try to save at least one arrow for the final shot, if possible.
-
-        5. Room connectivity and navigation:
-        I will keep track of the room connectivity and use it to navigate through the caves efficiently. I will try to explore rooms 
-        that are connected to each other, as they are less risky than exploring rooms that are isolated. I will also try to create a 
-        mental map of the cave system to help me navigate through it more effectively.
-
-        By following this strategy, I aim to explore the cave system safely, identify the location of the Wumpus, and eliminate it using 
-        my arrows efficiently.
-        
-        Based on the current game state and strategy, what should be the next action?
+        return None
 
-        Consider:
-        1. Prioritize unexplored rooms unless there is a clear danger based on detected hazards
-           - You have already explored these rooms: {', '.join(str(x) for x in sorted(game_state.explored_rooms))}
-        2. If you smell a Wumpus and have arrows, consider shooting before moving
-        3. NEVER enter a room where you've detected a Wumpus smell unless you've shot an arrow first
-        4. Avoid moving back to the previous room unless absolutely necessary
-        5. If all adjacent rooms have been explored:
-           - If you smell a Wumpus, SHOOT in the most likely direction
-           - Otherwise, move through an explored room to reach unexplored areas
-        6. Previous game output: {game_state.last_output}
+    def policy_action(self, game_state: WumpusGameState) -> Optional[GameAction]:
+        """
+        Return the distilled policy's action if it is confident enough.
 
-        RESPOND WITH ONLY A SINGLE JSON OBJECT:
-        For move actions:
-        {{"action": "move", "room": <adjacent_room>, "reasoning": "<brief_reason>"}}
+        Args:
+            game_state: Current WumpusGameState
 
-        For shoot actions:
-        {{"action": "shoot", "room": <target_room>, "reasoning": "<brief_reason>"}}
+        Returns:
+            GameAction, or None if the decision needs the LLM
+        """
+        decision = self.policy.decide(game_state, self.game_handler.knowledge)
+        if decision is None or decision.confidence < self.policy_threshold:
+            return None
+        logger.info(
+            "* Policy action: %s %s (%.0f%% confident)",
+            decision.action,
+            decision.room,
+            decision.confidence * 100,
+        )
+        return GameAction(
+            action=decision.action,
+            room=decision.room,
+            reasoning=f"Distilled policy, {decision.confidence:.0%} confident.",
+        )
 
-        REQUIREMENTS:
-        1. reasoning must be less than 200 characters
-        2. room must be an integer
-        3. DO NOT include code blocks, explanations, or any other text
-        4. DO NOT use placeholders like <adjacent_room> - use actual numbers
+    def get_next_action(self, game_state: WumpusGameState) -> GameAction:
         """
+        Determine the next action based on current game state and strategy.
 
-        try:
-            action = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": action_prompt},
-                ],
-                response_model=GameAction,
+        Args:
+            game_state: Current WumpusGameState
+
+        Returns:
+            GameAction object containing the next action to take
+        """
+        self.last_decision_source = None
+        self.last_llm_call = None
+
+        with span("planner.get_next_action", room=game_state.current_room) as decision_span:
+            rejected_call = None
+            try:
+                action, source, call = self._decide(game_state)
+            except Exception as e:
+                logger.error("* Error generating action: %s", str(e))
+                self.action_generation_errors += 1
+                self.validation_retries += getattr(e, "retries", 0)
+                # a rejected response was still generated and paid for
+                rejected_call = getattr(e, "call", None)
+                if rejected_call is not None:
+                    self.llm_calls.append(rejected_call)
+                    self.last_llm_call = rejected_call
+                if not self.fallback or not game_state.adjacent:
+                    raise
+                action, source, call = self.fallback_action(game_state), "fallback", None
+                logger.info("* Fallback action: %s %s", action.action, action.room)
+
+            self._record_decision(source, call)
+            if rejected_call is not None:
+                self.last_llm_call = rejected_call
+            decision_span.set(source=source, action=action.action, target=action.room)
+            if call is not None:
+                decision_span.set(
+                    prompt_tokens=call.prompt_tokens, completion_tokens=call.completion_tokens
+                )
+        return action
+
+    def _decide(
+        self,
+        game_state: WumpusGameState,
+        use_fast_path: bool = True,
+        early_decision: bool = True,
+        cancelled: Optional[threading.Event] = None,
+        arrow_paths: Optional[Dict[int, List[int]]] = None,
+    ) -> Tuple[GameAction, str, Optional[LLMCallStats]]:
+        """
+        Decide an action without touching the planner's counters, so it can
+        also run in the background for a speculative state.
+
+        Args:
+            game_state: Current WumpusGameState
+            use_fast_path: Try the deterministic fast path first
+            early_decision: Return a streamed action as soon as it is
+                decided, reading the rest of the response in the background
+            cancelled: Event giving up the decision, with SpeculationCancelled,
+                while it waits to send its request
+            arrow_paths: Arrow paths shown in the prompt, looked up from the
+                knowledge base if None
+
+        Returns:
+            Tuple of (action, decision source, stats of the LLM call if made)
+        """
+        if self.fast_path and use_fast_path:
+            action = self.deterministic_action(game_state)
+            if action is not None:
+                logger.info("* Fast path action: %s %s", action.action, action.room)
+                return action, "fast_path", None
+        if self.policy is not None and use_fast_path:
+            action = self.policy_action(game_state)
+            if action is not None:
+                return action, "policy", None
+
+        from tenacity import Retrying, stop_after_attempt
+
+        # failed validation attempts of this request, collected by tenacity
+        failed_attempts: List[int] = []
+        if arrow_paths is None:
+            arrow_paths = self.wumpus_arrow_paths(game_state)
+        request = dict(
+            model=self.model_name,
+            messages=self.build_messages(game_state, arrow_paths),
+            response_model=GameAction,
+            max_retries=Retrying(
+                stop=stop_after_attempt(self.max_retries),
+                after=lambda retry_state: failed_attempts.append(retry_state.attempt_number),
+                reraise=True,
+            ),
+        )
+        extra_body = {}
+        if self.cache_prompt:
+            # ask llama.cpp to reuse the KV cache of the shared prompt prefix
+            extra_body["cache_prompt"] = True
+        if self.constrained:
+            extra_body["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "GameAction", "schema": action_schema(game_state)},
+            }
+        if extra_body:
+            request["extra_body"] = extra_body
+
+        cache_key = None
+        # keys cover the state prompt only, not a conversation's earlier turns
+        if self.cache and not self.memory:
+            cache_key = self.cache.make_key(
+                game_state, PROMPT_VERSION, self.model_name, arrow_paths
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                action = GameAction.model_validate_json(cached)
+                logger.info("* Cached action: %s %s", action.action, action.room)
+                return action, "cache", None
+
+        if self.stream:
+            action, call = self._stream_action(
+                game_state, request, cache_key, early_decision, cancelled
             )
-            logger.info("* Generated action: %s %s", action.action, action.room)
-            return action
+            return action, "llm", call
 
+        start = time.perf_counter()
+        self._acquire_llm_slot(cancelled)
+        try:
+            with span("llm.request", model=self.model_name):
+                if self.dispatcher:
+                    action, completion = self.dispatcher.create_with_completion(**request)
+                else:
+                    action, completion = self.client.chat.completions.create_with_completion(
+                        **request
+                    )
         except Exception as e:
-            logger.error("* Error generating action: %s", str(e))
-            self.action_generation_errors += 1
+            # the final failed attempt is not a retry
+            raise ActionGenerationError(str(e), max(len(failed_attempts) - 1, 0)) from e
+        finally:
+            if self.llm_semaphore:
+                self.llm_semaphore.release()
+        call = LLMCallStats.from_completion(
+            completion, time.perf_counter() - start, retries=len(failed_attempts)
+        )
+        if self.constrained and game_state.adjacent and (
+            action.room not in game_state.adjacent
+        ):
+            raise ActionGenerationError(
+                f"Room {action.room} is not adjacent", len(failed_attempts), call
+            )
+        logger.info(
+            "* Generated action: %s %s (prompt tokens: %d, cached: %d, prompt eval: %s, "
+            "latency: %.2fs)",
+            action.action,
+            action.room,
+            call.prompt_tokens,
+            call.cached_tokens,
+            "n/a" if call.prompt_ms is None else f"{call.prompt_ms:.0f}ms",
+            call.latency,
+        )
+        if cache_key:
+            self.cache.put(cache_key, action.model_dump_json())
+        return action, "llm", call
+
+    def _acquire_llm_slot(self, cancelled: Optional[threading.Event]) -> None:
+        """Wait for a slot of the shared LLM semaphore, giving up once cancelled."""
+        if cancelled is not None and cancelled.is_set():
+            raise SpeculationCancelled()
+        if not self.llm_semaphore:
+            return
+        while not self.llm_semaphore.acquire(timeout=0.05 if cancelled else None):
+            if cancelled.is_set():
+                raise SpeculationCancelled()
+        if cancelled is not None and cancelled.is_set():
+            self.llm_semaphore.release()
+            raise SpeculationCancelled()
+
+    def _stream_action(
+        self,
+        game_state: WumpusGameState,
+        request: dict,
+        cache_key: Optional[str],
+        early_decision: bool,
+        cancelled: Optional[threading.Event] = None,
+    ) -> Tuple[GameAction, LLMCallStats]:
+        """
+        Generate an action from a streamed response, retrying invalid ones.
+
+        Returns:
+            Tuple of (action, stats of the LLM call)
+        """
+        # the response is parsed here instead of by instructor
+        request = {
+            key: value
+            for key, value in request.items()
+            if key not in ("response_model", "max_retries")
+        }
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return self._stream_once(game_state, request, cache_key, early_decision, cancelled)
+            except SpeculationCancelled:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise ActionGenerationError(str(e), attempt - 1) from e
+                logger.warning("* Invalid streamed action, retrying: %s", str(e))
+
+    def _stream_once(
+        self,
+        game_state: WumpusGameState,
+        request: dict,
+        cache_key: Optional[str],
+        early_decision: bool,
+        cancelled: Optional[threading.Event] = None,
+    ) -> Tuple[GameAction, LLMCallStats]:
+        # the semaphore is held until the whole response has been read
+        self._acquire_llm_slot(cancelled)
+        start = time.perf_counter()
+        parser = PartialActionParser()
+        tokens = 0
+        usage = None
+        decision = None
+        chunks = None
+        try:
+            chunks = iter(self.stream_client(**request))
+            for chunk in chunks:
+                text, chunk_usage = chunk_content(chunk)
+                usage = chunk_usage or usage
+                if text:
+                    tokens += 1
+                    parser.feed(text)
+                    decision = parser.decision()
+                    if decision is not None:
+                        break
+            if decision is None:
+                decision = parser.decision(final=True)
+            if decision is None:
+                raise ValueError(f"No action in streamed response: {parser.text!r}")
+            action = GameAction.model_validate(dict(decision, reasoning=STREAMING_REASONING))
+            if game_state.adjacent and action.room not in game_state.adjacent:
+                raise ValueError(f"Room {action.room} is not adjacent")
+        except BaseException:
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+            if self.llm_semaphore:
+                self.llm_semaphore.release()
             raise
 
+        decided = time.perf_counter() - start
+        # a RoutedStream names the endpoint serving it
+        call = LLMCallStats(
+            0, 0, 0, decided, decision_latency=decided, endpoint=getattr(chunks, "endpoint", None)
+        )
+        pending = _PendingStream(chunks, parser, action, call, start, tokens, usage, cache_key)
+        logger.info(
+            "* Streamed action: %s %s (decided after %d tokens, %.2fs)",
+            action.action,
+            action.room,
+            tokens,
+            decided,
+        )
+
+        def finish() -> None:
+            try:
+                self._read_stream(pending)
+            finally:
+                if self.llm_semaphore:
+                    self.llm_semaphore.release()
+
+        if early_decision:
+            pending.thread = threading.Thread(target=finish, name="llm-stream", daemon=True)
+            self._pending_stream = pending
+            pending.thread.start()
+        else:
+            finish()
+        return action, call
+
+    def _read_stream(self, pending: _PendingStream) -> None:
+        """Read the rest of a streamed response and complete its action and stats."""
+        cap = self.stream_max_tokens
+        try:
+            while not (cap and pending.tokens >= cap):
+                chunk = next(pending.chunks, None)
+                if chunk is None:
+                    break
+                text, usage = chunk_content(chunk)
+                pending.usage = usage or pending.usage
+                if text:
+                    pending.tokens += 1
+                    pending.parser.feed(text)
+        except Exception as e:
+            logger.warning("* Streamed response failed after the decision: %s", str(e))
+        finally:
+            close = getattr(pending.chunks, "close", None)
+            if close:
+                close()
+
+        reasoning = pending.parser.partial_string("reasoning")
+        if reasoning:
+            pending.action.reasoning = reasoning[:200]
+        call = pending.call
+        stats = LLMCallStats.from_completion(
+            SimpleNamespace(usage=pending.usage), time.perf_counter() - pending.start
+        )
+        call.latency = stats.latency
+        call.prompt_tokens = stats.prompt_tokens
+        call.cached_tokens = stats.cached_tokens
+        call.completion_tokens = stats.completion_tokens or pending.tokens
+        if pending.cache_key and pending.parser.complete:
+            self.cache.put(pending.cache_key, pending.action.model_dump_json())
+
+    def finish_stream(self) -> None:
+        """Wait for the rest of the last streamed response to be read."""
+        pending, self._pending_stream = self._pending_stream, None
+        if pending and pending.thread:
+            pending.thread.join()
+
+    def _record_decision(self, source: str, call: Optional[LLMCallStats]) -> None:
+        if source == "fast_path":
+            self.fast_path_actions += 1
+        elif source == "fallback":
+            self.fallback_actions += 1
+        elif source == "policy":
+            self.policy_actions += 1
+        if call is not None:
+            self.llm_calls.append(call)
+            self.validation_retries += call.retries
+        self.last_decision_source = source
+        self.last_llm_call = call
+
+    def fallback_action(self, game_state: WumpusGameState) -> GameAction:
+        """
+        Choose a legal move without the LLM, so a failed generation does not end the game.
+
+        Prefers unvisited rooms proven safe, then any room proven safe, then
+        unvisited rooms not suspected of a pit or the Wumpus, then any
+        unsuspected room, and finally the lowest adjacent room.
+
+        Args:
+            game_state: Current WumpusGameState
+
+        Returns:
+            GameAction moving to an adjacent room
+        """
+        knowledge = self.game_handler.knowledge
+        suspects = knowledge.possible_pits()
+        if knowledge.smell_rooms:
+            suspects |= knowledge.possible_wumpus()
+
+        rooms = sorted(game_state.adjacent)
+        preferences = [
+            lambda room: knowledge.is_safe(room) and not knowledge.is_visited(room),
+            knowledge.is_safe,
+            lambda room: not suspects & room_bit(room) and not knowledge.is_visited(room),
+            lambda room: not suspects & room_bit(room),
+        ]
+        for preferred in preferences:
+            candidates = [room for room in rooms if preferred(room)]
+            if candidates:
+                room = candidates[0]
+                break
+        else:
+            room = rooms[0]
+        return GameAction(
+            action="move",
+            room=room,
+            reasoning=f"Fallback move to room {room}, the least risky adjacent room.",
+        )
+
+    def predict_move_state(self, game_state: WumpusGameState, room: int) -> WumpusGameState:
+        """
+        Predict the state after moving to a room, assuming no hazards are near.
+
+        The room's tunnels are taken from the knowledge base if it was visited
+        before, otherwise from the standard dodecahedron cave layout.
+
+        Args:
+            game_state: State before the move
+            room: Room being moved to
+
+        Returns:
+            Predicted WumpusGameState after the move
+        """
+        tunnels = self.game_handler.knowledge.tunnels.get(room)
+        if tunnels is None:
+            tunnels = tuple(other + 1 for other in CAVE[room - 1])
+        predicted = WumpusGameState(
+            current_room=room,
+            adjacent_rooms=tunnels,
+            arrows_left=game_state.arrows_left,
+            last_output=[
+                f"YOU ARE IN ROOM {room}",
+                "TUNNELS LEAD TO " + " ".join(str(other) for other in tunnels),
+            ],
+        )
+        predicted.explored_mask = game_state.explored_mask | room_bit(room)
+        return predicted
+
+    def _start_speculation(self, game_state: WumpusGameState, action: GameAction) -> None:
+        """Start generating the action for the predicted result of a move."""
+        if not 1 <= action.room <= len(CAVE):
+            return
+        predicted = self.predict_move_state(game_state, action.room)
+        # the knowledge base is being updated by the move, so the fast path
+        # is checked on the observed state instead
+        cancelled = threading.Event()
+        # the arrow paths come from the knowledge base before the move, so
+        # the speculation only matches if the observed state shows the same
+        arrow_paths = self.wumpus_arrow_paths(predicted)
+        future = self._executor.submit(
+            self._decide, predicted, False, False, cancelled, arrow_paths
+        )
+        fingerprint = state_fingerprint(predicted, arrow_paths)
+        self._speculation = (fingerprint, time.perf_counter(), future, cancelled)
+        self.speculations += 1
+
+    def _discard_speculation(self) -> None:
+        """
+        Drop the pending speculation. One still waiting for the LLM semaphore
+        gives up; a request already sent cannot be cancelled, so its call is
+        counted by _count_discarded once it finishes.
+        """
+        _, _, future, cancelled = self._speculation
+        self._speculation = None
+        cancelled.set()
+        if not future.cancel():
+            self._discarded.append(future)
+
+    def _count_discarded(self, wait: bool = False) -> None:
+        """Add the LLM calls of finished discarded speculations to the game's calls."""
+        pending = []
+        for future in self._discarded:
+            if not wait and not future.done():
+                pending.append(future)
+                continue
+            try:
+                _, _, call = future.result()
+            except Exception:
+                # gave up before its request or failed; only the tokens of
+                # completed requests are known
+                continue
+            if call is not None:
+                self.wasted_speculations += 1
+                self.llm_calls.append(call)
+        self._discarded = pending
+
+    def _take_speculation(self, game_state: WumpusGameState) -> Optional[GameAction]:
+        """
+        Return the speculative action if it was generated for the observed
+        state, otherwise discard it.
+        """
+        self._count_discarded()
+        if self._speculation is None:
+            return None
+        fingerprint, started, future, _ = self._speculation
+
+        if fingerprint != state_fingerprint(game_state, self.wumpus_arrow_paths(game_state)):
+            self._discard_speculation()
+            logger.info("* Speculation missed")
+            return None
+        if self.fast_path and self.deterministic_action(game_state) is not None:
+            # a forced move is free, let get_next_action take it
+            self._discard_speculation()
+            return None
+        self._speculation = None
+
+        wait_start = time.perf_counter()
+        try:
+            action, source, call = future.result()
+        except Exception as e:
+            logger.warning("* Speculative action failed: %s", str(e))
+            return None
+        waited = time.perf_counter() - wait_start
+
+        self.speculation_hits += 1
+        # the part of the decision that ran while the move was executed
+        duration = call.latency if call else 0.0
+        self.speculation_time_saved += max(min(wait_start - started, duration), 0.0)
+        self._record_decision("speculative" if source == "llm" else source, call)
+        logger.info("* Speculation hit: %s %s (waited %.2fs)", action.action, action.room, waited)
+        return action
+
+    @property
+    def speculation_hit_rate(self) -> float:
+        return self.speculation_hits / self.speculations if self.speculations else 0.0
+
+    def close(self) -> None:
+        """
+        Finish reading any streamed response, discard any pending speculation
+        and stop the background executor. Discarded requests already sent are
+        waited for, so their calls and tokens are counted with the game.
+        """
+        self.finish_stream()
+        if self._speculation:
+            self._discard_speculation()
+        self._count_discarded(wait=True)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
     def execute_action(self, action: GameAction) -> WumpusGameState:
         """
         Execute the given action using the game handler.
@@ -191,12 +1072,14 @@ class GamePlanner:
         """
         logger.info("* Executing action: %s %s", action.action, action.room)
 
-        if action.action == "move":
-            self.game_handler.move(action.room)
-        elif action.action == "shoot":
-            self.game_handler.shoot(action.room)
-        else:
-            raise ValueError(f"Invalid action: {action.action}")
+        with span("planner.execute_action", action=action.action, target=action.room):
+            if action.action == "move":
+                self.game_handler.move(action.room)
+            elif action.action == "shoot":
+                state = self.game_handler.get_game_state()
+                self.game_handler.shoot(self.checked_arrow_path(state, action))
+            else:
+                raise ValueError(f"Invalid action: {action.action}")
 
         return self.game_handler.get_game_state()
 
@@ -208,6 +1091,26 @@ class GamePlanner:
             Tuple of (action taken, resulting game state)
         """
         current_state = self.game_handler.get_game_state()
-        action = self.get_next_action(current_state)
+        with span("planner.play_turn", room=current_state.current_room) as turn_span:
+            action, new_state = self._play_turn(current_state)
+            turn_span.set(action=action.action, target=action.room)
+        return action, new_state
+
+    def _play_turn(self, current_state: WumpusGameState) -> Tuple[GameAction, WumpusGameState]:
+        action = None
+        if self.speculate:
+            self.last_decision_source = None
+            self.last_llm_call = None
+            action = self._take_speculation(current_state)
+        if action is None:
+            action = self.get_next_action(current_state)
+        if self.memory:
+            self.memory.add_turn(current_state, self.state_prompt(current_state), action)
+
+        if self.speculate and action.action == "move":
+            # overlap the next decision with the game's response to this move
+            self._start_speculation(current_state, action)
         new_state = self.execute_action(action)
+        # the rest of a streamed response was read while the action executed
+        self.finish_stream()
         return action, new_state
@@ -0,0 +1,268 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+
+import pexpect
+
+from game_handler import PROMPT_PATTERNS, PROMPT_SEARCH_WINDOW, PROMPTS, GamePrompt
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PooledGame:
+    """A wumpus process waiting at the first move prompt of a fresh game."""
+
+    process: Any
+    # game output before the first "SHOOT OR MOVE" prompt, i.e. the start room
+    output: str = ""
+    # games started in this process so far
+    games: int = 0
+
+
+@dataclass
+class GamePoolStats:
+    """Snapshot of a GamePool's size and process lifecycle counters."""
+
+    size: int
+    ready: int
+    spawns: int
+    spawn_failures: int
+    mean_spawn_time: float
+    recycles: int
+    recycle_failures: int
+    mean_recycle_time: float
+    acquires: int
+    mean_acquire_wait: float
+    # spawns and recycles submitted but not finished yet
+    queued: int = 0
+
+
+class GamePool:
+    """
+    Keeps wumpus processes ready at the first move prompt.
+
+    Background threads, one per pooled process, spawn processes and answer
+    the instructions prompt ahead of time, so starting a game only hands out
+    a waiting process; a process hanging until the prompt timeout only holds
+    up its own replacement.
+    Finished games are recycled through the game's own "SAME SETUP (Y-N)"
+    prompt instead of being killed and respawned; processes that ended any
+    other way are discarded and replaced.
+    """
+
+    def __init__(
+        self,
+        size: int = 4,
+        game_cmd: str = "wumpus",
+        same_setup: bool = False,
+        max_games_per_process: Optional[int] = None,
+        timeout: float = 5,
+    ) -> None:
+        """
+        Initialize the pool and start spawning its processes.
+
+        Args:
+            size: Number of processes kept in the pool
+            game_cmd: Command starting the game
+            same_setup: Replay the previous cave setup when recycling, a new
+                random setup is dealt if False
+            max_games_per_process: Replace processes after this many games
+            timeout: Seconds to wait for a game prompt
+        """
+        self.size = size
+        self.game_cmd = game_cmd
+        self.same_setup = same_setup
+        self.max_games_per_process = max_games_per_process
+        self.timeout = timeout
+
+        # ready holds PooledGame objects, or the exception of a failed spawn
+        self._ready: "queue.Queue[Any]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._queued = 0
+        self._spawns = 0
+        self._spawn_failures = 0
+        self._spawn_time = 0.0
+        self._recycles = 0
+        self._recycle_failures = 0
+        self._recycle_time = 0.0
+        self._acquires = 0
+        self._acquire_wait = 0.0
+
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="game-pool")
+        for _ in range(size):
+            self._submit(self._spawn)
+        logger.info("* Initialized GamePool (size=%d, cmd=%s)", size, game_cmd)
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledGame:
+        """
+        Take a process waiting at the first move prompt, blocking until one is ready.
+
+        Args:
+            timeout: Seconds to wait for a ready process, forever if None
+
+        Returns:
+            PooledGame holding the process and its start room output
+        """
+        if self._closed:
+            raise RuntimeError("GamePool is closed")
+
+        start = time.perf_counter()
+        game = self._ready.get(timeout=timeout)
+        with self._stats_lock:
+            self._acquires += 1
+            self._acquire_wait += time.perf_counter() - start
+        if isinstance(game, Exception):
+            # keep the pool at its size and let the caller see the failure
+            self._submit(self._spawn)
+            raise game
+        game.games += 1
+        return game
+
+    def release(self, game: PooledGame, reusable: bool = True) -> None:
+        """
+        Return a finished game's process to the pool.
+
+        Args:
+            game: PooledGame returned by acquire
+            reusable: Whether the process is waiting at the "SAME SETUP" prompt
+        """
+        worn_out = (
+            self.max_games_per_process is not None and game.games >= self.max_games_per_process
+        )
+        if self._closed or not reusable or worn_out:
+            _terminate(game.process)
+            self._submit(self._spawn)
+            return
+        self._submit(self._refill, game)
+
+    def stats(self) -> GamePoolStats:
+        with self._stats_lock:
+            return GamePoolStats(
+                size=self.size,
+                ready=self._ready.qsize(),
+                spawns=self._spawns,
+                spawn_failures=self._spawn_failures,
+                mean_spawn_time=self._spawn_time / self._spawns if self._spawns else 0.0,
+                recycles=self._recycles,
+                recycle_failures=self._recycle_failures,
+                mean_recycle_time=self._recycle_time / self._recycles if self._recycles else 0.0,
+                acquires=self._acquires,
+                mean_acquire_wait=self._acquire_wait / self._acquires if self._acquires else 0.0,
+                queued=self._queued,
+            )
+
+    def close(self) -> None:
+        """Stop the pool threads and terminate every idle process."""
+        if self._closed:
+            return
+        self._closed = True
+        # queued spawns are dropped; running ones finish and are terminated below
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        while True:
+            try:
+                game = self._ready.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(game, PooledGame):
+                _terminate(game.process)
+        logger.info("* GamePool closed: %s", self.stats())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _submit(self, task: Callable[..., Any], *args) -> None:
+        """Run a spawn or recycle on the pool threads, putting its result in the ready queue."""
+        try:
+            if self._closed:
+                raise RuntimeError("GamePool is closed")
+            future = self._executor.submit(lambda: self._ready.put(task(*args)))
+        except RuntimeError:
+            for game in args:
+                _terminate(game.process)
+            return
+        with self._stats_lock:
+            self._queued += 1
+        # also called for tasks cancelled by close
+        future.add_done_callback(self._task_done)
+
+    def _task_done(self, future) -> None:
+        with self._stats_lock:
+            self._queued -= 1
+
+    def _refill(self, game: PooledGame):
+        game = self._recycle(game)
+        # a process that cannot be recycled is replaced by a new one
+        return game if game is not None else self._spawn()
+
+    def _spawn(self):
+        """Start a process and answer its instructions prompt, or return the error."""
+        start = time.perf_counter()
+        process = None
+        try:
+            process = pexpect.spawn(self.game_cmd)
+            _, prompt = self._expect(process)
+            if prompt is not GamePrompt.INSTRUCTIONS:
+                raise RuntimeError(f"Expected the instructions prompt, got {prompt.name}")
+            process.sendline("N")
+            output, prompt = self._expect(process)
+            if prompt is not GamePrompt.ACTION:
+                raise RuntimeError(f"Expected the first move prompt, got {prompt.name}")
+        except Exception as e:
+            logger.error("* Failed to spawn game process: %s", str(e))
+            if process is not None:
+                _terminate(process)
+            with self._stats_lock:
+                self._spawn_failures += 1
+            return e
+
+        with self._stats_lock:
+            self._spawns += 1
+            self._spawn_time += time.perf_counter() - start
+        return PooledGame(process, output)
+
+    def _recycle(self, game: PooledGame) -> Optional[PooledGame]:
+        """Start a new game in a finished process, None if it did not get there."""
+        start = time.perf_counter()
+        try:
+            game.process.sendline("Y" if self.same_setup else "N")
+            output, prompt = self._expect(game.process)
+        except Exception as e:
+            logger.debug("* Recycling game process failed: %s", str(e))
+            prompt = GamePrompt.UNKNOWN
+
+        if prompt is not GamePrompt.ACTION:
+            _terminate(game.process)
+            with self._stats_lock:
+                self._recycle_failures += 1
+            return None
+
+        with self._stats_lock:
+            self._recycles += 1
+            self._recycle_time += time.perf_counter() - start
+        game.output = output
+        return game
+
+    def _expect(self, process) -> Tuple[str, GamePrompt]:
+        try:
+            index = process.expect_list(
+                PROMPT_PATTERNS, timeout=self.timeout, searchwindowsize=PROMPT_SEARCH_WINDOW
+            )
+        except pexpect.TIMEOUT:
+            return "", GamePrompt.UNKNOWN
+        return process.before.decode("utf-8").strip(), PROMPTS[index]
+
+
+def _terminate(process) -> None:
+    try:
+        process.terminate(force=True)
+    except OSError as e:
+        logger.debug("* Process already terminated: %s", str(e))
@@ -0,0 +1,197 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DispatcherStats:
+    """Snapshot of the dispatcher's queue and batching statistics."""
+
+    # requests not sent yet, whether collecting into a batch or waiting for a worker
+    queue_depth: int
+    submitted: int
+    completed: int
+    failed: int
+    batches: int
+    mean_batch_size: float
+    max_batch_size: int
+    batch_size_histogram: Dict[int, int] = field(default_factory=dict)
+
+
+@dataclass
+class _PendingRequest:
+    kwargs: Dict[str, Any]
+    future: Future
+    enqueued_at: float
+
+
+class ActionDispatcher:
+    """
+    Coalesces chat completion requests from many planners into batches.
+
+    Requests submitted within a short window (or until the batch size cap is
+    reached) are sent to the server together as concurrent requests, so that
+    llama.cpp/llamafile can decode them in parallel slots. Every caller gets
+    its own validated response model back through a future.
+    """
+
+    def __init__(
+        self,
+        client,
+        window_ms: float = 20.0,
+        max_batch_size: int = 8,
+        max_concurrency: Optional[int] = None,
+    ) -> None:
+        """
+        Initialize the dispatcher and start its collector thread.
+
+        Args:
+            client: instructor client used to send the requests
+            window_ms: Time to wait for more requests after the first one arrives
+            max_batch_size: Maximum number of requests sent in one batch
+            max_concurrency: Maximum number of requests in flight at once,
+                defaults to max_batch_size
+        """
+        self.client = client
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._queue: "queue.Queue[Optional[_PendingRequest]]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency or max_batch_size,
+            thread_name_prefix="llm-dispatch",
+        )
+        self._stats_lock = threading.Lock()
+        self._submitted = 0
+        # requests of dispatched batches that are waiting for a free worker
+        self._waiting = 0
+        self._completed = 0
+        self._failed = 0
+        self._batch_sizes: Counter = Counter()
+
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="llm-dispatcher", daemon=True)
+        self._thread.start()
+        logger.info(
+            "* Initialized ActionDispatcher (window=%.0fms, max_batch_size=%d)",
+            window_ms,
+            max_batch_size,
+        )
+
+    def submit(self, **kwargs) -> Future:
+        """
+        Queue a chat completion request.
+
+        Args:
+            **kwargs: Arguments for client.chat.completions.create_with_completion
+
+        Returns:
+            Future resolving to a (response model, raw completion) tuple
+        """
+        if self._closed:
+            raise RuntimeError("ActionDispatcher is closed")
+
+        future: Future = Future()
+        with self._stats_lock:
+            self._submitted += 1
+        self._queue.put(_PendingRequest(kwargs, future, time.perf_counter()))
+        return future
+
+    def create_with_completion(self, **kwargs):
+        """Submit a request and block until its response is available."""
+        return self.submit(**kwargs).result()
+
+    def stats(self) -> DispatcherStats:
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            requests = sum(size * count for size, count in self._batch_sizes.items())
+            return DispatcherStats(
+                queue_depth=self._queue.qsize() + self._waiting,
+                submitted=self._submitted,
+                completed=self._completed,
+                failed=self._failed,
+                batches=batches,
+                mean_batch_size=requests / batches if batches else 0.0,
+                max_batch_size=max(self._batch_sizes, default=0),
+                batch_size_histogram=dict(sorted(self._batch_sizes.items())),
+            )
+
+    def close(self) -> None:
+        """Stop collecting requests and wait for in-flight ones to finish."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        logger.info("* ActionDispatcher closed: %s", self.stats())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = self._collect(first)
+            shutdown = batch[-1] is None
+            if shutdown:
+                batch.pop()
+
+            with self._stats_lock:
+                self._batch_sizes[len(batch)] += 1
+                self._waiting += len(batch)
+            logger.debug("* Dispatching batch of %d requests", len(batch))
+
+            for request in batch:
+                self._executor.submit(self._send, request)
+
+            if shutdown:
+                return
+
+    def _collect(self, first: _PendingRequest) -> List[Optional[_PendingRequest]]:
+        """Gather requests until the window closes or the batch is full."""
+        batch: List[Optional[_PendingRequest]] = [first]
+        deadline = first.enqueued_at + self.window
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            if request is None:
+                break
+
+        return batch
+
+    def _send(self, request: _PendingRequest) -> None:
+        with self._stats_lock:
+            self._waiting -= 1
+        if not request.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = self.client.chat.completions.create_with_completion(**request.kwargs)
+        except Exception as e:
+            with self._stats_lock:
+                self._failed += 1
+            request.future.set_exception(e)
+        else:
+            with self._stats_lock:
+                self._completed += 1
+            request.future.set_result(result)
@@ -0,0 +1,360 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Callable, Iterator, List, Optional, Sequence
+
+from pydantic import ValidationError
+
+logger = logging.getLogger(__name__)
+
+ROUTING_POLICIES = ("least_inflight", "latency")
+
+
+@dataclass
+class EndpointStats:
+    """Snapshot of one endpoint's load, latency and health."""
+
+    url: str
+    inflight: int
+    requests: int
+    failures: int
+    mean_latency: float
+    recent_latency: Optional[float]
+    healthy: bool
+    ejections: int
+
+
+class Endpoint:
+    """An LLM server with its own keep-alive client, load and health counters."""
+
+    def __init__(self, url: str, client) -> None:
+        self.url = url
+        self.client = client
+        self.inflight = 0
+        self.requests = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        # exponentially weighted moving average of recent latencies
+        self.recent_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        # ejections since the last success, doubling the next ejection period
+        self.consecutive_ejections = 0
+        self.ejections = 0
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def stats(self, now: float) -> EndpointStats:
+        return EndpointStats(
+            url=self.url,
+            inflight=self.inflight,
+            requests=self.requests,
+            failures=self.failures,
+            mean_latency=self.total_latency / self.requests if self.requests else 0.0,
+            recent_latency=self.recent_latency,
+            healthy=self.is_healthy(now),
+            ejections=self.ejections,
+        )
+
+
+def endpoints_from_env(value: Optional[str] = None) -> List[str]:
+    """
+    Endpoint URLs from a comma-separated list, by default the LLM_ENDPOINTS
+    environment variable.
+    """
+    if value is None:
+        value = os.environ.get("LLM_ENDPOINTS", "")
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
+def create_endpoint_client(url: str, max_connections: int = 8):
+    """
+    Create an instructor client sending every request to one OpenAI-compatible server.
+
+    The server's OpenAI client keeps an httpx connection pool, so requests
+    reuse keep-alive connections instead of opening one per request.
+
+    Args:
+        url: Base URL of the server, e.g. http://localhost:8080/v1
+        max_connections: Size of the connection pool
+
+    Returns:
+        Object with the chat.completions.create_with_completion interface and
+        a stream function returning the raw chunks of a streamed completion
+    """
+    import httpx
+    import instructor
+    from litellm import completion
+    from openai import OpenAI
+
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=max_connections, max_keepalive_connections=max_connections
+        ),
+        timeout=httpx.Timeout(600.0, connect=5.0),
+    )
+    openai_client = OpenAI(
+        base_url=url,
+        api_key=os.environ.get("OPENAI_API_KEY", "sk-no-key-required"),
+        http_client=http_client,
+    )
+    client = instructor.from_litellm(completion, mode=instructor.Mode.JSON)
+
+    def create_with_completion(**kwargs):
+        return client.chat.completions.create_with_completion(
+            api_base=url, client=openai_client, **kwargs
+        )
+
+    def stream(**kwargs):
+        return completion(
+            stream=True,
+            stream_options={"include_usage": True},
+            api_base=url,
+            client=openai_client,
+            **kwargs,
+        )
+
+    return SimpleNamespace(
+        chat=SimpleNamespace(
+            completions=SimpleNamespace(create_with_completion=create_with_completion)
+        ),
+        stream=stream,
+        close=http_client.close,
+    )
+
+
+def is_endpoint_error(error: BaseException) -> bool:
+    """Whether an error is the server's fault, rather than an invalid model response."""
+    while error is not None:
+        if isinstance(error, (ValidationError, json.JSONDecodeError)):
+            return False
+        error = error.__cause__ or error.__context__
+    return True
+
+
+class EndpointRouter:
+    """
+    Spreads LLM requests over several OpenAI-compatible servers.
+
+    Has the same chat.completions.create_with_completion interface as the
+    instructor client, so it can be passed to GamePlanner or ActionDispatcher
+    as the client. Each request goes to the healthy endpoint with the fewest
+    requests in flight (or the lowest recent latency), and fails over to the
+    next endpoint if the server errors. Endpoints failing max_failures times
+    in a row are ejected for a backoff period and re-admitted afterwards.
+    """
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        policy: str = "least_inflight",
+        max_failures: int = 3,
+        eject_seconds: float = 10.0,
+        max_eject_seconds: float = 300.0,
+        latency_decay: float = 0.2,
+        client_factory: Callable[[str], object] = create_endpoint_client,
+    ) -> None:
+        """
+        Initialize the router with one client per endpoint.
+
+        Args:
+            urls: Base URLs of the servers
+            policy: "least_inflight" or "latency"
+            max_failures: Consecutive failures after which an endpoint is ejected
+            eject_seconds: First ejection period, doubled on every ejection in a row
+            max_eject_seconds: Upper bound on the ejection period
+            latency_decay: Weight of the newest latency in the recent latency average
+            client_factory: Creates the client of an endpoint from its URL
+        """
+        if not urls:
+            raise ValueError("EndpointRouter needs at least one endpoint")
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown routing policy {policy}, expected one of {ROUTING_POLICIES}")
+        self.policy = policy
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.latency_decay = latency_decay
+        self.endpoints = [Endpoint(url, client_factory(url)) for url in urls]
+        self._lock = threading.Lock()
+        # instructor client interface
+        self.chat = SimpleNamespace(completions=self)
+        logger.info("* Initialized EndpointRouter (%s): %s", policy, ", ".join(urls))
+
+    def create_with_completion(self, **kwargs):
+        """
+        Send a request to the best endpoint, failing over to the others on server errors.
+
+        Returns:
+            Tuple of (response model, raw completion); the completion's
+            _hidden_params["api_base"] names the endpoint that served it
+        """
+        tried: List[Endpoint] = []
+        while True:
+            endpoint = self._acquire(tried)
+            start = time.perf_counter()
+            try:
+                action, completion = endpoint.client.chat.completions.create_with_completion(
+                    **kwargs
+                )
+            except Exception as e:
+                endpoint_error = is_endpoint_error(e)
+                self._release(endpoint, time.perf_counter() - start, failed=endpoint_error)
+                tried.append(endpoint)
+                if not endpoint_error or len(tried) == len(self.endpoints):
+                    raise
+                logger.warning("* Endpoint %s failed, trying another: %s", endpoint.url, str(e))
+                continue
+            self._release(endpoint, time.perf_counter() - start, failed=False)
+            _tag_completion(completion, endpoint.url)
+            return action, completion
+
+    def stream_completion(self, **kwargs) -> "RoutedStream":
+        """
+        Open a streamed completion on the best endpoint, failing over to the
+        others if the server errors before the stream is open.
+
+        The endpoint counts as in flight until the stream has been read to
+        the end or closed, so streams are balanced like other requests.
+
+        Returns:
+            RoutedStream of the raw chunks, naming the serving endpoint
+        """
+        tried: List[Endpoint] = []
+        while True:
+            endpoint = self._acquire(tried)
+            start = time.perf_counter()
+            try:
+                chunks = iter(endpoint.client.stream(**kwargs))
+            except Exception as e:
+                self._release(endpoint, time.perf_counter() - start, failed=True)
+                tried.append(endpoint)
+                if len(tried) == len(self.endpoints):
+                    raise
+                logger.warning("* Endpoint %s failed, trying another: %s", endpoint.url, str(e))
+                continue
+            return RoutedStream(self, endpoint, chunks, start)
+
+    def stats(self) -> List[EndpointStats]:
+        now = time.monotonic()
+        with self._lock:
+            return [endpoint.stats(now) for endpoint in self.endpoints]
+
+    def close(self) -> None:
+        """Close the connection pools of all endpoints."""
+        for endpoint in self.endpoints:
+            close = getattr(endpoint.client, "close", None)
+            if close:
+                close()
+        logger.info("* EndpointRouter closed: %s", self.stats())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _acquire(self, exclude: List[Endpoint]) -> Endpoint:
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e not in exclude]
+            healthy = [e for e in candidates if e.is_healthy(now)]
+            if healthy:
+                endpoint = min(healthy, key=self._load)
+            else:
+                # every endpoint is ejected, try the one due back first
+                endpoint = min(candidates, key=lambda e: e.ejected_until)
+            endpoint.inflight += 1
+            return endpoint
+
+    def _load(self, endpoint: Endpoint) -> tuple:
+        # endpoints without a latency yet sort first so they get measured
+        latency = endpoint.recent_latency or 0.0
+        if self.policy == "latency":
+            return latency, endpoint.inflight
+        return endpoint.inflight, latency
+
+    def _release(self, endpoint: Endpoint, latency: float, failed: bool) -> None:
+        with self._lock:
+            endpoint.inflight -= 1
+            if failed:
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                if endpoint.consecutive_failures >= self.max_failures:
+                    self._eject(endpoint)
+                return
+            endpoint.requests += 1
+            endpoint.total_latency += latency
+            # a success re-admits an endpoint for good
+            endpoint.consecutive_failures = 0
+            endpoint.consecutive_ejections = 0
+            endpoint.ejected_until = 0.0
+            if endpoint.recent_latency is None:
+                endpoint.recent_latency = latency
+            else:
+                endpoint.recent_latency += self.latency_decay * (latency - endpoint.recent_latency)
+
+    def _eject(self, endpoint: Endpoint) -> None:
+        period = min(
+            self.eject_seconds * 2**endpoint.consecutive_ejections, self.max_eject_seconds
+        )
+        endpoint.ejected_until = time.monotonic() + period
+        endpoint.consecutive_ejections += 1
+        endpoint.ejections += 1
+        # an endpoint on probation is ejected again after a single failure
+        endpoint.consecutive_failures = self.max_failures - 1
+        logger.warning("* Ejected endpoint %s for %.0fs", endpoint.url, period)
+
+
+class RoutedStream:
+    """Chunks of a streamed completion, releasing its endpoint once read or closed."""
+
+    def __init__(
+        self, router: EndpointRouter, endpoint: Endpoint, chunks: Iterator, start: float
+    ) -> None:
+        self.endpoint = endpoint.url
+        self._router = router
+        self._endpoint: Optional[Endpoint] = endpoint
+        self._chunks = chunks
+        self._start = start
+
+    def __iter__(self) -> "RoutedStream":
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            self._release(failed=False)
+            raise
+        except Exception:
+            self._release(failed=True)
+            raise
+
+    def close(self) -> None:
+        close = getattr(self._chunks, "close", None)
+        if close:
+            close()
+        self._release(failed=False)
+
+    def _release(self, failed: bool) -> None:
+        endpoint, self._endpoint = self._endpoint, None
+        if endpoint is not None:
+            self._router._release(endpoint, time.perf_counter() - self._start, failed)
+
+
+def _tag_completion(completion, url: str) -> None:
+    """Record the serving endpoint where litellm keeps it on its responses."""
+    hidden = getattr(completion, "_hidden_params", None)
+    if isinstance(hidden, dict):
+        hidden["api_base"] = url
+        return
+    try:
+        completion._hidden_params = {"api_base": url}
+    except AttributeError:
+        pass
@@ -1,9 +1,28 @@
+import argparse
+import contextlib
+import json
 import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import datetime
+from typing import List, Optional, Sequence
 
-from game_db import GameMetrics, WumpusDB
+from action_cache import ActionCache
+from batch_server import BatchServer
+from game_db import EndpointMetrics, GameMetrics, TurnEvent, WumpusDB
+from game_engine import WumpusGameEngine
 from game_handler import WumpusGameInterface
-from game_planner import GamePlanner
+from game_pool import GamePool
+from game_planner import PROMPT_VERSION, GamePlanner, LLMCallStats, create_client
+from llm_dispatcher import ActionDispatcher
+from llm_router import ROUTING_POLICIES, EndpointRouter, endpoints_from_env
+from session_recorder import RecordingPlanner, SessionRecorder
+from tracing import disable_tracing, enable_tracing, profile_game, span
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,27 +37,158 @@ litellm_logger = logging.getLogger("litellm")
 litellm_logger.setLevel(logging.INFO)
 
 
-def run_game(db: WumpusDB):
+def create_game_handler(
+    seed: Optional[int] = None, pool: Optional[GamePool] = None
+) -> WumpusGameInterface:
+    """
+    Create the game interface selected by the WUMPUS_ENGINE environment variable.
+
+    "binary" (the default) drives the wumpus executable over a pty, taking
+    processes from pool if given, "builtin" uses the in-process engine,
+    seeded by the seed argument or WUMPUS_SEED.
+    """
+    engine = os.environ.get("WUMPUS_ENGINE", "binary")
+    if engine == "builtin":
+        if seed is None and os.environ.get("WUMPUS_SEED"):
+            seed = int(os.environ["WUMPUS_SEED"])
+        return WumpusGameEngine(seed=seed)
+    if engine != "binary":
+        raise ValueError(f"Unknown WUMPUS_ENGINE: {engine}")
+    return WumpusGameInterface(pool=pool)
+
+
+def endpoint_metrics(game_uuid: str, calls: Sequence[LLMCallStats]) -> List[EndpointMetrics]:
+    """Sum a game's LLM calls per endpoint, skipping calls without a known endpoint."""
+    endpoints = {}
+    for call in calls:
+        if call.endpoint is None:
+            continue
+        metrics = endpoints.setdefault(
+            call.endpoint, EndpointMetrics(game_uuid, call.endpoint, 0, 0.0)
+        )
+        metrics.requests += 1
+        metrics.total_latency += call.latency
+        metrics.prompt_tokens += call.prompt_tokens
+        metrics.completion_tokens += call.completion_tokens
+    return list(endpoints.values())
+
+
+@dataclass
+class TrialSummary:
+    """Throughput summary for a batch of trial games."""
+
+    games: int
+    games_won: int
+    total_turns: int
+    wall_time: float
+    games_per_minute: float
+    turns_per_second: float
+
+
+def run_game(
+    db: WumpusDB,
+    game_handler: Optional[WumpusGameInterface] = None,
+    strategy_id: Optional[str] = None,
+    llm_semaphore: Optional[threading.Semaphore] = None,
+    dispatcher: Optional[ActionDispatcher] = None,
+    cache: Optional[ActionCache] = None,
+    fast_path: bool = False,
+    client=None,
+    record_dir: Optional[str] = None,
+    speculate: bool = False,
+    constrained: bool = False,
+    stream: bool = False,
+    stream_max_tokens: Optional[int] = None,
+    conversation: bool = False,
+    context_budget: int = 2048,
+    policy=None,
+    policy_threshold: float = 0.9,
+    max_turns: Optional[int] = None,
+    stream_client=None,
+) -> GameMetrics:
     # initialize metrics tracking
     start_time = datetime.now()
+    setup_start = time.perf_counter()
+    setup_time = 0.0
+    game_uuid = uuid.uuid4().hex
     turns = 0
     response_times = []
 
-    game_handler = WumpusGameInterface()
-    planner = GamePlanner(game_handler)
+    if game_handler is None:
+        game_handler = create_game_handler()
+    planner_kwargs = dict(
+        llm_semaphore=llm_semaphore,
+        dispatcher=dispatcher,
+        cache=cache,
+        fast_path=fast_path,
+        client=client,
+        speculate=speculate,
+        constrained=constrained,
+        fallback=constrained,
+        stream=stream,
+        stream_max_tokens=stream_max_tokens,
+        conversation=conversation,
+        context_budget=context_budget,
+        policy=policy,
+        policy_threshold=policy_threshold,
+        stream_client=stream_client,
+    )
+
+    recorder = None
+    if record_dir:
+        recorder = SessionRecorder.for_game(record_dir, game_uuid)
+        recorder.start(
+            game_uuid=game_uuid,
+            engine=type(game_handler).__name__,
+            seed=getattr(game_handler, "seed", None),
+            strategy_id=strategy_id,
+            fast_path=fast_path,
+            # planner options the decisions depend on, so a replay uses the same
+            cache=cache is not None,
+            speculate=speculate,
+            constrained=constrained,
+            stream=stream,
+            stream_max_tokens=stream_max_tokens,
+            conversation=conversation,
+            context_budget=context_budget,
+            policy_weights=None if policy is None else policy.weights.tolist(),
+            policy_threshold=policy_threshold,
+        )
+        game_handler.recorder = recorder
+        planner = RecordingPlanner(game_handler, recorder=recorder, **planner_kwargs)
+    else:
+        planner = GamePlanner(game_handler, **planner_kwargs)
+
+    # span and profiles of the whole game, closed once its metrics are saved
+    game_tracing = contextlib.ExitStack()
+    game_span = game_tracing.enter_context(
+        span("game.run", game_uuid=game_uuid, strategy_id=strategy_id)
+    )
+    game_tracing.enter_context(profile_game(game_uuid))
 
     try:
         # start game
         game_handler.start_game()
-        logger.info("* Game started successfully.")
+        setup_time = time.perf_counter() - setup_start
+        logger.info("* Game started successfully in %.3fs.", setup_time)
 
         # main game loop
         while not game_handler.get_game_state().game_over:
+            if max_turns is not None and turns >= max_turns:
+                logger.error("* Stopping the game after the limit of %d turns", max_turns)
+                break
             turns += 1
 
+            # snapshot state and I/O counters for the turn's telemetry
+            state_before = json.dumps(game_handler.get_game_state().summary())
+            io_wait_before = game_handler.io_wait
+            timeouts_before = game_handler.timeouts
+            action = None
+            error = None
+            # record response time
+            response_start = datetime.now()
+
             try:
-                # record response time
-                response_start = datetime.now()
                 action, game_state = planner.play_turn()
                 response_time = (datetime.now() - response_start).total_seconds()
                 response_times.append(response_time)
@@ -52,12 +202,45 @@ def run_game(db: WumpusDB):
 
             except Exception as e:
                 logger.error("* Error during game play: %s", str(e))
+                error = str(e)
                 break
 
+            finally:
+                llm_call = planner.last_llm_call
+                db.record_turn(
+                    TurnEvent(
+                        game_uuid=game_uuid,
+                        turn=turns,
+                        timestamp=response_start,
+                        action=action.action if action else None,
+                        room=action.room if action else None,
+                        state_before=state_before,
+                        state_after=json.dumps(game_handler.get_game_state().summary()),
+                        decision_source=planner.last_decision_source,
+                        turn_time=(datetime.now() - response_start).total_seconds(),
+                        llm_latency=llm_call.latency if llm_call else 0.0,
+                        prompt_tokens=llm_call.prompt_tokens if llm_call else 0,
+                        completion_tokens=llm_call.completion_tokens if llm_call else 0,
+                        retries=llm_call.retries if llm_call else 0,
+                        io_wait=game_handler.io_wait - io_wait_before,
+                        timeouts=game_handler.timeouts - timeouts_before,
+                        error=error,
+                        endpoint=llm_call.endpoint if llm_call else None,
+                        decision_latency=llm_call.decision_latency if llm_call else 0.0,
+                        cached_tokens=llm_call.cached_tokens if llm_call else 0,
+                        prompt_ms=llm_call.prompt_ms if llm_call else None,
+                    )
+                )
+
     except Exception as e:
         logger.error("* Error during game initialization: %s", str(e))
 
     finally:
+        planner.close()
+        # a game cut short by an error still holds its process
+        if game_handler.game_process is not None:
+            game_handler.exit_game()
+
         # record final state and metrics
         final_state = game_handler.get_game_state()
 
@@ -74,7 +257,7 @@ def run_game(db: WumpusDB):
         metrics = GameMetrics(
             timestamp=start_time,
             num_turns=turns,
-            rooms_explored=len(final_state.explored_rooms),
+            rooms_explored=final_state.explored_mask.bit_count(),
             death_by_pit=final_state.game_over 
                 and "FELL IN PIT" in ",".join(final_state.last_output),
             death_by_wumpus=final_state.game_over
@@ -86,16 +269,563 @@ def run_game(db: WumpusDB):
             action_generation_errors=planner.action_generation_errors,
             average_response_time=avg_time,
             total_response_time=total_time,
+            strategy_id=strategy_id,
+            prompt_tokens=sum(call.prompt_tokens for call in planner.llm_calls),
+            cached_prompt_tokens=sum(call.cached_tokens for call in planner.llm_calls),
+            completion_tokens=sum(call.completion_tokens for call in planner.llm_calls),
+            fast_path_actions=planner.fast_path_actions,
+            game_uuid=game_uuid,
+            prompt_version=PROMPT_VERSION,
+            model=planner.model_name,
+            speculations=planner.speculations,
+            speculation_hits=planner.speculation_hits,
+            speculation_time_saved=planner.speculation_time_saved,
+            validation_retries=planner.validation_retries,
+            fallback_actions=planner.fallback_actions,
+            context_compactions=planner.memory.compactions if planner.memory else 0,
+            setup_time=setup_time,
+            policy_actions=planner.policy_actions,
+            llm_calls=len(planner.llm_calls),
+            wasted_speculations=planner.wasted_speculations,
         )
 
-        db.add_game_metrics(metrics)
+        db.add_game_metrics(metrics, endpoint_metrics(game_uuid, planner.llm_calls))
+        if speculate:
+            logger.info(
+                "* Speculation: %d/%d hits (%.0f%%), %.2fs saved, %d wasted LLM calls",
+                planner.speculation_hits,
+                planner.speculations,
+                planner.speculation_hit_rate * 100,
+                planner.speculation_time_saved,
+                planner.wasted_speculations,
+            )
         logger.info("* Game session ended and metrics recorded.")
 
+        if recorder:
+            recorder.end(num_turns=turns, game_won=final_state.win_state)
+            recorder.close()
+
+        game_span.set(turns=turns, game_won=final_state.win_state)
+        game_tracing.close()
+
+    return metrics
+
+
+def run_trials(
+    db: WumpusDB,
+    num_trials: int,
+    num_workers: int = 4,
+    strategy_id: Optional[str] = None,
+    max_inflight_requests: Optional[int] = None,
+    seed: Optional[int] = None,
+    batch_window_ms: Optional[float] = None,
+    cache: Optional[ActionCache] = None,
+    fast_path: bool = False,
+    record_dir: Optional[str] = None,
+    speculate: bool = False,
+    constrained: bool = False,
+    pool_size: Optional[int] = None,
+    router: Optional[EndpointRouter] = None,
+    stream: bool = False,
+    stream_max_tokens: Optional[int] = None,
+    conversation: bool = False,
+    context_budget: int = 2048,
+    policy=None,
+    policy_threshold: float = 0.9,
+) -> TrialSummary:
+    """
+    Run a batch of games concurrently in a bounded worker pool.
 
-def main():
-    db = WumpusDB()
+    Each worker gets its own game interface and planner, all results are
+    written to the shared database.
+
+    Args:
+        db: Database to record the metrics of every game in
+        num_trials: Number of games to play
+        num_workers: Maximum number of games in progress at once
+        strategy_id: Identifier of the prompt strategy stored with each game
+        max_inflight_requests: Cap on concurrent LLM requests across workers,
+            defaults to num_workers
+        seed: Base seed for the builtin engine, game i uses seed + i
+        batch_window_ms: If set, coalesce LLM requests from all workers through
+            an ActionDispatcher with this collection window
+        cache: Optional ActionCache shared by all workers
+        fast_path: Let planners skip the LLM for forced moves
+        record_dir: Directory to write a session transcript per game to
+        speculate: Let planners generate the next action while moves execute
+        constrained: Constrain generation to the action schema and fall back
+            to a legal move when generation fails
+        pool_size: If set, keep this many wumpus processes ready in a GamePool
+            and recycle them between games
+        router: Optional EndpointRouter spreading the LLM requests of all
+            workers over several servers
+        stream: Stream responses and act as soon as the action is decided
+        stream_max_tokens: Stop reading streamed responses after this many tokens
+        conversation: Send each game's earlier turns with every request
+        context_budget: Estimated tokens of history above which older turns
+            are compacted into a summary
+        policy: Optional DistilledPolicy answering confident turns without the LLM
+        policy_threshold: Minimum confidence of the policy's actions
+
+    Returns:
+        TrialSummary with throughput of the batch
+    """
+    max_inflight = max_inflight_requests or num_workers
+    llm_semaphore = None
+    dispatcher = None
+    if batch_window_ms is not None:
+        dispatcher = ActionDispatcher(
+            router or create_client(),
+            window_ms=batch_window_ms,
+            max_batch_size=max_inflight,
+            max_concurrency=max_inflight,
+        )
+    if dispatcher is None or stream:
+        # streamed requests bypass the dispatcher, so they are capped here
+        llm_semaphore = threading.BoundedSemaphore(max_inflight)
+    pool = None
+    if pool_size and os.environ.get("WUMPUS_ENGINE", "binary") == "binary":
+        pool = GamePool(pool_size)
+
+    def play(trial: int) -> GameMetrics:
+        logger.info("* Trial %d of %d", trial + 1, num_trials)
+        game_handler = create_game_handler(None if seed is None else seed + trial, pool)
+        return run_game(
+            db,
+            game_handler,
+            strategy_id,
+            llm_semaphore,
+            dispatcher,
+            cache,
+            fast_path,
+            client=router,
+            record_dir=record_dir,
+            speculate=speculate,
+            constrained=constrained,
+            stream=stream,
+            stream_max_tokens=stream_max_tokens,
+            conversation=conversation,
+            context_budget=context_budget,
+            policy=policy,
+            policy_threshold=policy_threshold,
+        )
+
+    start = time.perf_counter()
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            futures = [executor.submit(play, trial) for trial in range(num_trials)]
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.error("* Trial failed: %s", str(e))
+    finally:
+        if dispatcher:
+            dispatcher.close()
+        if pool:
+            pool.close()
+    wall_time = time.perf_counter() - start
+
+    total_turns = sum(m.num_turns for m in results)
+    summary = TrialSummary(
+        games=len(results),
+        games_won=sum(1 for m in results if m.game_won),
+        total_turns=total_turns,
+        wall_time=wall_time,
+        games_per_minute=len(results) / wall_time * 60 if wall_time else 0,
+        turns_per_second=total_turns / wall_time if wall_time else 0,
+    )
+    logger.info(
+        "* Completed %d trials in %.1fs - %.2f games/min, %.2f turns/s, %d won",
+        summary.games,
+        summary.wall_time,
+        summary.games_per_minute,
+        summary.turns_per_second,
+        summary.games_won,
+    )
+    if pool:
+        stats = pool.stats()
+        logger.info(
+            "* Game pool: size %d, %d spawns (%.0fms mean), %d recycles (%.0fms mean), "
+            "%.0fms mean wait per game, %d queued",
+            stats.size,
+            stats.spawns,
+            stats.mean_spawn_time * 1000,
+            stats.recycles,
+            stats.mean_recycle_time * 1000,
+            stats.mean_acquire_wait * 1000,
+            stats.queued,
+        )
+    if router:
+        for stats in router.stats():
+            logger.info(
+                "* Endpoint %s: %d requests, %d failures, %.2fs mean latency, %d ejections%s",
+                stats.url,
+                stats.requests,
+                stats.failures,
+                stats.mean_latency,
+                stats.ejections,
+                "" if stats.healthy else " (ejected)",
+            )
+    if cache:
+        stats = cache.stats()
+        logger.info(
+            "* Action cache: %d lookups, %.1f%% hit rate (%d memory, %d disk hits)",
+            stats.lookups,
+            stats.hit_rate * 100,
+            stats.memory_hits,
+            stats.disk_hits,
+        )
+    return summary
+
+
+def serve_jobs(
+    db: WumpusDB,
+    source: str,
+    num_workers: int = 1,
+    max_inflight_requests: Optional[int] = None,
+    batch_window_ms: Optional[float] = None,
+    pool_size: Optional[int] = None,
+    client=None,
+    strategy_id: Optional[str] = None,
+    started: Optional[float] = None,
+    **game_options,
+) -> BatchServer:
+    """
+    Play game jobs from stdin or a Unix socket in a long-lived process.
+
+    The LLM client, database connection and game pool are created once and
+    shared by every game, so a game only pays for its own setup. A job is a
+    JSON line such as {"id": 1, "seed": 3, "strategy_id": "s"}; the reply
+    line has the game's uuid, outcome, turns and setup time.
+
+    Args:
+        db: Database to record the metrics of every game in
+        source: "-" to read jobs from stdin and write replies to stdout,
+            otherwise the path of the Unix socket to listen on
+        num_workers: Number of games played at once
+        max_inflight_requests: Cap on concurrent LLM requests across games,
+            defaults to num_workers
+        batch_window_ms: If set, coalesce LLM requests of all games through
+            an ActionDispatcher with this collection window
+        pool_size: If set, keep this many wumpus processes ready in a GamePool
+        client: Client shared by all games, e.g. an EndpointRouter; an
+            instructor client is created if None
+        strategy_id: Strategy identifier of jobs that do not set one
+        started: perf_counter value at process start, for the cold-start time
+        **game_options: Keyword options of run_game applied to every game
+
+    Returns:
+        The BatchServer after it has stopped, with job counts
+    """
+    started = started if started is not None else time.perf_counter()
+    warm_start = time.perf_counter()
+    # importing litellm and instructor dominates the cold start, pay for it
+    # before the first job instead of during its first turn
+    if client is None:
+        client = create_client()
+    client_time = time.perf_counter() - warm_start
+
+    max_inflight = max_inflight_requests or num_workers
+    llm_semaphore = None
+    dispatcher = None
+    if batch_window_ms is not None:
+        dispatcher = ActionDispatcher(
+            client,
+            window_ms=batch_window_ms,
+            max_batch_size=max_inflight,
+            max_concurrency=max_inflight,
+        )
+    if dispatcher is None or game_options.get("stream"):
+        # streamed requests bypass the dispatcher, so they are capped here
+        llm_semaphore = threading.BoundedSemaphore(max_inflight)
+    pool = None
+    if pool_size and os.environ.get("WUMPUS_ENGINE", "binary") == "binary":
+        pool = GamePool(pool_size)
+    setup_times: List[float] = []
+
+    def play(job: dict) -> dict:
+        logger.info("* Job %s started", job.get("id"))
+        game_handler = create_game_handler(job.get("seed"), pool)
+        # replies to "-" are written to stdout, which echoed game output would corrupt
+        game_handler.echo_output = False
+        metrics = run_game(
+            db,
+            game_handler,
+            job.get("strategy_id", strategy_id),
+            llm_semaphore,
+            dispatcher,
+            client=client,
+            **game_options,
+        )
+        setup_times.append(metrics.setup_time)
+        return {
+            "game_uuid": metrics.game_uuid,
+            "game_won": metrics.game_won,
+            "num_turns": metrics.num_turns,
+            "setup_time": metrics.setup_time,
+            "total_response_time": metrics.total_response_time,
+        }
+
+    server = BatchServer(play, workers=num_workers)
+    cold_start = time.perf_counter() - started
+    logger.info(
+        "* Ready for game jobs after a %.2fs cold start (%.2fs creating the LLM client)",
+        cold_start,
+        client_time,
+    )
+    try:
+        if source == "-":
+            server.serve_stream(sys.stdin, sys.stdout)
+        else:
+            server.serve_socket(source)
+    except KeyboardInterrupt:
+        logger.info("* Interrupted, finishing running jobs")
+    finally:
+        server.close()
+        if dispatcher:
+            dispatcher.close()
+        if pool:
+            pool.close()
+    logger.info(
+        "* Served %d games (%d failed): %.2fs cold start, %.3fs mean warm setup per game",
+        server.jobs,
+        server.failures,
+        cold_start,
+        sum(setup_times) / len(setup_times) if setup_times else 0.0,
+    )
+    return server
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Play Hunt the Wumpus with an LLM agent")
+    parser.add_argument("--trials", type=int, default=1, help="number of games to play")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="number of games played concurrently"
+    )
+    parser.add_argument(
+        "--max-inflight",
+        type=int,
+        default=None,
+        help="cap on concurrent LLM requests (default: number of workers)",
+    )
+    parser.add_argument(
+        "--strategy-id", default=None, help="strategy identifier stored with the metrics"
+    )
+    parser.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=None,
+        help="coalesce concurrent LLM requests within this window (ms)",
+    )
+    parser.add_argument(
+        "--action-cache",
+        default=None,
+        help="path to a SQLite file caching actions by game state (opt-in)",
+    )
+    parser.add_argument(
+        "--action-cache-max-age",
+        type=float,
+        default=None,
+        help="maximum age of cached actions in seconds",
+    )
+    parser.add_argument(
+        "--fast-path",
+        action="store_true",
+        help="skip the LLM when the knowledge base proves a move safe or locates the Wumpus",
+    )
+    parser.add_argument(
+        "--record-dir",
+        default=None,
+        help="write a replayable transcript of every game to this directory",
+    )
+    parser.add_argument(
+        "--speculate",
+        action="store_true",
+        help="generate the next action for the predicted room while a move executes",
+    )
+    parser.add_argument(
+        "--constrained",
+        action="store_true",
+        help="constrain generation to the action JSON schema and fall back to a legal move",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        default=None,
+        help="keep this many wumpus processes ready and recycle them between games",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="stream responses and act as soon as the action and room are known",
+    )
+    parser.add_argument(
+        "--stream-max-tokens",
+        type=int,
+        default=None,
+        help="stop reading a streamed response after this many tokens",
+    )
+    parser.add_argument(
+        "--conversation",
+        action="store_true",
+        help="send the game's earlier turns with every request as an append-only history",
+    )
+    parser.add_argument(
+        "--context-budget",
+        type=int,
+        default=2048,
+        help="estimated tokens of history above which older turns are summarized",
+    )
+    parser.add_argument(
+        "--policy",
+        default=None,
+        help="distilled policy file (see distilled_policy.py) answering confident turns "
+        "without the LLM",
+    )
+    parser.add_argument(
+        "--policy-threshold",
+        type=float,
+        default=0.9,
+        help="minimum probability of the policy's action, otherwise the LLM decides",
+    )
+    parser.add_argument(
+        "--endpoints",
+        default=None,
+        help="comma-separated base URLs of LLM servers to spread requests over "
+        "(default: LLM_ENDPOINTS)",
+    )
+    parser.add_argument(
+        "--routing",
+        choices=ROUTING_POLICIES,
+        default="least_inflight",
+        help="send each request to the endpoint with the fewest in-flight requests "
+        "or the lowest recent latency",
+    )
+    parser.add_argument(
+        "--profile",
+        default=os.environ.get("WUMPUS_PROFILE"),
+        help="write a Chrome trace of the agent loop's spans to this directory "
+        "(default: WUMPUS_PROFILE)",
+    )
+    parser.add_argument(
+        "--profile-cpu",
+        action="store_true",
+        help="with --profile, also write a cProfile .prof file per game",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="with --profile, also write a tracemalloc snapshot per game",
+    )
+    parser.add_argument(
+        "--serve",
+        default=None,
+        metavar="SOCKET",
+        help="keep running and play game jobs received as JSON lines on this Unix socket, "
+        "or on stdin with '-'",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="base seed for the builtin engine")
+    parser.add_argument("--db", default="wumpus_metrics.db", help="path to the metrics database")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    started = time.perf_counter()
+    args = parse_args(argv)
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+        enable_tracing(
+            os.path.join(args.profile, "trace.json"),
+            profile_cpu=args.profile_cpu,
+            profile_memory=args.profile_memory,
+        )
+    db = WumpusDB(args.db)
+    cache = None
+    if args.action_cache:
+        cache = ActionCache(args.action_cache, max_age=args.action_cache_max_age)
+    policy = None
+    if args.policy:
+        from distilled_policy import DistilledPolicy
+
+        policy = DistilledPolicy.load(args.policy)
+    router = None
+    urls = endpoints_from_env(args.endpoints)
+    if urls:
+        router = EndpointRouter(urls, policy=args.routing)
+
+    if args.serve:
+        serve_jobs(
+            db,
+            args.serve,
+            num_workers=args.workers,
+            max_inflight_requests=args.max_inflight,
+            batch_window_ms=args.batch_window_ms,
+            pool_size=args.pool_size,
+            client=router,
+            strategy_id=args.strategy_id,
+            started=started,
+            cache=cache,
+            fast_path=args.fast_path,
+            record_dir=args.record_dir,
+            speculate=args.speculate,
+            constrained=args.constrained,
+            stream=args.stream,
+            stream_max_tokens=args.stream_max_tokens,
+            conversation=args.conversation,
+            context_budget=args.context_budget,
+            policy=policy,
+            policy_threshold=args.policy_threshold,
+        )
+    elif args.trials == 1 and args.workers == 1:
+        run_game(
+            db,
+            create_game_handler(args.seed),
+            strategy_id=args.strategy_id,
+            cache=cache,
+            fast_path=args.fast_path,
+            client=router,
+            record_dir=args.record_dir,
+            speculate=args.speculate,
+            constrained=args.constrained,
+            stream=args.stream,
+            stream_max_tokens=args.stream_max_tokens,
+            conversation=args.conversation,
+            context_budget=args.context_budget,
+            policy=policy,
+            policy_threshold=args.policy_threshold,
+        )
+    else:
+        run_trials(
+            db,
+            num_trials=args.trials,
+            num_workers=args.workers,
+            strategy_id=args.strategy_id,
+            max_inflight_requests=args.max_inflight,
+            seed=args.seed,
+            batch_window_ms=args.batch_window_ms,
+            cache=cache,
+            fast_path=args.fast_path,
+            record_dir=args.record_dir,
+            speculate=args.speculate,
+            constrained=args.constrained,
+            pool_size=args.pool_size,
+            router=router,
+            stream=args.stream,
+            stream_max_tokens=args.stream_max_tokens,
+            conversation=args.conversation,
+            context_budget=args.context_budget,
+            policy=policy,
+            policy_threshold=args.policy_threshold,
+        )
 
-    run_game(db)
+    if router:
+        router.close()
+    if cache:
+        cache.close()
+    if args.profile:
+        disable_tracing()
 
 
 if __name__ == "__main__":
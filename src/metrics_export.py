@@ -0,0 +1,349 @@
+import argparse
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from game_db import WumpusDB
+
+logger = logging.getLogger(__name__)
+
+# column types of every exported table:
+#   numpy dtype strings are stored as fixed-width .npy columns,
+#   "category" as int32 codes into a list of categories kept in meta.json (-1 for NULL),
+#   "text" as an int64 .npy of end offsets into a UTF-8 .bin blob
+EXPORT_COLUMNS = {
+    "game_metrics": {
+        "id": "int64",
+        "timestamp": "datetime64[us]",
+        "num_turns": "int64",
+        "rooms_explored": "int64",
+        "death_by_pit": "bool",
+        "death_by_wumpus": "bool",
+        "death_by_arrows": "bool",
+        "game_won": "bool",
+        "arrows_remaining": "int64",
+        "action_generation_errors": "int64",
+        "average_response_time": "float64",
+        "total_response_time": "float64",
+        "strategy_id": "category",
+        "prompt_tokens": "int64",
+        "cached_prompt_tokens": "int64",
+        "completion_tokens": "int64",
+        "fast_path_actions": "int64",
+        "game_uuid": "S32",
+        "prompt_version": "category",
+        "model": "category",
+        "speculations": "int64",
+        "speculation_hits": "int64",
+        "speculation_time_saved": "float64",
+        "validation_retries": "int64",
+        "fallback_actions": "int64",
+        "context_compactions": "int64",
+        "setup_time": "float64",
+        "policy_actions": "int64",
+        "llm_calls": "int64",
+        "wasted_speculations": "int64",
+    },
+    "turn_events": {
+        "id": "int64",
+        "game_uuid": "S32",
+        "turn": "int64",
+        "timestamp": "datetime64[us]",
+        "action": "category",
+        "room": "int64",
+        "state_before": "text",
+        "state_after": "text",
+        "decision_source": "category",
+        "turn_time": "float64",
+        "llm_latency": "float64",
+        "prompt_tokens": "int64",
+        "completion_tokens": "int64",
+        "retries": "int64",
+        "io_wait": "float64",
+        "timeouts": "int64",
+        "error": "text",
+        "endpoint": "category",
+        "decision_latency": "float64",
+        "cached_tokens": "int64",
+        "prompt_ms": "float64",
+    },
+    "endpoint_metrics": {
+        "id": "int64",
+        "game_uuid": "S32",
+        "endpoint": "category",
+        "requests": "int64",
+        "total_latency": "float64",
+        "prompt_tokens": "int64",
+        "completion_tokens": "int64",
+    },
+}
+
+# value stored for NULL in integer columns, e.g. the room of a failed turn
+INT_NULL = -1
+# every .npy header is padded to this size so it can be rewritten in place
+# with a larger row count after appending
+NPY_HEADER_SIZE = 128
+META_FILE = "meta.json"
+
+
+def _npy_header(dtype: np.dtype, rows: int) -> bytes:
+    descr = np.lib.format.dtype_to_descr(dtype)
+    header = repr({"descr": descr, "fortran_order": False, "shape": (rows,)})
+    # magic, version 1.0 and the little-endian header length take 10 bytes
+    header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + "\n"
+    return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1")
+
+
+def _append_npy(path: str, values: np.ndarray, rows: int) -> None:
+    """
+    Append values to a one-dimensional .npy file holding rows values.
+
+    Anything past the first rows values (left by an interrupted export) is
+    truncated first; the header is rewritten last with the new row count.
+    """
+    mode = "r+b" if os.path.exists(path) else "w+b"
+    with open(path, mode) as f:
+        f.truncate(NPY_HEADER_SIZE + rows * values.dtype.itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(np.ascontiguousarray(values).tobytes())
+        f.seek(0)
+        f.write(_npy_header(values.dtype, rows + len(values)))
+
+
+def _append_text(directory: str, name: str, values: List[Optional[str]], rows: int) -> None:
+    offsets_path = os.path.join(directory, f"{name}.npy")
+    blob_path = os.path.join(directory, f"{name}.bin")
+    end = 0
+    if rows:
+        end = int(np.load(offsets_path, mmap_mode="r")[rows - 1])
+
+    encoded = [(value or "").encode("utf-8") for value in values]
+    with open(blob_path, "r+b" if os.path.exists(blob_path) else "w+b") as f:
+        f.truncate(end)
+        f.seek(end)
+        f.write(b"".join(encoded))
+    offsets = end + np.cumsum([len(b) for b in encoded], dtype=np.int64)
+    _append_npy(offsets_path, offsets, rows)
+
+
+def _convert(kind: str, values: list, categories: List[str]) -> np.ndarray:
+    if kind == "category":
+        index = {category: i for i, category in enumerate(categories)}
+        codes = []
+        for value in values:
+            if value is None:
+                codes.append(-1)
+                continue
+            if value not in index:
+                index[value] = len(categories)
+                categories.append(value)
+            codes.append(index[value])
+        return np.array(codes, dtype=np.int32)
+    if kind.startswith("datetime64"):
+        return np.array(
+            [str(value) if value is not None else "NaT" for value in values], dtype=kind
+        )
+    if kind == "float64":
+        return np.array([np.nan if value is None else value for value in values], dtype=kind)
+    if kind == "int64":
+        return np.array([INT_NULL if value is None else value for value in values], dtype=kind)
+    if kind == "bool":
+        return np.array([bool(value) for value in values], dtype=kind)
+    return np.array([(value or "").encode("ascii") for value in values], dtype=kind)
+
+
+def _read_meta(directory: str) -> dict:
+    path = os.path.join(directory, META_FILE)
+    if not os.path.exists(path):
+        return {"watermark": 0, "rows": 0, "categories": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_meta(directory: str, meta: dict) -> None:
+    # written to a temporary file and renamed, so the watermark only moves
+    # once every column has been appended
+    path = os.path.join(directory, META_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _backfill_columns(
+    table_dir: str, columns: Dict[str, str], meta: dict, batch_size: int
+) -> None:
+    """
+    Fill columns added since the last export with NULL for the rows already exported.
+
+    NULL is stored as for a NULL value of the column: -1 category codes,
+    INT_NULL, NaN, NaT, False and empty strings.
+    """
+    rows = meta["rows"]
+    for name, kind in columns.items():
+        logger.info("* Backfilling new column %s for %d exported rows", name, rows)
+        for start in range(0, rows, batch_size):
+            values = [None] * min(batch_size, rows - start)
+            if kind == "text":
+                _append_text(table_dir, name, values, start)
+                continue
+            categories = meta["categories"].setdefault(name, []) if kind == "category" else []
+            array = _convert(kind, values, categories)
+            _append_npy(os.path.join(table_dir, f"{name}.npy"), array, start)
+    meta["columns"] = {**meta["columns"], **columns}
+    _write_meta(table_dir, meta)
+
+
+def export_table(db: WumpusDB, table: str, directory: str, batch_size: int = 50_000) -> int:
+    """
+    Append the rows added to a table since the last export to typed column files.
+
+    Rows are exported in id order; the highest exported id is kept as the
+    watermark in <directory>/<table>/meta.json, so every row is exported once.
+
+    Args:
+        db: Database to export from
+        table: "game_metrics", "turn_events" or "endpoint_metrics"
+        directory: Export directory, one subdirectory per table
+        batch_size: Number of rows read and appended at a time
+
+    Returns:
+        Number of rows exported
+    """
+    columns = EXPORT_COLUMNS[table]
+    table_dir = os.path.join(directory, table)
+    os.makedirs(table_dir, exist_ok=True)
+    meta = _read_meta(table_dir)
+    added = [name for name in columns if name not in meta.get("columns", columns)]
+    if added and meta["rows"]:
+        _backfill_columns(table_dir, {name: columns[name] for name in added}, meta, batch_size)
+    meta["columns"] = columns
+
+    db.flush_turn_events()
+    cursor = db.conn.execute(
+        f"SELECT {', '.join(columns)} FROM {table} WHERE id > ? ORDER BY id",
+        (meta["watermark"],),
+    )
+
+    exported = 0
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        rows = meta["rows"]
+        for i, (name, kind) in enumerate(columns.items()):
+            values = [row[i] for row in batch]
+            if kind == "text":
+                _append_text(table_dir, name, values, rows)
+                continue
+            categories = meta["categories"].setdefault(name, []) if kind == "category" else []
+            array = _convert(kind, values, categories)
+            _append_npy(os.path.join(table_dir, f"{name}.npy"), array, rows)
+
+        meta["rows"] = rows + len(batch)
+        meta["watermark"] = batch[-1][0]
+        _write_meta(table_dir, meta)
+        exported += len(batch)
+
+    logger.info("* Exported %d %s rows to %s (%d total)", exported, table, table_dir, meta["rows"])
+    return exported
+
+
+def export_all(db: WumpusDB, directory: str) -> Dict[str, int]:
+    """Export the new rows of every table, returning the number of rows per table."""
+    return {table: export_table(db, table, directory) for table in EXPORT_COLUMNS}
+
+
+def load_columns(
+    directory: str, table: str, columns: Optional[Sequence[str]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Memory-map exported columns as NumPy arrays.
+
+    Fixed-width columns are returned as read-only memory maps, so loading is
+    independent of the number of rows. Category columns are returned as
+    int32 codes (see load_dataframe for labelled values) and text columns are
+    decoded into object arrays, so they are only loaded when asked for.
+
+    Args:
+        directory: Export directory passed to export_table
+        table: "game_metrics", "turn_events" or "endpoint_metrics"
+        columns: Columns to load, all but the text columns if None
+
+    Returns:
+        Mapping of column name to array
+    """
+    table_dir = os.path.join(directory, table)
+    meta = _read_meta(table_dir)
+    kinds = meta.get("columns", EXPORT_COLUMNS[table])
+    if columns is None:
+        columns = [name for name, kind in kinds.items() if kind != "text"]
+
+    rows = meta["rows"]
+    arrays = {}
+    for name in columns:
+        if not rows:
+            arrays[name] = np.empty(0, dtype=object if kinds[name] == "text" else None)
+            continue
+        array = np.load(os.path.join(table_dir, f"{name}.npy"), mmap_mode="r")[:rows]
+        if kinds[name] == "text":
+            blob = np.memmap(os.path.join(table_dir, f"{name}.bin"), dtype=np.uint8, mode="r")
+            starts = np.concatenate(([0], array[:-1]))
+            array = np.array(
+                [bytes(blob[s:e]).decode("utf-8") for s, e in zip(starts, array)], dtype=object
+            )
+        arrays[name] = array
+    return arrays
+
+
+def load_dataframe(directory: str, table: str, columns: Optional[Sequence[str]] = None):
+    """
+    Load exported columns into a pandas DataFrame with category columns labelled.
+
+    Args:
+        directory: Export directory passed to export_table
+        table: "game_metrics", "turn_events" or "endpoint_metrics"
+        columns: Columns to load, all but the text columns if None
+
+    Returns:
+        pandas DataFrame
+    """
+    import pandas as pd
+
+    meta = _read_meta(os.path.join(directory, table))
+    kinds = meta.get("columns", EXPORT_COLUMNS[table])
+    arrays = load_columns(directory, table, columns)
+    data = {}
+    for name, array in arrays.items():
+        if kinds[name] == "category":
+            categories = meta["categories"].get(name, [])
+            data[name] = pd.Categorical.from_codes(np.asarray(array), categories=categories)
+        elif kinds[name] == "S32":
+            data[name] = np.char.decode(array, "ascii")
+        else:
+            data[name] = array
+    return pd.DataFrame(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export new game metrics to column files")
+    parser.add_argument("--db", default="wumpus_metrics.db", help="path to the metrics database")
+    parser.add_argument("--out", default="evals/columns", help="export directory")
+    parser.add_argument(
+        "--table", choices=list(EXPORT_COLUMNS), default=None, help="export one table only"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    db = WumpusDB(args.db)
+    if args.table:
+        export_table(db, args.table, args.out)
+    else:
+        export_all(db, args.out)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
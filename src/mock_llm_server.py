@@ -0,0 +1,359 @@
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# fields of the per-turn state message built by game_planner.format_state_prompt
+ADJACENT_PATTERN = re.compile(r"Adjacent rooms: \[([\d, ]*)\]")
+EXPLORED_PATTERN = re.compile(r"Already explored rooms: ([\d, ]*)")
+
+
+@dataclass
+class LatencyModel:
+    """
+    Response latency distribution of the mock server.
+
+    Parsed from "fixed:<s>", "uniform:<low>:<high>", "normal:<mean>:<stddev>"
+    or "lognormal:<median>:<sigma>", all in seconds.
+    """
+
+    kind: str = "fixed"
+    params: List[float] = field(default_factory=lambda: [0.0])
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        kind, *params = spec.split(":")
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec: {spec}")
+        return cls(kind, [float(p) for p in params])
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(*self.params))
+        median, sigma = self.params
+        return rng.lognormvariate(0.0, sigma) * median
+
+
+@dataclass
+class MockServerStats:
+    """Counters of the requests served by the mock server."""
+
+    requests: int = 0
+    malformed: int = 0
+    rejected: int = 0
+    max_in_flight: int = 0
+
+
+class MockLLMServer:
+    """
+    Local OpenAI-compatible stand-in for the llamafile server.
+
+    Implements /v1/chat/completions with a simple legal policy (first
+    unexplored adjacent room, shooting when a Wumpus is smelled), configurable
+    latency, a rate of malformed responses and a concurrency limit, so the
+    agent's own overhead can be measured without a model.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: Optional[LatencyModel] = None,
+        malformed_rate: float = 0.0,
+        max_concurrency: Optional[int] = None,
+        reject_when_busy: bool = False,
+        seed: Optional[int] = None,
+        token_latency: float = 0.0,
+    ) -> None:
+        """
+        Initialize the server (call start() to serve).
+
+        Args:
+            host: Interface to bind to
+            port: Port to bind to, a free port if 0
+            latency: Distribution of the delay added to every response
+            malformed_rate: Fraction of responses that are not valid actions
+            max_concurrency: Maximum number of requests processed at once
+            reject_when_busy: Answer 429 instead of queueing over the limit
+            seed: Seed for latency sampling and malformed responses
+            token_latency: Delay between the chunks of a streamed response,
+                about one token each
+        """
+        self.latency = latency or LatencyModel()
+        self.token_latency = token_latency
+        self.malformed_rate = malformed_rate
+        self.reject_when_busy = reject_when_busy
+        self.rng = random.Random(seed)
+        self.stats = MockServerStats()
+
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info("* Mock LLM server listening on %s", self.url)
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def complete(self, body: dict) -> dict:
+        """Build the chat completion response for a request body."""
+        content, usage, delay = self._generate(body)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": usage,
+            "timings": {"prompt_n": usage["prompt_tokens"], "prompt_ms": delay * 1000},
+        }
+
+    def stream(self, body: dict) -> Iterator[dict]:
+        """
+        Yield the chunks of a streamed chat completion for a request body.
+
+        The content is sent about one token (4 characters) per chunk, token_latency
+        apart, followed by a chunk with the usage.
+        """
+        content, usage, _ = self._generate(body)
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        def chunk(delta: dict, finish_reason: Optional[str] = None, **extra) -> dict:
+            return {
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra,
+            }
+
+        yield chunk({"role": "assistant", "content": ""})
+        for i in range(0, len(content), 4):
+            if i:
+                time.sleep(self.token_latency)
+            yield chunk({"content": content[i : i + 4]})
+        yield chunk({}, "stop", usage=usage)
+
+    def _generate(self, body: dict) -> Tuple[str, dict, float]:
+        """Choose the response content, after the sampled latency."""
+        messages = body.get("messages", [])
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+
+        # a json_schema response_format is a grammar constraint in llama.cpp,
+        # so constrained requests always get a valid action
+        response_format = body.get("response_format") or {}
+        constrained = response_format.get("type") == "json_schema"
+
+        with self._rng_lock:
+            delay = self.latency.sample(self.rng)
+            malformed = not constrained and self.rng.random() < self.malformed_rate
+            action = choose_action(messages[-1]["content"] if messages else "", self.rng)
+        time.sleep(delay)
+
+        if malformed:
+            with self._stats_lock:
+                self.stats.malformed += 1
+            content = "I think moving is the best idea here."
+        else:
+            content = json.dumps(action)
+
+        # rough token estimate, about 4 characters per token
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return content, usage, delay
+
+    def _enter(self) -> bool:
+        if self._slots:
+            if self.reject_when_busy:
+                if not self._slots.acquire(blocking=False):
+                    with self._stats_lock:
+                        self.stats.rejected += 1
+                    return False
+            else:
+                self._slots.acquire()
+        with self._stats_lock:
+            self.stats.requests += 1
+            self._in_flight += 1
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self._in_flight)
+        return True
+
+    def _leave(self) -> None:
+        with self._stats_lock:
+            self._in_flight -= 1
+        if self._slots:
+            self._slots.release()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+                else:
+                    self._send(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": "not found"}})
+                    return
+                if not server._enter():
+                    self._send(429, {"error": {"message": "server busy"}})
+                    return
+                try:
+                    if body.get("stream"):
+                        self._send_stream(server.stream(body))
+                    else:
+                        self._send(200, server.complete(body))
+                finally:
+                    server._leave()
+
+            def _send_stream(self, chunks: Iterator[dict]) -> None:
+                # server-sent events, the end of the response is marked by closing
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    for chunk in chunks:
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # the client stopped reading once it had its action
+                    pass
+
+            def _send(self, status: int, payload: dict) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug("* Mock LLM server: " + format, *args)
+
+        return Handler
+
+
+def choose_action(prompt: str, rng: Optional[random.Random] = None) -> dict:
+    """
+    Pick a legal action from the state described in an action prompt.
+
+    Shoots into the first adjacent room when a Wumpus is smelled, otherwise
+    moves to the first unexplored adjacent room, or a random adjacent room
+    once all of them are explored so games cannot loop forever.
+    """
+    match = ADJACENT_PATTERN.search(prompt)
+    adjacent = [int(r) for r in re.findall(r"\d+", match.group(1))] if match else [1]
+    explored_match = EXPLORED_PATTERN.search(prompt)
+    explored = {int(r) for r in re.findall(r"\d+", explored_match.group(1))} if explored_match else set()
+    unexplored = [room for room in adjacent if room not in explored]
+
+    if "Wumpus smell: True" in prompt:
+        return {
+            "action": "shoot",
+            "room": adjacent[0],
+            "reasoning": f"Smelled the Wumpus, shooting into room {adjacent[0]}.",
+        }
+    room = unexplored[0] if unexplored else (rng or random).choice(adjacent)
+    return {"action": "move", "room": room, "reasoning": f"Moving to room {room} to explore."}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--latency",
+        default="fixed:0",
+        help="fixed:<s>, uniform:<low>:<high>, normal:<mean>:<sd> or lognormal:<median>:<sigma>",
+    )
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--reject-when-busy", action="store_true")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--token-latency",
+        type=float,
+        default=0.0,
+        help="delay between the chunks of streamed responses (s)",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    server = MockLLMServer(
+        args.host,
+        args.port,
+        latency=LatencyModel.parse(args.latency),
+        malformed_rate=args.malformed_rate,
+        max_concurrency=args.max_concurrency,
+        reject_when_busy=args.reject_when_busy,
+        seed=args.seed,
+        token_latency=args.token_latency,
+    )
+    server.start()
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from action_cache import ActionCache
+from game_handler import GamePrompt, WumpusGameInterface, WumpusGameState
+from game_planner import PROMPT_VERSION, GameAction, GamePlanner
+
+logger = logging.getLogger(__name__)
+
+# transcript event types, one JSON object per line
+START, COMMAND, OUTPUT, ACTION, END = "start", "cmd", "out", "act", "end"
+# decision sources answered by an LLM response, which ReplayClient serves
+LLM_SOURCES = ("llm", "speculative")
+
+
+class SessionRecorder:
+    """
+    Append-only transcript writer for a game session.
+
+    Every command sent to the game, every game output with the prompt that
+    ended it, and every planner decision with its prompt, response and
+    timings is written as one compact JSON line, flushed as it happens so a
+    crashed session still leaves a usable transcript.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open the transcript for appending.
+
+        Args:
+            path: Path of the JSONL transcript file
+        """
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._prompts_seen = set()
+
+    @classmethod
+    def for_game(cls, directory: str, game_uuid: str) -> "SessionRecorder":
+        """Create a recorder writing to <directory>/<game_uuid>.jsonl."""
+        os.makedirs(directory, exist_ok=True)
+        return cls(os.path.join(directory, f"{game_uuid}.jsonl"))
+
+    def write(self, event: dict) -> None:
+        line = json.dumps(event, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def start(self, **info) -> None:
+        self.write({"t": START, **info})
+
+    def command(self, command: str) -> None:
+        self.write({"t": COMMAND, "v": command})
+
+    def output(self, output: str, prompt: GamePrompt, wait: float) -> None:
+        self.write({"t": OUTPUT, "v": output, "p": prompt.name, "w": round(wait, 6)})
+
+    def action(
+        self,
+        source: Optional[str],
+        messages: List[dict],
+        action: GameAction,
+        call,
+        cache_key: Optional[str] = None,
+    ) -> None:
+        """
+        Record a planner decision.
+
+        The static system prompt is stored once per transcript and referenced
+        by hash afterwards, only the per-turn user message is stored every turn.
+        Actions served from the action cache keep their key, so a replay can
+        serve them from a cache again.
+        """
+        system = messages[0]["content"]
+        system_hash = hashlib.sha256(system.encode("utf-8")).hexdigest()[:16]
+        event = {
+            "t": ACTION,
+            "src": source,
+            "sys": system_hash,
+            "user": messages[-1]["content"],
+            "resp": action.model_dump_json(),
+        }
+        if system_hash not in self._prompts_seen:
+            self._prompts_seen.add(system_hash)
+            event["system"] = system
+        if cache_key is not None:
+            event["key"] = cache_key
+        if call is not None:
+            event.update(
+                lat=round(call.latency, 6),
+                pt=call.prompt_tokens,
+                ct=call.completion_tokens,
+                cached=call.cached_tokens,
+                retries=call.retries,
+            )
+        self.write(event)
+
+    def end(self, **info) -> None:
+        self.write({"t": END, **info})
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class RecordingPlanner(GamePlanner):
+    """GamePlanner that writes every decision to a SessionRecorder."""
+
+    def __init__(self, *args, recorder: SessionRecorder, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.recorder = recorder
+
+    def get_next_action(self, game_state: WumpusGameState) -> GameAction:
+        action = super().get_next_action(game_state)
+        self._record_action(game_state, action)
+        return action
+
+    def _take_speculation(self, game_state: WumpusGameState) -> Optional[GameAction]:
+        action = super()._take_speculation(game_state)
+        if action is not None:
+            self._record_action(game_state, action)
+        return action
+
+    def _record_action(self, game_state: WumpusGameState, action: GameAction) -> None:
+        cache_key = None
+        if self.last_decision_source == "cache":
+            cache_key = self.cache.make_key(
+                game_state, PROMPT_VERSION, self.model_name, self.wumpus_arrow_paths(game_state)
+            )
+        self.recorder.action(
+            self.last_decision_source,
+            self.build_messages(game_state),
+            action,
+            self.last_llm_call,
+            cache_key,
+        )
+
+
+@dataclass
+class Transcript:
+    """Events of a recorded session, split by type."""
+
+    start: dict
+    end: Optional[dict]
+    commands: List[str]
+    outputs: List[Tuple[str, GamePrompt, float]]
+    actions: List[dict]
+
+    @classmethod
+    def load(cls, path: str) -> "Transcript":
+        start, end = {}, None
+        commands, outputs, actions = [], [], []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                event = json.loads(line)
+                kind = event["t"]
+                if kind == COMMAND:
+                    commands.append(event["v"])
+                elif kind == OUTPUT:
+                    outputs.append((event["v"], GamePrompt[event["p"]], event["w"]))
+                elif kind == ACTION:
+                    actions.append(event)
+                elif kind == START:
+                    start = event
+                elif kind == END:
+                    end = event
+        return cls(start, end, commands, outputs, actions)
+
+
+class _TranscriptProcess:
+    """Stands in for the pexpect process, checking commands against the transcript."""
+
+    terminated = True
+
+    def __init__(self, interface: "ReplayGameInterface") -> None:
+        self.interface = interface
+
+    def sendline(self, command: str) -> None:
+        self.interface._check_command(command)
+
+
+class ReplayGameInterface(WumpusGameInterface):
+    """
+    WumpusGameInterface that reads game output from a transcript.
+
+    Commands and output go through the same start_game/move/shoot and output
+    parsing code as a live session; only the pty is replaced. Commands that
+    differ from the recorded ones are counted as divergences.
+    """
+
+    def __init__(self, transcript: Transcript) -> None:
+        super().__init__(game_cmd=None)
+        self.transcript = transcript
+        self.echo_output = False
+        self._outputs = deque(transcript.outputs)
+        self._commands = deque(transcript.commands)
+        self.divergences = 0
+
+    def _spawn(self):
+        return _TranscriptProcess(self)
+
+    def _check_command(self, command: str) -> None:
+        expected = self._commands.popleft() if self._commands else None
+        if expected != command:
+            self.divergences += 1
+            logger.warning("* Replay diverged: sent %r, recorded %r", command, expected)
+
+    def _read_until_prompt(self, timeout=5) -> Tuple[str, GamePrompt]:
+        if not self._outputs:
+            return "", GamePrompt.EOF
+        output, prompt, wait = self._outputs.popleft()
+        self.command_waits.append((self.last_command, 0.0))
+        return output, prompt
+
+
+class ReplayClient:
+    """
+    Serves recorded LLM responses in place of the instructor client.
+
+    Responses are looked up by the per-turn user message, so a replayed
+    planner gets the recorded answer for every prompt it reproduces exactly.
+    Decisions made without the LLM (fast path, policy, cache) are not served;
+    for a fallback decision the requests fail again, as they did when recorded.
+    """
+
+    def __init__(self, transcript: Transcript) -> None:
+        self.responses: Dict[str, Deque[dict]] = defaultdict(deque)
+        for event in transcript.actions:
+            if event["src"] in LLM_SOURCES or event["src"] == "fallback":
+                self.responses[event["user"]].append(event)
+        self.misses = 0
+        # prompt whose recorded requests failed, so its retries fail as well
+        self._failed_prompt: Optional[str] = None
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create_with_completion=self.create_with_completion)
+        )
+
+    def create_with_completion(self, response_model, messages, **kwargs):
+        event = self._response(messages)
+        return response_model.model_validate_json(event["resp"]), self._completion(event)
+
+    def stream_completion(self, messages, **kwargs) -> Iterator:
+        """Stream the recorded response in chunks, as stream_completion does."""
+        event = self._response(messages)
+        text = event["resp"]
+        for i in range(0, len(text), 8):
+            yield {"choices": [{"delta": {"content": text[i : i + 8]}}], "usage": None}
+        yield SimpleNamespace(choices=[], usage=self._completion(event).usage)
+
+    def _response(self, messages: List[dict]) -> dict:
+        prompt = messages[-1]["content"]
+        if prompt == self._failed_prompt:
+            raise ValueError("Recorded requests for this prompt failed")
+        recorded = self.responses.get(prompt)
+        if not recorded:
+            self.misses += 1
+            raise LookupError("No recorded response for this prompt")
+
+        event = recorded.popleft()
+        if event["src"] == "fallback":
+            self._failed_prompt = prompt
+            raise ValueError("Recorded requests for this prompt failed")
+        self._failed_prompt = None
+        return event
+
+    @staticmethod
+    def _completion(event: dict) -> SimpleNamespace:
+        return SimpleNamespace(
+            usage=SimpleNamespace(
+                prompt_tokens=event.get("pt", 0),
+                completion_tokens=event.get("ct", 0),
+                prompt_tokens_details=SimpleNamespace(cached_tokens=event.get("cached", 0)),
+            )
+        )
+
+
+@dataclass
+class ReplayResult:
+    """Outcome of replaying one transcript."""
+
+    path: str
+    turns: int
+    seconds: float
+    divergences: int
+    llm_misses: int
+    game_won: bool
+    recorded_won: Optional[bool]
+
+    @property
+    def turns_per_second(self) -> float:
+        return self.turns / self.seconds if self.seconds else 0.0
+
+    @property
+    def unchanged(self) -> bool:
+        return self.divergences == 0 and self.llm_misses == 0
+
+
+def replay_session(path: str, db=None) -> ReplayResult:
+    """
+    Replay a transcript through run_game at full speed.
+
+    Args:
+        path: Transcript to replay
+        db: WumpusDB to record the replayed game in, an in-memory one if None
+
+    Returns:
+        ReplayResult with throughput and whether the decisions were unchanged
+    """
+    # imported here since main imports this module for recording
+    from game_db import WumpusDB
+    from main import run_game
+
+    transcript = Transcript.load(path)
+    game_handler = ReplayGameInterface(transcript)
+    client = ReplayClient(transcript)
+    db = db or WumpusDB(":memory:")
+    options = transcript.start
+
+    cache = None
+    if options.get("cache"):
+        # only the recorded hits, the rest of the cache is not in the transcript
+        cache = ActionCache()
+        for event in transcript.actions:
+            if event["src"] == "cache" and "key" in event:
+                cache.put(event["key"], event["resp"])
+    policy = None
+    if options.get("policy_weights") is not None:
+        from distilled_policy import DistilledPolicy
+
+        policy = DistilledPolicy(options["policy_weights"])
+
+    start = time.perf_counter()
+    # a replay that outlives the recording has diverged; stopping one turn
+    # later keeps a game that never ends from hanging the replay
+    recorded_turns = len(transcript.actions)
+    # speculation is replayed sequentially: a hit is recorded under the
+    # observed state's prompt, which the replayed request then reproduces
+    metrics = run_game(
+        db,
+        game_handler,
+        strategy_id=options.get("strategy_id"),
+        cache=cache,
+        fast_path=options.get("fast_path", False),
+        client=client,
+        constrained=options.get("constrained", False),
+        stream=options.get("stream", False),
+        stream_max_tokens=options.get("stream_max_tokens"),
+        conversation=options.get("conversation", False),
+        context_budget=options.get("context_budget", 2048),
+        policy=policy,
+        policy_threshold=options.get("policy_threshold", 0.9),
+        max_turns=recorded_turns + 1,
+        stream_client=client.stream_completion,
+    )
+    seconds = time.perf_counter() - start
+    if metrics.num_turns > recorded_turns:
+        game_handler.divergences += 1
+        logger.warning("* Replay ran past the %d recorded turns", recorded_turns)
+
+    return ReplayResult(
+        path=path,
+        turns=metrics.num_turns,
+        seconds=seconds,
+        divergences=game_handler.divergences,
+        llm_misses=client.misses,
+        game_won=metrics.game_won,
+        recorded_won=transcript.end.get("game_won") if transcript.end else None,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded Wumpus game sessions")
+    parser.add_argument("transcripts", nargs="+", help="transcript files to replay")
+    parser.add_argument("--repeat", type=int, default=1, help="replay every transcript N times")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = [
+        replay_session(path) for _ in range(args.repeat) for path in args.transcripts
+    ]
+
+    turns = sum(r.turns for r in results)
+    seconds = sum(r.seconds for r in results)
+    changed = [r.path for r in results if not r.unchanged]
+    print(f"* Replayed {len(results)} sessions, {turns} turns in {seconds:.3f}s")
+    print(f"* {turns / seconds if seconds else 0:.0f} turns/s")
+    if changed:
+        print(f"* Decisions changed in {len(changed)} sessions:")
+        for path in sorted(set(changed)):
+            print(f"  {path}")
+    else:
+        print("* All decisions unchanged")
+
+
+if __name__ == "__main__":
+    main()
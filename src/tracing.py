@@ -0,0 +1,283 @@
+import cProfile
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """A timed section of the agent loop, written as a Chrome trace event on exit."""
+
+    __slots__ = ("tracer", "name", "attrs", "id", "parent", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.id = 0
+        self.parent: Optional[Span] = None
+        self.start = 0
+
+    def set(self, **attrs) -> None:
+        """Add attributes to the span, e.g. results known only at its end."""
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        stack = self.tracer._stack()
+        self.parent = stack[-1] if stack else None
+        self.id = next(self.tracer._ids)
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        end = time.perf_counter_ns()
+        self.tracer._stack().pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer._emit(self, end)
+
+
+class _NoopSpan:
+    """Span used while tracing is disabled; entering and setting do nothing."""
+
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Writes spans to a file in the Chrome trace event format.
+
+    The file is a JSON array of complete ("X") events, readable by
+    chrome://tracing, Perfetto and speedscope; nested spans of a thread show
+    up as a flame graph. Events are buffered and appended in batches, and
+    the closing bracket is optional in this format, so a trace cut short by
+    a crash can still be loaded.
+    """
+
+    def __init__(self, path: str, flush_every: int = 1000) -> None:
+        """
+        Create the trace file.
+
+        Args:
+            path: Path of the trace file, overwritten if it exists
+            flush_every: Number of buffered events that triggers a write
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write("[\n")
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+        self.events = 0
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _emit(self, span: Span, end: int) -> None:
+        args = dict(span.attrs, span_id=span.id)
+        if span.parent is not None:
+            args["parent_id"] = span.parent.id
+        event = {
+            "name": span.name,
+            "cat": span.name.split(".", 1)[0],
+            "ph": "X",
+            "ts": (span.start - self._origin) / 1000,
+            "dur": (end - span.start) / 1000,
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        line = json.dumps(event, default=str)
+        with self._lock:
+            self._buffer.append(line)
+            self.events += 1
+            if len(self._buffer) >= self.flush_every:
+                self._flush()
+
+    def _flush(self) -> None:
+        if self._buffer and not self._file.closed:
+            self._file.write(",\n".join(self._buffer) + ",\n")
+            self._file.flush()
+        self._buffer = []
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush()
+            # a metadata event naming the process keeps the array valid JSON
+            # after the trailing comma
+            metadata = {
+                "name": "process_name",
+                "ph": "M",
+                "pid": self._pid,
+                "args": {"name": "wumpus-llm-agent"},
+            }
+            self._file.write(json.dumps(metadata))
+            self._file.write("\n]\n")
+            self._file.close()
+        logger.info("* Wrote %d spans to %s", self.events, self.path)
+
+
+_tracer: Optional[Tracer] = None
+# (directory, cpu, memory) of the per-game profiles while tracing is enabled
+_profile_settings: Optional[tuple] = None
+
+
+def span(name: str, **attrs):
+    """
+    Context manager timing a section of code as a span named name.
+
+    Returns a shared no-op span while tracing is disabled, so an untraced
+    run only pays for one global lookup per span.
+    """
+    if _tracer is None:
+        return _NOOP_SPAN
+    return Span(_tracer, name, attrs)
+
+
+def traced(name: str) -> Callable:
+    """Decorator running every call of a function in a span named name."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with Span(_tracer, name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def enable_tracing(
+    path: str,
+    profile_dir: Optional[str] = None,
+    profile_cpu: bool = False,
+    profile_memory: bool = False,
+) -> Tracer:
+    """
+    Start writing spans to a Chrome trace file.
+
+    Args:
+        path: Path of the trace file
+        profile_dir: Directory for the per-game profiles, next to the trace
+            file if None
+        profile_cpu: Run every game under cProfile
+        profile_memory: Take a tracemalloc snapshot at the end of every game
+
+    Returns:
+        The active Tracer
+    """
+    global _tracer, _profile_settings
+    if _tracer is not None:
+        _tracer.close()
+    _tracer = Tracer(path)
+    _profile_settings = (
+        profile_dir or os.path.dirname(os.path.abspath(path)),
+        profile_cpu,
+        profile_memory,
+    )
+    logger.info("* Tracing spans to %s", path)
+    return _tracer
+
+
+def disable_tracing() -> None:
+    """Stop tracing and memory profiling and close the trace file."""
+    global _tracer, _profile_settings
+    tracer, _tracer = _tracer, None
+    if _profile_settings and _profile_settings[2] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _profile_settings = None
+    if tracer is not None:
+        tracer.close()
+
+
+def tracing_enabled() -> bool:
+    return _tracer is not None
+
+
+class GameProfiler:
+    """
+    Optional cProfile and tracemalloc capture of a single game.
+
+    Writes <directory>/<game_uuid>.prof (pstats, e.g. for snakeviz or
+    flameprof) and <directory>/<game_uuid>.tracemalloc (a tracemalloc
+    snapshot, loadable with tracemalloc.Snapshot.load).
+    """
+
+    def __init__(
+        self, directory: str, game_uuid: str, cpu: bool = False, memory: bool = False
+    ) -> None:
+        self.directory = directory
+        self.game_uuid = game_uuid
+        self.cpu = cpu
+        self.memory = memory
+        self._profile: Optional[cProfile.Profile] = None
+
+    def __enter__(self) -> "GameProfiler":
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.cpu:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                self._profile = profile
+            except ValueError:
+                # only one profiler can be active at a time, e.g. with
+                # concurrent trial workers
+                logger.warning("* Another game is being profiled, skipping cProfile")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, self.game_uuid)
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(base + ".prof")
+            self._profile = None
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.take_snapshot().dump(base + ".tracemalloc")
+
+
+def profile_game(game_uuid: str):
+    """Context manager profiling one game as configured by enable_tracing."""
+    if _profile_settings is None:
+        return _NOOP_SPAN
+    directory, cpu, memory = _profile_settings
+    if not (cpu or memory):
+        return _NOOP_SPAN
+    return GameProfiler(directory, game_uuid, cpu=cpu, memory=memory)
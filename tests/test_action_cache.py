@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+import action_cache
+from action_cache import ActionCache, state_fingerprint
+from game_handler import WumpusGameState
+
+
+def make_state(**overrides):
+    values = dict(
+        current_room=6,
+        adjacent_rooms=[15, 5, 7],
+        explored_rooms={5, 6},
+        wumpus_smell=True,
+    )
+    values.update(overrides)
+    return WumpusGameState(**values)
+
+
+def test_fingerprint_ignores_ordering_and_output():
+    state_a = make_state(last_output=["YOU ARE IN ROOM 6"])
+    state_b = make_state(adjacent_rooms=[5, 7, 15], explored_rooms={6, 5}, last_output=[])
+
+    assert state_fingerprint(state_a) == state_fingerprint(state_b)
+    assert state_fingerprint(state_a) != state_fingerprint(make_state(arrows_left=4))
+
+
+def test_key_depends_on_prompt_version_and_model():
+    state = make_state()
+    key = ActionCache.make_key(state, "1", "model-a")
+
+    assert key == ActionCache.make_key(make_state(), "1", "model-a")
+    assert key != ActionCache.make_key(state, "2", "model-a")
+    assert key != ActionCache.make_key(state, "1", "model-b")
+
+
+def test_key_depends_on_arrow_paths_in_the_prompt():
+    state = make_state()
+    key = ActionCache.make_key(state, "1", "model-a", {11: [5, 4, 11]})
+
+    assert key == ActionCache.make_key(make_state(), "1", "model-a", {11: [5, 4, 11]})
+    assert key != ActionCache.make_key(state, "1", "model-a")
+    assert key != ActionCache.make_key(state, "1", "model-a", {11: [7, 8, 11]})
+    assert state_fingerprint(state) == state_fingerprint(state, {})
+
+
+def test_memory_tier_is_lru():
+    cache = ActionCache(memory_size=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+    stats = cache.stats()
+    assert stats.memory_hits == 3
+    assert stats.misses == 1
+    assert stats.hit_rate == pytest.approx(0.75)
+
+
+def test_disk_tier_persists_across_instances(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = ActionCache(db_path)
+    cache.put("key", '{"action": "move"}')
+    cache.close()
+
+    cache = ActionCache(db_path)
+    assert cache.get("key") == '{"action": "move"}'
+    assert cache.get("key") == '{"action": "move"}'
+
+    stats = cache.stats()
+    assert stats.disk_hits == 1
+    assert stats.memory_hits == 1
+    assert stats.disk_entries == 1
+    cache.close()
+
+
+def test_disk_tier_evicts_by_size_and_age(tmp_path, monkeypatch):
+    monkeypatch.setattr(action_cache, "EVICT_INTERVAL", 1)
+    db_path = str(tmp_path / "cache.db")
+
+    cache = ActionCache(db_path, memory_size=1, max_entries=2)
+    for key in ["a", "b", "c"]:
+        cache.put(key, key)
+    assert cache.stats().disk_entries == 2
+    cache.close()
+
+    cache = ActionCache(db_path, memory_size=1, max_age=0.01)
+    time.sleep(0.02)
+    assert cache.get("b") is None
+    cache.close()
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+from action_stream import PartialActionParser, chunk_content
+
+
+def feed_until_decided(parser, text):
+    for i, char in enumerate(text):
+        parser.feed(char)
+        if parser.decision() is not None:
+            return i + 1
+    return None
+
+
+def test_move_is_decided_before_the_reasoning():
+    text = '{"action": "move", "room": 12, "reasoning": "Room 12 is unexplored and safe."}'
+    parser = PartialActionParser()
+
+    consumed = feed_until_decided(parser, text)
+
+    # the room is only complete once the character after it arrives
+    assert text[consumed - 1] == ","
+    assert parser.decision() == {"action": "move", "room": 12}
+    assert parser.partial_string("reasoning") is None
+
+    parser.feed(text[consumed : consumed + 25])
+    assert parser.partial_string("reasoning") == "Room 12 is"
+    parser.feed(text[consumed + 25 :])
+    assert parser.complete
+    assert parser.partial_string("reasoning") == "Room 12 is unexplored and safe."
+
+
+def test_shoot_waits_for_the_arrow_path():
+    text = '```json\n{"action": "shoot", "room": 2, "path": [2, 10], "reasoning": "Smell."}'
+    parser = PartialActionParser()
+
+    consumed = feed_until_decided(parser, text)
+
+    assert text[:consumed].endswith("[2, 10]")
+    assert parser.decision() == {"action": "shoot", "room": 2, "path": [2, 10]}
+
+
+def test_shoot_waits_for_a_path_after_the_reasoning():
+    parser = PartialActionParser()
+    parser.feed('{"action": "shoot", "room": 3, "reasoning": "Smell in 3."')
+    assert parser.decision() is None
+
+    parser.feed(', "path": [3, 4]}')
+    assert parser.decision() == {"action": "shoot", "room": 3, "path": [3, 4]}
+
+
+def test_shoot_without_path_is_decided_at_the_end():
+    parser = PartialActionParser()
+    parser.feed('{"action": "shoot", "room": 2, "reasoning": "Sm')
+    assert parser.decision() is None
+    assert parser.decision(final=True) == {"action": "shoot", "room": 2}
+
+    parser.feed('ell."}')
+    assert parser.decision() == {"action": "shoot", "room": 2}
+
+
+def test_partial_string_drops_cut_escape():
+    parser = PartialActionParser()
+    parser.feed('{"reasoning": "Line one\\')
+    assert parser.partial_string("reasoning") == "Line one"
+    parser.feed('n')
+    assert parser.partial_string("reasoning") == "Line one\n"
+
+
+def test_chunk_content_reads_objects_and_dicts():
+    usage = SimpleNamespace(completion_tokens=3)
+    delta = SimpleNamespace(content="{")
+    chunk = SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+    assert chunk_content(chunk) == ("{", None)
+    assert chunk_content(SimpleNamespace(choices=[], usage=usage)) == ("", usage)
+    assert chunk_content({"choices": [{"delta": {"content": "x"}}]}) == ("x", None)
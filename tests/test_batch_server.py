@@ -0,0 +1,137 @@
+import io
+import json
+import random
+import re
+import threading
+from types import SimpleNamespace
+
+from batch_server import BatchServer, submit_jobs
+
+
+def echo(job):
+    if job.get("fail"):
+        raise RuntimeError("boom")
+    return {"seed": job.get("seed")}
+
+
+def test_serve_stream_replies_per_job():
+    server = BatchServer(echo, workers=2)
+    infile = io.StringIO(
+        '{"id": 1, "seed": 5}\n\nnot json\n{"id": 2, "fail": true}\n{"id": 3}\n'
+    )
+    outfile = io.StringIO()
+
+    server.serve_stream(infile, outfile)
+    server.close()
+
+    replies = [json.loads(line) for line in outfile.getvalue().splitlines()]
+    by_id = {reply.get("id"): reply for reply in replies}
+    assert by_id[1] == {"id": 1, "seed": 5}
+    assert by_id[2] == {"id": 2, "error": "boom"}
+    assert by_id[3] == {"id": 3, "seed": None}
+    assert by_id[None]["error"].startswith("invalid job")
+    assert server.jobs == 3
+    assert server.failures == 1
+
+
+def test_serve_stream_stops_at_shutdown_command():
+    server = BatchServer(echo)
+    infile = io.StringIO('{"id": 1}\n{"command": "shutdown"}\n{"id": 2}\n')
+    outfile = io.StringIO()
+
+    server.serve_stream(infile, outfile)
+    server.close()
+
+    assert [json.loads(line)["id"] for line in outfile.getvalue().splitlines()] == [1]
+
+
+def test_socket_serves_connections_until_shutdown(tmp_path):
+    path = str(tmp_path / "jobs.sock")
+    server = BatchServer(echo, workers=2)
+    ready = threading.Event()
+    thread = threading.Thread(target=server.serve_socket, args=(path,), kwargs={"ready": ready})
+    thread.start()
+    assert ready.wait(5)
+
+    first = submit_jobs(path, [{"id": i, "seed": i} for i in range(4)])
+    second = submit_jobs(path, [{"id": "x", "seed": 9}])
+    submit_jobs(path, [{"command": "shutdown"}])
+    thread.join(5)
+    server.close()
+
+    assert sorted(reply["id"] for reply in first) == [0, 1, 2, 3]
+    assert all(reply["seed"] == reply["id"] for reply in first)
+    assert second == [{"id": "x", "seed": 9}]
+    assert not thread.is_alive()
+    assert server.jobs == 5
+
+
+class ExplorerClient:
+    """Scripted LLM client that explores unvisited rooms, otherwise moves at random."""
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create_with_completion=self.create_with_completion)
+        )
+
+    def create_with_completion(self, response_model, messages, **kwargs):
+        self.requests += 1
+        prompt = messages[-1]["content"]
+        rooms = [int(r) for r in re.search(r"Adjacent rooms: \[([\d, ]*)\]", prompt).group(1).split(",")]
+        unexplored = re.search(r"UNEXPLORED adjacent rooms: ([\d, ]*)", prompt).group(1)
+        room = int(unexplored.split(",")[0]) if unexplored.strip() else self.rng.choice(rooms)
+        action = response_model(action="move", room=room, reasoning="Exploring.")
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20)
+        return action, SimpleNamespace(usage=usage)
+
+
+def test_serve_jobs_plays_games_with_shared_client(monkeypatch):
+    from game_db import WumpusDB
+    from main import serve_jobs
+
+    monkeypatch.setenv("WUMPUS_ENGINE", "builtin")
+    jobs = [{"id": i, "seed": i, "strategy_id": "batch"} for i in range(3)]
+    monkeypatch.setattr("sys.stdin", io.StringIO("".join(json.dumps(j) + "\n" for j in jobs)))
+    stdout = io.StringIO()
+    monkeypatch.setattr("sys.stdout", stdout)
+    db = WumpusDB(":memory:")
+    client = ExplorerClient()
+
+    server = serve_jobs(db, "-", num_workers=2, client=client, fast_path=True)
+
+    replies = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert sorted(reply["id"] for reply in replies) == [0, 1, 2]
+    assert all("error" not in reply and reply["setup_time"] >= 0 for reply in replies)
+    assert server.jobs == 3 and server.failures == 0
+    assert client.requests > 0
+    rows = db.conn.execute(
+        "SELECT game_uuid, strategy_id, setup_time FROM game_metrics"
+    ).fetchall()
+    assert {row[0] for row in rows} == {reply["game_uuid"] for reply in replies}
+    assert all(row[1] == "batch" and row[2] >= 0 for row in rows)
+
+
+def test_serve_jobs_keeps_game_output_off_stdout(monkeypatch):
+    import main
+    from game_db import WumpusDB
+    from game_engine import WumpusGameEngine
+
+    class EchoingEngine(WumpusGameEngine):
+        # echoes like the wumpus binary's handler
+        def _finish(self, output, prompt=None):
+            super()._finish(output, prompt)
+            if self.echo_output:
+                print(self.game_state.raw_output.upper())
+
+    monkeypatch.setattr(main, "create_game_handler", lambda seed, pool: EchoingEngine(seed))
+    monkeypatch.setattr("sys.stdin", io.StringIO('{"id": 1, "seed": 1}\n'))
+    stdout = io.StringIO()
+    monkeypatch.setattr("sys.stdout", stdout)
+
+    server = main.serve_jobs(WumpusDB(":memory:"), "-", client=ExplorerClient(), fast_path=True)
+
+    replies = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert [reply["id"] for reply in replies] == [1]
+    assert server.failures == 0
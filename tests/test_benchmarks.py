@@ -0,0 +1,179 @@
+"""
+End-to-end throughput benchmarks against the bundled mock LLM server.
+
+The agent plays the builtin engine while the mock server answers every LLM
+call, so the measurements cover the agent's own overhead: instructor
+validation, litellm request building, game I/O and SQLite. Run with
+
+    WUMPUS_BENCHMARK=1 pytest -s tests/test_benchmarks.py
+
+Results are appended to benchmarks/results.jsonl (override with
+WUMPUS_BENCHMARK_RESULTS) keyed by git commit, and every run is compared
+with the last result recorded at a different commit.
+"""
+
+import json
+import logging
+import os
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("WUMPUS_BENCHMARK"), reason="set WUMPUS_BENCHMARK=1 to run benchmarks"
+)
+
+pytest.importorskip("instructor")
+pytest.importorskip("litellm")
+
+from game_db import WumpusDB
+from game_engine import WumpusGameEngine
+from mock_llm_server import LatencyModel, MockLLMServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.environ.get(
+    "WUMPUS_BENCHMARK_RESULTS", os.path.join(ROOT, "benchmarks", "results.jsonl")
+)
+# slowdown relative to the previous commit that is reported as a regression
+REGRESSION_THRESHOLD = 0.8
+NUM_GAMES = 20
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def previous_result(name, commit):
+    if not os.path.exists(RESULTS_PATH):
+        return None
+    previous = None
+    with open(RESULTS_PATH, encoding="utf-8") as f:
+        for line in f:
+            result = json.loads(line)
+            if result["name"] == name and result["commit"] != commit:
+                previous = result
+    return previous
+
+
+def save_result(name, **measurements):
+    commit = git_commit()
+    result = {
+        "name": name,
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        **measurements,
+    }
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+
+    print(f"\n* {name} @ {commit}: " + ", ".join(f"{k}={v:.4g}" for k, v in measurements.items()))
+    previous = previous_result(name, commit)
+    if previous and "turns_per_second" in measurements and measurements["turns_per_second"] < (
+        REGRESSION_THRESHOLD * previous["turns_per_second"]
+    ):
+        print(
+            f"* REGRESSION: {measurements['turns_per_second']:.1f} turns/s, "
+            f"was {previous['turns_per_second']:.1f} at {previous['commit']}"
+        )
+    return result
+
+
+@pytest.fixture
+def mock_server(monkeypatch, request):
+    latency = getattr(request, "param", "fixed:0")
+    server = MockLLMServer(latency=LatencyModel.parse(latency), seed=0).start()
+    monkeypatch.setenv("OPENAI_API_BASE", server.url)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-no-key-required")
+    monkeypatch.setenv("LITELLM_MODEL", "openai/mock")
+    monkeypatch.setenv("WUMPUS_ENGINE", "builtin")
+    logging.getLogger().setLevel(logging.WARNING)
+    yield server
+    server.stop()
+
+
+def test_run_game_throughput(mock_server):
+    from main import run_game
+
+    db = WumpusDB(":memory:")
+    turns = 0
+    peaks = []
+    start = time.perf_counter()
+    for seed in range(NUM_GAMES):
+        game_handler = WumpusGameEngine(seed=seed)
+        game_handler.echo_output = False
+        tracemalloc.start()
+        metrics = run_game(db, game_handler, strategy_id="benchmark")
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        turns += metrics.num_turns
+    wall_time = time.perf_counter() - start
+
+    assert turns > 0
+    # the mock server answers without delay, so the turn time is all overhead
+    save_result(
+        "run_game",
+        games=NUM_GAMES,
+        turns=turns,
+        turns_per_second=turns / wall_time,
+        overhead_ms_per_turn=wall_time / turns * 1000,
+        peak_kib_per_game=max(peaks) / 1024,
+    )
+
+
+@pytest.mark.parametrize("mock_server", ["fixed:0.02"], indirect=True)
+def test_run_trials_throughput(mock_server):
+    from main import run_trials
+
+    db = WumpusDB(":memory:")
+    summary = run_trials(db, num_trials=NUM_GAMES, num_workers=4, strategy_id="benchmark", seed=0)
+
+    assert summary.games == NUM_GAMES
+    save_result(
+        "run_trials",
+        games=summary.games,
+        turns=summary.total_turns,
+        turns_per_second=summary.turns_per_second,
+        games_per_minute=summary.games_per_minute,
+        max_in_flight=mock_server.stats.max_in_flight,
+    )
+
+
+def test_game_state_memory():
+    from game_handler import WumpusGameState
+
+    states = []
+    for seed in range(NUM_GAMES):
+        game = WumpusGameEngine(seed=seed)
+        game.echo_output = False
+        game.start_game()
+        states.append(game.get_game_state())
+
+    # per-turn history of 100 games of 50 turns, with and without the output
+    tracemalloc.start()
+    history = [state.snapshot() for _ in range(100 * 50 // NUM_GAMES) for state in states]
+    snapshot_bytes = tracemalloc.get_traced_memory()[0] / len(history)
+    tracemalloc.stop()
+    tracemalloc.start()
+    copies = [WumpusGameState.from_snapshot(state.snapshot(output=True)) for state in states]
+    state_bytes = tracemalloc.get_traced_memory()[0] / len(copies)
+    tracemalloc.stop()
+
+    assert len(history) == 100 * 50
+    save_result(
+        "game_state_memory",
+        bytes_per_snapshot=snapshot_bytes,
+        bytes_per_state=state_bytes,
+    )
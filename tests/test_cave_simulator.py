@@ -0,0 +1,173 @@
+import random
+
+import numpy as np
+import pytest
+
+from cave_simulator import (
+    OUT_OF_ARROWS,
+    OWN_ARROW,
+    PIT,
+    PLAYING,
+    WON,
+    WUMPUS,
+    BatchCaveEnv,
+    BatchPolicy,
+    Beliefs,
+    BeliefPolicy,
+    RandomWalkPolicy,
+    main,
+    simulate,
+)
+from game_db import WumpusDB
+from game_engine import CAVE, WumpusGameEngine
+
+
+def place(env, player, wumpus, pits=(18, 19), bats=(16, 17)):
+    env.player[:] = player
+    env.wumpus[:] = wumpus
+    env.pits[:] = pits
+    env.bats[:] = bats
+    env._percepts()
+
+
+def moves(env, room):
+    targets = np.full((env.num_games, 5), -1)
+    targets[:, 0] = room
+    return np.zeros(env.num_games, dtype=bool), targets
+
+
+def shots(env, *path):
+    targets = np.full((env.num_games, 5), -1)
+    targets[:, : len(path)] = path
+    return np.ones(env.num_games, dtype=bool), targets
+
+
+def test_percepts_follow_engine_order():
+    env = BatchCaveEnv(1, seed=0)
+    # room 0 has tunnels to 1, 4 and 7
+    place(env, player=0, wumpus=1, pits=(4, 19), bats=(7, 18))
+
+    assert env.smell[0] and env.draft[0] and env.bats_nearby[0]
+
+    place(env, player=0, wumpus=10, pits=(15, 19), bats=(7, 18))
+    assert not env.smell[0] and not env.draft[0] and env.bats_nearby[0]
+
+
+def test_smell_hides_pit_sharing_the_wumpus_room():
+    env = BatchCaveEnv(1, seed=0)
+    # the Wumpus shares room 1 with a pit, so only the smell is reported
+    place(env, player=0, wumpus=1, pits=(1, 19), bats=(16, 17))
+    assert env.smell[0] and not env.draft[0]
+
+    beliefs = Beliefs(1)
+    beliefs.observe(env)
+    # no tunnel has been ruled out for the Wumpus, so none is cleared of a pit
+    assert not beliefs.no_pit[0, [1, 4, 7]].any() and not beliefs.no_bats[0, [1, 4, 7]].any()
+    assert beliefs.no_pit[0, 0] and beliefs.no_bats[0, 0]
+
+
+def test_batch_policy_requires_act():
+    with pytest.raises(TypeError):
+        BatchPolicy()
+
+
+def test_moves_resolve_hazards():
+    env = BatchCaveEnv(1, seed=0)
+    place(env, player=0, wumpus=10, pits=(4, 19))
+    env.step(*moves(env, 4))
+    assert env.outcome[0] == PIT
+
+    env = BatchCaveEnv(1, seed=0)
+    place(env, player=0, wumpus=10)
+    env.step(*moves(env, 12))
+    assert env.player[0] == 0 and env.outcome[0] == PLAYING
+    env.step(*moves(env, 1))
+    assert env.player[0] == 1 and env.explored[0].sum() == 1 and env.turns[0] == 2
+
+
+def test_bats_carry_the_player_off():
+    env = BatchCaveEnv(200, seed=1)
+    place(env, player=0, wumpus=10, pits=(18, 19), bats=(1, 17))
+
+    env.step(*moves(env, 1))
+
+    playing = env.outcome == PLAYING
+    assert not (env.player[playing] == 1).all()
+    assert set(np.unique(env.outcome)) <= {PLAYING, PIT, WUMPUS}
+
+
+def test_shots_hit_miss_and_run_out():
+    env = BatchCaveEnv(1, seed=0)
+    place(env, player=0, wumpus=2)
+    env.step(*shots(env, 1, 2))
+    assert env.outcome[0] == WON and env.arrows[0] == 4
+
+    env = BatchCaveEnv(1, seed=0)
+    place(env, player=0, wumpus=2)
+    # doubling back to the room before last is rejected, so the arrow stops in 1
+    env.step(*shots(env, 1, 0, 1))
+    assert env.outcome[0] == OWN_ARROW
+
+    env = BatchCaveEnv(50, seed=2)
+    place(env, player=0, wumpus=10)
+    env.arrows[:] = 1
+    env.step(*shots(env, 1))
+    assert env.woke.all()
+    assert set(np.unique(env.outcome)) == {OUT_OF_ARROWS}
+
+
+def test_random_walk_matches_engine_outcomes():
+    games = 3000
+    _, batch = simulate(RandomWalkPolicy(), games, seed=5)
+
+    rng = random.Random(5)
+    won = pits = 0
+    for seed in range(games):
+        engine = WumpusGameEngine(seed=seed)
+        engine.echo_output = False
+        engine.start_game()
+        state = engine.game_state
+        while not state.game_over and state.arrows_left > 0:
+            room = rng.choice(CAVE[engine.player]) + 1
+            engine.shoot(room) if state.wumpus_smell else engine.move(room)
+        won += state.win_state
+        pits += engine.player in engine.pits
+
+    assert abs(batch.win_rate - won / games) < 0.04
+    assert abs(batch.outcomes["pit"] - pits / games) < 0.04
+
+
+def test_belief_policy_beats_random_walk():
+    _, random_walk = simulate(RandomWalkPolicy(), 2000, seed=3)
+    _, belief = simulate(BeliefPolicy(), 2000, seed=3)
+
+    assert belief.win_rate > random_walk.win_rate + 0.15
+    assert sum(belief.outcomes.values()) == 1
+
+
+def test_cli_records_baselines_in_game_metrics(tmp_path, capsys):
+    path = str(tmp_path / "metrics.db")
+
+    main(["--games", "50", "--policies", "random_walk", "belief", "--seed", "0", "--db", path])
+
+    db = WumpusDB(path)
+    rows = db.conn.execute(
+        "SELECT strategy_id, COUNT(*), SUM(game_won), MAX(model) FROM game_metrics "
+        "GROUP BY strategy_id ORDER BY strategy_id"
+    ).fetchall()
+    summary = db.conn.execute(
+        "SELECT strategy_id, SUM(games) FROM game_summary GROUP BY strategy_id ORDER BY 1"
+    ).fetchall()
+    db.close()
+    assert [(r[0], r[1], r[3]) for r in rows] == [
+        ("baseline:belief", 50, "simulator"),
+        ("baseline:random_walk", 50, "simulator"),
+    ]
+    assert summary == [("baseline:belief", 50), ("baseline:random_walk", 50)]
+    assert "random_walk" in capsys.readouterr().out
+
+
+def test_cli_plays_every_policy_on_the_same_caves(capsys):
+    first, second = main(["--games", "200", "--policies", "random_walk", "random_walk"])
+
+    assert first.outcomes == second.outcomes and first.mean_turns == second.mean_turns
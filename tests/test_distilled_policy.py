@@ -0,0 +1,172 @@
+import json
+import random
+import re
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from distilled_policy import (
+    FEATURES,
+    DistilledPolicy,
+    candidate_features,
+    load_training_set,
+    train_policy,
+)
+from game_db import GameMetrics, TurnEvent, WumpusDB
+from game_engine import WumpusGameEngine
+from game_handler import WumpusGameState
+from game_knowledge import CaveKnowledge
+from main import run_game
+
+
+class ExplorerClient:
+    """Scripted LLM client that moves to the lowest unexplored room, otherwise at random."""
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create_with_completion=self.create_with_completion)
+        )
+
+    def create_with_completion(self, response_model, messages, **kwargs):
+        self.requests += 1
+        prompt = messages[-1]["content"]
+        rooms = [int(r) for r in re.search(r"Adjacent rooms: \[([\d, ]*)\]", prompt).group(1).split(",")]
+        unexplored = re.search(r"UNEXPLORED adjacent rooms: ([\d, ]*)", prompt).group(1)
+        room = int(unexplored.split(",")[0]) if unexplored.strip() else self.rng.choice(rooms)
+        action = response_model(action="move", room=room, reasoning="Exploring.")
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20)
+        return action, SimpleNamespace(usage=usage)
+
+
+@pytest.fixture(scope="module")
+def logged_db():
+    db = WumpusDB(":memory:")
+    client = ExplorerClient()
+    for seed in range(40):
+        engine = WumpusGameEngine(seed=seed)
+        engine.echo_output = False
+        run_game(db, engine, client=client)
+    return db
+
+
+def test_training_set_replays_logged_turns(logged_db):
+    data = load_training_set(logged_db, won_only=False)
+
+    llm_turns = logged_db.conn.execute(
+        "SELECT COUNT(*) FROM turn_events WHERE decision_source = 'llm'"
+    ).fetchone()[0]
+    assert 0 < len(data) <= llm_turns
+    assert data.features.shape == (len(data), 6, len(FEATURES))
+    assert data.valid[np.arange(len(data)), data.labels].all()
+    # the explorer only moves
+    assert (data.labels % 2 == 0).all()
+    assert len(load_training_set(logged_db, won_only=True)) < len(data)
+
+
+def test_training_set_forgets_the_wumpus_after_a_missed_shot():
+    db = WumpusDB(":memory:")
+    uuid = "c" * 32
+    # smelled in room 1, then in room 2 before and after a missed shot woke the Wumpus
+    turns = [(1, (2, 5, 8), "move", 2), (2, (1, 3, 10), "shoot", 3), (2, (1, 3, 10), "shoot", 10)]
+    for turn, (room, adjacent, action, target) in enumerate(turns, 1):
+        state = {"room": room, "adjacent": list(adjacent), "draft": False, "smell": True}
+        state.update(bats=False, arrows=6 - turn)
+        db.record_turn(
+            TurnEvent(
+                game_uuid=uuid,
+                turn=turn,
+                timestamp=datetime(2024, 11, 20, 12, 0, turn),
+                action=action,
+                room=target,
+                state_before=json.dumps(state),
+                state_after=json.dumps(state),
+                decision_source="llm",
+                turn_time=0.5,
+            )
+        )
+    db.add_game_metrics(
+        GameMetrics(
+            timestamp=datetime(2024, 11, 20, 12, 0, 0),
+            num_turns=3,
+            rooms_explored=2,
+            death_by_pit=False,
+            death_by_wumpus=True,
+            death_by_arrows=False,
+            game_won=False,
+            arrows_remaining=3,
+            action_generation_errors=0,
+            average_response_time=0.5,
+            total_response_time=1.5,
+            game_uuid=uuid,
+        ),
+        [],
+    )
+
+    data = load_training_set(db, won_only=False)
+
+    knowledge = CaveKnowledge()
+    knowledge.observe(1, (2, 5, 8), False, True, False)
+    knowledge.observe(2, (1, 3, 10), False, True, False)
+    knowledge.wumpus_moved()
+    knowledge.observe(2, (1, 3, 10), False, True, False)
+    _, expected = candidate_features(2, (1, 3, 10), True, 3, knowledge)
+    assert len(data) == 3
+    assert np.array_equal(data.features[-1], expected)
+    # every tunnel of room 2, the only smell since the Wumpus woke, may lead to it
+    assert data.features[-1][:, FEATURES.index("shoot_possible_wumpus")].sum() == 3
+
+
+def test_policy_learns_logged_choices(logged_db, tmp_path):
+    data = load_training_set(logged_db, won_only=False)
+    train, holdout = data.split(0.25)
+
+    policy = train_policy(train)
+    results = {r["threshold"]: r for r in policy.evaluate(holdout)}
+
+    assert results[0.5]["accuracy"] > 0.8
+    assert results[0.9]["coverage"] > 0
+    assert policy.weights[FEATURES.index("move_unvisited")] > 0
+
+    path = str(tmp_path / "policy.json")
+    policy.save(path)
+    loaded = DistilledPolicy.load(path)
+    assert np.allclose(loaded.weights, policy.weights)
+    assert loaded.metadata["turns"] == len(train)
+
+
+def test_policy_decides_from_knowledge():
+    weights = np.zeros(len(FEATURES))
+    weights[FEATURES.index("move_unvisited")] = 5.0
+    weights[FEATURES.index("move_rank")] = -1.0
+    policy = DistilledPolicy(weights)
+    knowledge = CaveKnowledge()
+    knowledge.observe(1, (2, 5, 8), False, False, False)
+    knowledge.observe(2, (1, 3, 10), False, False, False)
+    state = WumpusGameState(current_room=2, adjacent_rooms=[1, 3, 10], arrows_left=0)
+
+    decision = policy.decide(state, knowledge)
+
+    assert decision.action == "move"
+    assert decision.room == 3
+    assert 0.5 < decision.confidence < 1
+
+
+def test_planner_serves_confident_turns_from_policy(logged_db):
+    policy = train_policy(load_training_set(logged_db, won_only=False))
+    db = WumpusDB(":memory:")
+    client = ExplorerClient()
+    engine = WumpusGameEngine(seed=3)
+    engine.echo_output = False
+
+    metrics = run_game(db, engine, client=client, policy=policy, policy_threshold=0.6)
+
+    sources = [
+        row[0] for row in db.conn.execute("SELECT decision_source FROM turn_events ORDER BY turn")
+    ]
+    assert metrics.policy_actions == sources.count("policy") > 0
+    assert metrics.llm_calls == client.requests == sources.count("llm")
+    assert metrics.num_turns == len(sources)
@@ -0,0 +1,215 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from game_db import EndpointMetrics, GameMetrics, TurnEvent, WumpusDB
+
+
+def make_metrics(**overrides):
+    values = dict(
+        timestamp=datetime(2024, 11, 20, 12, 0, 0),
+        num_turns=12,
+        rooms_explored=7,
+        death_by_pit=False,
+        death_by_wumpus=False,
+        death_by_arrows=False,
+        game_won=True,
+        arrows_remaining=4,
+        action_generation_errors=0,
+        average_response_time=8.5,
+        total_response_time=102.0,
+    )
+    values.update(overrides)
+    return GameMetrics(**values)
+
+
+def test_add_game_metrics_stores_strategy_id(tmp_path):
+    db = WumpusDB(str(tmp_path / "metrics.db"))
+    db.add_game_metrics(make_metrics(strategy_id="baseline"))
+
+    row = db.conn.execute("SELECT num_turns, game_won, strategy_id FROM game_metrics").fetchone()
+    assert row == (12, 1, "baseline")
+    db.close()
+
+
+def test_schema_migrates_existing_database(tmp_path):
+    db_path = str(tmp_path / "metrics.db")
+
+    # database created before the strategy_id column existed
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE game_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            num_turns INTEGER NOT NULL,
+            rooms_explored INTEGER NOT NULL,
+            death_by_pit BOOLEAN NOT NULL,
+            death_by_wumpus BOOLEAN NOT NULL,
+            death_by_arrows BOOLEAN NOT NULL,
+            game_won BOOLEAN NOT NULL,
+            arrows_remaining INTEGER NOT NULL,
+            action_generation_errors INTEGER DEFAULT 0,
+            average_response_time FLOAT,
+            total_response_time FLOAT
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+    db = WumpusDB(db_path)
+    db.add_game_metrics(make_metrics(strategy_id="s1"))
+
+    assert db.conn.execute("SELECT strategy_id FROM game_metrics").fetchone() == ("s1",)
+    db.close()
+
+
+def make_turn(game_uuid, turn, **overrides):
+    values = dict(
+        game_uuid=game_uuid,
+        turn=turn,
+        timestamp=datetime(2024, 11, 20, 12, 0, turn),
+        action="move",
+        room=turn + 1,
+        state_before='{"room": 1}',
+        state_after='{"room": 2}',
+        decision_source="llm",
+        turn_time=1.5,
+        llm_latency=1.2,
+        prompt_tokens=900,
+        completion_tokens=40,
+        io_wait=0.05,
+    )
+    values.update(overrides)
+    return TurnEvent(**values)
+
+
+def test_turn_events_are_buffered_until_game_end(tmp_path):
+    db = WumpusDB(str(tmp_path / "metrics.db"))
+    for turn in range(1, 4):
+        db.record_turn(make_turn("game-1", turn))
+
+    # nothing is written until the game's metrics are added
+    assert db.conn.execute("SELECT COUNT(*) FROM turn_events").fetchone() == (0,)
+
+    db.add_game_metrics(make_metrics(num_turns=3, game_uuid="game-1"))
+
+    rows = db.conn.execute("""
+        SELECT t.turn, t.room, t.decision_source, m.num_turns
+        FROM turn_events t JOIN game_metrics m ON m.game_uuid = t.game_uuid
+        ORDER BY t.turn
+    """).fetchall()
+    assert rows == [(1, 2, "llm", 3), (2, 3, "llm", 3), (3, 4, "llm", 3)]
+    db.close()
+
+
+def test_turn_events_flush_on_threshold(tmp_path):
+    db = WumpusDB(str(tmp_path / "metrics.db"), turn_flush_threshold=2)
+    db.record_turn(make_turn("game-1", 1))
+    assert db.conn.execute("SELECT COUNT(*) FROM turn_events").fetchone() == (0,)
+
+    db.record_turn(make_turn("game-1", 2))
+    assert db.conn.execute("SELECT COUNT(*) FROM turn_events").fetchone() == (2,)
+
+    # leftover events are flushed on close
+    db.record_turn(make_turn("game-1", 3))
+    db.close()
+    db = WumpusDB(str(tmp_path / "metrics.db"))
+    assert db.conn.execute("SELECT COUNT(*) FROM turn_events").fetchone() == (3,)
+    db.close()
+
+
+def test_database_uses_wal_journal(tmp_path):
+    db = WumpusDB(str(tmp_path / "metrics.db"))
+    assert db.conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    db.close()
+
+
+def test_summary_is_updated_with_every_game(tmp_path):
+    db = WumpusDB(str(tmp_path / "metrics.db"))
+    db.add_game_metrics(make_metrics(strategy_id="a", num_turns=10))
+    db.add_game_metrics(
+        make_metrics(strategy_id="a", game_won=False, death_by_pit=True, num_turns=20)
+    )
+    db.add_game_metrics(make_metrics(strategy_id="b", model="m1"))
+
+    rows = db.summary()
+    assert [row.group for row in rows] == [{"strategy_id": "a"}, {"strategy_id": "b"}]
+    assert rows[0].games == 2
+    assert rows[0].win_rate == 0.5
+    assert rows[0].mean_turns == 15
+    assert rows[0].death_rates()["death_by_pit"] == 0.5
+
+    by_model = db.summary(group_by=("model",))
+    assert [(row.group["model"], row.games) for row in by_model] == [(None, 2), ("m1", 1)]
+    db.close()
+
+
+def test_summary_time_windows(tmp_path):
+    db = WumpusDB(str(tmp_path / "metrics.db"))
+    db.add_game_metrics(make_metrics(timestamp=datetime(2024, 11, 20, 12, 5)))
+    db.add_game_metrics(make_metrics(timestamp=datetime(2024, 11, 20, 15, 30)))
+    db.add_game_metrics(make_metrics(timestamp=datetime(2024, 11, 21, 9, 0)))
+
+    daily = db.summary(group_by=(), window="day")
+    assert [(row.group["period"], row.games) for row in daily] == [
+        ("2024-11-20", 2),
+        ("2024-11-21", 1),
+    ]
+    hourly = db.summary(group_by=(), window="hour", since=datetime(2024, 11, 20, 15))
+    assert [row.group["period"] for row in hourly] == ["2024-11-20 15:00", "2024-11-21 09:00"]
+    with pytest.raises(ValueError):
+        db.summary(group_by=("num_turns",))
+    db.close()
+
+
+def test_percentiles(tmp_path):
+    db = WumpusDB(str(tmp_path / "metrics.db"))
+    for turns in range(1, 101):
+        db.add_game_metrics(make_metrics(num_turns=turns, average_response_time=turns / 10))
+
+    turns = db.percentiles("turns", quantiles=(50, 90))
+    assert turns == {(None,): {50: 50.0, 90: 90.0}}
+
+    latency = db.percentiles("response_time", quantiles=(50,), group_by=())[()]
+    assert latency[50] == pytest.approx(5.0, rel=0.05)
+    db.close()
+
+
+def test_summary_is_built_for_existing_games(tmp_path):
+    db_path = str(tmp_path / "metrics.db")
+    db = WumpusDB(db_path)
+    db.add_game_metrics(make_metrics(strategy_id="a"))
+    db.conn.execute("DELETE FROM game_summary")
+    db.conn.commit()
+    db.close()
+
+    db = WumpusDB(db_path)
+    assert [row.games for row in db.summary()] == [1]
+    db.close()
+
+
+def test_endpoint_metrics_are_recorded_with_the_game(tmp_path):
+    db = WumpusDB(str(tmp_path / "metrics.db"))
+    db.record_turn(make_turn("game-1", 1, endpoint="http://a/v1"))
+    db.add_game_metrics(
+        make_metrics(game_uuid="game-1"),
+        [
+            EndpointMetrics("game-1", "http://a/v1", 3, 6.0, 2700, 120),
+            EndpointMetrics("game-1", "http://b/v1", 1, 1.0, 900, 40),
+        ],
+    )
+    db.add_game_metrics(
+        make_metrics(game_uuid="game-2"),
+        [EndpointMetrics("game-2", "http://a/v1", 1, 2.0, 900, 40)],
+    )
+
+    assert db.conn.execute("SELECT endpoint FROM turn_events").fetchone() == ("http://a/v1",)
+    summary = db.endpoint_summary()
+    assert [(row.endpoint, row.requests) for row in summary] == [
+        ("http://a/v1", 4),
+        ("http://b/v1", 1),
+    ]
+    assert summary[0].mean_latency == 2.0
+    assert summary[0].tokens_per_second == 20.0
+    db.close()
@@ -0,0 +1,131 @@
+import pytest
+
+from game_engine import CAVE, WumpusGameEngine
+from game_handler import WumpusGameState
+
+
+def test_cave_is_dodecahedron():
+    # every room has three tunnels and every tunnel goes both ways
+    for room, tunnels in enumerate(CAVE):
+        assert len(set(tunnels)) == 3
+        for other in tunnels:
+            assert room in CAVE[other]
+
+
+def test_start_game_is_reproducible_with_seed():
+    game_a = WumpusGameEngine(seed=42)
+    game_b = WumpusGameEngine(seed=42)
+    game_a.start_game()
+    game_b.start_game()
+
+    assert (game_a.player, game_a.wumpus, game_a.pits, game_a.bats) == (
+        game_b.player,
+        game_b.wumpus,
+        game_b.pits,
+        game_b.bats,
+    )
+    assert game_a.get_game_state().last_output == game_b.get_game_state().last_output
+
+
+def test_start_game_fills_game_state():
+    game = WumpusGameEngine(seed=1)
+    game.start_game()
+    state = game.get_game_state()
+
+    assert isinstance(state, WumpusGameState)
+    assert state.current_room == game.player + 1
+    assert state.adjacent_rooms == [room + 1 for room in CAVE[game.player]]
+    assert f"YOU ARE IN ROOM {state.current_room}" in state.last_output
+    assert state.game_over == False
+
+
+def test_move_into_pit_ends_game():
+    game = WumpusGameEngine(seed=3)
+    game.start_game()
+    game.player, game.wumpus, game.pits, game.bats = 0, 19, (1, 18), (17, 16)
+
+    game.move(2)
+    state = game.get_game_state()
+
+    assert state.game_over == True
+    assert state.win_state == False
+    assert "FELL IN PIT" in ",".join(state.last_output)
+    assert 2 in state.explored_rooms
+
+
+def test_move_reports_hazards():
+    game = WumpusGameEngine(seed=3)
+    game.start_game()
+    game.player, game.wumpus, game.pits, game.bats = 0, 2, (9, 19), (13, 18)
+
+    game.move(2)
+    state = game.get_game_state()
+
+    assert state.current_room == 2
+    assert state.wumpus_smell == True
+    assert state.draft_felt == True
+    assert state.bat_nearby == False
+
+
+def test_bat_snatch_moves_player():
+    game = WumpusGameEngine(seed=5)
+    game.start_game()
+    game.player, game.wumpus, game.pits, game.bats = 0, 19, (18, 17), (1, 16)
+
+    game.move(2)
+    state = game.get_game_state()
+
+    assert "ZAP--SUPER BAT SNATCH! ELSEWHEREVILLE FOR YOU!" in state.last_output
+    assert state.current_room == game.player + 1
+
+
+def test_crooked_arrow_hits_wumpus():
+    game = WumpusGameEngine(seed=7)
+    game.start_game()
+    game.player, game.wumpus, game.pits, game.bats = 0, 8, (19, 18), (17, 16)
+
+    # 1 -> 2 -> 10 -> 9 (1-indexed rooms)
+    game.shoot([2, 10, 9])
+    state = game.get_game_state()
+
+    assert state.game_over == True
+    assert state.win_state == True
+    assert state.arrows_left == 4
+
+
+def test_arrow_path_doubling_back_is_rejected_like_the_binary():
+    game = WumpusGameEngine(seed=7)
+    game.start_game()
+
+    with pytest.raises(ValueError):
+        game.shoot([2, 10, 2])
+
+    assert game.get_game_state().arrows_left == 5
+    assert not game.get_game_state().game_over
+
+
+def test_missed_shot_wakes_wumpus_and_uses_arrow():
+    game = WumpusGameEngine(seed=11)
+    game.start_game()
+    game.player, game.wumpus, game.pits, game.bats = 0, 12, (19, 18), (17, 16)
+
+    game.shoot(2)
+    state = game.get_game_state()
+
+    assert "MISSED" in state.last_output
+    assert state.arrows_left == 4
+    assert game.wumpus in CAVE[12] + (12,)
+
+
+def test_running_out_of_arrows_loses():
+    game = WumpusGameEngine(seed=13)
+    game.start_game()
+    game.player, game.wumpus, game.pits, game.bats = 0, 12, (19, 18), (17, 16)
+    game.game_state.arrows_left = 1
+    game.rng.seed(0)
+
+    game.shoot(2)
+    state = game.get_game_state()
+
+    assert state.game_over == True
+    assert state.win_state == False
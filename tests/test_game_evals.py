@@ -0,0 +1,115 @@
+from datetime import datetime
+from statistics import NormalDist
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from game_db import GameMetrics, WumpusDB
+from game_evals import (
+    bootstrap_ci,
+    compare_strategies,
+    load_outcomes,
+    main,
+    obrien_fleming_alpha,
+    obrien_fleming_boundaries,
+    permutation_test,
+    sequential_decision,
+)
+
+
+def test_bootstrap_ci_covers_mean():
+    rng = np.random.default_rng(0)
+    values = rng.normal(10.0, 2.0, size=200)
+    interval = bootstrap_ci(values, n_resamples=2000, rng=rng)
+    assert interval.low < values.mean() < interval.high
+    assert interval.half_width == pytest.approx(1.96 * 2.0 / np.sqrt(200), rel=0.2)
+
+
+def test_permutation_test_separates_groups():
+    rng = np.random.default_rng(1)
+    a = rng.binomial(1, 0.5, 40).astype(float)
+    b = rng.binomial(1, 0.5, 40).astype(float)
+    assert permutation_test(a, b, rng=rng) > 0.01
+
+    a = np.ones(30)
+    b = np.zeros(30)
+    assert permutation_test(a, b, n_resamples=2000, rng=rng) < 0.001
+
+
+def test_alpha_spending_is_small_early():
+    assert obrien_fleming_alpha(10, 100) < 0.0001
+    assert obrien_fleming_alpha(100, 100) == pytest.approx(0.05)
+
+
+def test_look_boundaries_spend_alpha_per_look():
+    fractions = [0.2, 0.4, 0.6, 0.8, 1.0]
+    boundaries = obrien_fleming_boundaries(fractions)
+
+    # the first look spends everything spent so far, later ones only the increment
+    assert boundaries[0] == pytest.approx(obrien_fleming_alpha(20, 100), rel=1e-3)
+    spent = [obrien_fleming_alpha(f * 100, 100) for f in fractions]
+    assert all(p < alpha for p, alpha in zip(boundaries[1:], spent[1:]))
+    assert boundaries == sorted(boundaries)
+
+    # simulated z statistics under no difference cross some boundary alpha of the time
+    rng = np.random.default_rng(0)
+    steps = rng.standard_normal((400_000, 5)) * np.sqrt(0.2)
+    z = np.abs(np.cumsum(steps, axis=1)) / np.sqrt(fractions)
+    crossed = np.zeros(len(z), dtype=bool)
+    for look, boundary in enumerate(boundaries):
+        threshold = NormalDist().inv_cdf(1 - boundary / 2)
+        crossed |= z[:, look] >= threshold
+    assert crossed.mean() == pytest.approx(0.05, abs=0.002)
+
+
+def test_sequential_decision():
+    rng = np.random.default_rng(2)
+    a, b = np.ones(20), np.zeros(20)
+    assert not sequential_decision(a[:5], b[:5], rng=rng).stop
+
+    decision = sequential_decision(a, b, max_games=40, rng=rng)
+    assert decision.stop
+    assert decision.reason == "significant difference"
+
+    same = np.tile([0.0, 1.0], 50)
+    decision = sequential_decision(same, same, max_games=1000, margin=0.3, rng=rng)
+    assert decision.stop
+    assert decision.reason.startswith("equivalent")
+
+
+def make_metrics(strategy_id, won, turns):
+    return GameMetrics(
+        timestamp=datetime(2024, 11, 20, 12, 0, 0),
+        num_turns=turns,
+        rooms_explored=3,
+        death_by_pit=not won,
+        death_by_wumpus=False,
+        death_by_arrows=False,
+        game_won=won,
+        arrows_remaining=5,
+        action_generation_errors=0,
+        average_response_time=1.0,
+        total_response_time=float(turns),
+        strategy_id=strategy_id,
+    )
+
+
+def test_compare_strategies_from_db(capsys, tmp_path):
+    db_path = str(tmp_path / "metrics.db")
+    db = WumpusDB(db_path)
+    for i in range(30):
+        db.add_game_metrics(make_metrics("baseline", won=i % 5 == 0, turns=10))
+        db.add_game_metrics(make_metrics("new", won=i % 5 != 0, turns=12))
+
+    outcomes = load_outcomes(db, "win_rate")
+    assert outcomes["baseline"].mean() == pytest.approx(0.2)
+
+    comparisons = compare_strategies(outcomes, baseline="baseline", n_resamples=2000, seed=0)
+    assert [c.strategy for c in comparisons] == ["baseline", "new"]
+    assert comparisons[1].difference.estimate == pytest.approx(0.6)
+    assert comparisons[1].p_value < 0.01
+    db.close()
+
+    main(["--db", db_path, "--metric", "turns", "--resamples", "500", "--seed", "0"])
+    assert "new" in capsys.readouterr().out
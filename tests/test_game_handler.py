@@ -1,6 +1,10 @@
+import time
+from types import SimpleNamespace
+
+import pexpect
 import pytest
 
-from game_handler import WumpusGameInterface, WumpusGameState
+from game_handler import GamePrompt, WumpusGameInterface, WumpusGameState
 
 
 def test_update_game_state_with_bat_teleport():
@@ -71,6 +75,52 @@ def test_update_game_state_with_draft_felt():
     print(f"\nFinal game state: {game.game_state}")
 
 
+def test_update_game_state_with_arrow_hitting_player():
+    game = WumpusGameInterface()
+
+    # test input
+    game_outputs = [
+        "OUCH! ARROW GOT YOU!",
+        "HA HA HA - YOU LOSE!",
+    ]
+
+    # get the game state
+    for output in game_outputs:
+        game._update_game_state(output)
+
+    # verify the game state
+    assert game.game_state.game_over == True
+    assert game.game_state.win_state == False
+
+
+def test_process_game_output_returns_on_prompt():
+    game = WumpusGameInterface()
+    game.echo_output = False
+
+    # the process keeps running after printing the prompt, so a read that
+    # waited for EOF or a timeout would take several seconds
+    script = (
+        "printf 'ZAP--SUPER BAT SNATCH! ELSEWHEREVILLE FOR YOU!\\n\\n"
+        "BATS NEARBY!\\nYOU ARE IN ROOM 6\\nTUNNELS LEAD TO 5 7 15\\n\\n"
+        "SHOOT OR MOVE (S-M)? '; sleep 10"
+    )
+    game.game_process = pexpect.spawn("/bin/sh", ["-c", script])
+
+    start = time.perf_counter()
+    game._process_game_output(timeout=5)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 2
+    assert game.prompt == GamePrompt.ACTION
+    assert game.game_state.current_room == 6
+    assert game.game_state.adjacent_rooms == [5, 7, 15]
+    assert game.game_state.bat_nearby == True
+    assert game.timeouts == 0
+    assert len(game.command_waits) == 1
+
+    game.game_process.terminate(force=True)
+
+
 # def test_update_game_state_with_pit_fall():
 #     game = WumpusGameInterface()
 
@@ -104,3 +154,88 @@ def test_update_game_state_with_draft_felt():
 
 #     # print the final state for debugging
 #     print(f"\nFinal game state: {game.game_state}")
+
+
+def test_shoot_sends_crooked_arrow_path(monkeypatch):
+    game = WumpusGameInterface()
+    sent = []
+    game.game_process = SimpleNamespace(sendline=sent.append)
+    monkeypatch.setattr(game, "_process_game_output", lambda timeout=5: None)
+
+    game.shoot([2, 10, 9])
+
+    assert sent == ["S", "3", "2", "10", "9"]
+    assert game.game_state.arrows_left == 4
+
+
+def test_shoot_rejects_paths_the_game_would_ask_again(monkeypatch):
+    game = WumpusGameInterface()
+    sent = []
+    game.game_process = SimpleNamespace(sendline=sent.append)
+    monkeypatch.setattr(game, "_process_game_output", lambda timeout=5: None)
+
+    with pytest.raises(ValueError):
+        game.shoot([2, 1, 2])
+    with pytest.raises(ValueError):
+        game.shoot([2, 10, 9, 8, 7, 6])
+
+    assert sent == []
+    assert game.game_state.arrows_left == 5
+
+
+def test_move_outside_the_cave_explores_nothing(monkeypatch):
+    game = WumpusGameInterface()
+    sent = []
+    game.game_process = SimpleNamespace(sendline=sent.append)
+    monkeypatch.setattr(game, "_process_game_output", lambda timeout=5: None)
+
+    game.move(0)
+    game.move(25)
+    game.move(7)
+
+    assert sent == ["M", "0", "M", "25", "M", "7"]
+    assert game.game_state.explored_rooms == {7}
+    game.game_state.explored_rooms.add(21)
+    game.game_state.explored_rooms.discard(-1)
+    assert game.game_state.explored_mask == 1 << 6
+    assert WumpusGameState(explored_rooms={0, 3, 30}).explored_rooms == {3}
+
+
+def test_game_state_stores_rooms_compactly():
+    state = WumpusGameState(
+        current_room=6, adjacent_rooms=[5, 7, 15], explored_rooms={6, 5}, last_output=["A", "B "]
+    )
+
+    assert not hasattr(state, "__dict__")
+    assert state.adjacent == (5, 7, 15)
+    assert state.explored_mask == 0b110000
+    assert state.explored_rooms == {5, 6}
+    assert 6 in state.explored_rooms and 7 not in state.explored_rooms
+    state.explored_rooms.add(20)
+    assert sorted(state.explored_rooms) == [5, 6, 20]
+    assert len(state.explored_rooms) == 3
+    assert state.last_output == ["A", "B"]
+    assert WumpusGameState().last_output == ""
+    # logged on every move, without the raw output
+    assert "explored=[5, 6, 20]" in repr(state) and "'A'" not in repr(state)
+
+
+def test_game_state_snapshot_is_immutable_copy():
+    state = WumpusGameState(current_room=6, adjacent_rooms=[5, 7, 15], explored_rooms={6})
+    state.raw_output = "YOU ARE IN ROOM 6"
+
+    snapshot = state.snapshot()
+    state.current_room = 7
+    state.explored_rooms.add(7)
+
+    assert snapshot.room == 6
+    assert snapshot.explored_rooms == [6]
+    assert snapshot.output is None
+    assert snapshot.adjacent is state.adjacent
+    with pytest.raises(AttributeError):
+        snapshot.room = 1
+
+    restored = WumpusGameState.from_snapshot(state.snapshot(output=True))
+    assert restored == state
+    assert restored.summary() == state.summary()
+    assert restored.last_output == ["YOU ARE IN ROOM 6"]
@@ -0,0 +1,131 @@
+from game_engine import CAVE, WumpusGameEngine
+from game_handler import WumpusGameInterface
+from game_knowledge import CaveKnowledge, mask_rooms, room_mask
+
+
+def neighbours(room):
+    return [r + 1 for r in CAVE[room - 1]]
+
+
+def test_room_masks_round_trip():
+    assert mask_rooms(room_mask([20, 1, 7])) == [1, 7, 20]
+    assert mask_rooms(0) == []
+
+
+def test_no_percepts_make_neighbours_safe():
+    knowledge = CaveKnowledge()
+    knowledge.observe(1, neighbours(1), draft_felt=False, wumpus_smell=False, bat_nearby=False)
+
+    assert knowledge.is_visited(1)
+    assert mask_rooms(knowledge.safe_rooms()) == [1, 2, 5, 8]
+    assert knowledge.possible_pits() == 0
+
+
+def test_draft_marks_unresolved_neighbours_as_possible_pits():
+    knowledge = CaveKnowledge()
+    knowledge.observe(1, neighbours(1), draft_felt=False, wumpus_smell=False, bat_nearby=False)
+    knowledge.observe(2, neighbours(2), draft_felt=True, wumpus_smell=False, bat_nearby=False)
+
+    # room 1 is known pit free, so the pit is in 3 or 10
+    assert mask_rooms(knowledge.possible_pits()) == [3, 10]
+    assert knowledge.known_pits() == 0
+    assert not knowledge.is_safe(3)
+
+    knowledge.observe(11, neighbours(11), draft_felt=False, wumpus_smell=False, bat_nearby=False)
+    assert mask_rooms(knowledge.known_pits()) == [3]
+
+
+def test_wumpus_located_by_intersecting_smells():
+    knowledge = CaveKnowledge()
+    knowledge.observe(1, neighbours(1), draft_felt=False, wumpus_smell=True, bat_nearby=False)
+    assert knowledge.wumpus_room() is None
+    assert mask_rooms(knowledge.possible_wumpus()) == [2, 5, 8]
+
+    knowledge.observe(3, neighbours(3), draft_felt=False, wumpus_smell=True, bat_nearby=False)
+    assert knowledge.wumpus_room() == 2
+
+    knowledge.wumpus_moved()
+    assert knowledge.wumpus_room() is None
+
+
+def test_smell_hides_pit_sharing_the_wumpus_room():
+    engine = WumpusGameEngine(seed=0)
+    engine.start_game()
+    # the Wumpus wandered into the pit in room 2, next to the player in room 1
+    engine.player, engine.wumpus, engine.pits, engine.bats = 0, 1, (1, 19), (17, 18)
+    engine.knowledge = CaveKnowledge()
+    engine._describe_room([])
+    state = engine.game_state
+    assert state.wumpus_smell and not state.draft_felt
+
+    knowledge = engine.knowledge
+    assert not knowledge.no_pit & room_mask([2, 5, 8])
+    assert not knowledge.no_bats & room_mask([2, 5, 8])
+    assert not knowledge.is_safe(2)
+
+    # once the Wumpus is pinned to room 2, rooms 5 and 8 are cleared
+    knowledge.observe(5, neighbours(5), draft_felt=False, wumpus_smell=False, bat_nearby=False)
+    knowledge.observe(8, neighbours(8), draft_felt=False, wumpus_smell=False, bat_nearby=False)
+    knowledge.observe(1, neighbours(1), draft_felt=False, wumpus_smell=True, bat_nearby=False)
+    assert knowledge.wumpus_room() == 2
+    knowledge.wumpus_moved()
+    assert not knowledge.no_pit & room_mask([2])
+
+
+def test_handler_feeds_knowledge_from_output():
+    game = WumpusGameInterface()
+
+    for output in [
+        "",
+        "I FEEL A DRAFT",
+        "YOU ARE IN ROOM 12",
+        "TUNNELS LEAD TO 3 11 13",
+        "",
+        "SHOOT OR MOVE (S-M)",
+    ]:
+        game._update_game_state(output)
+
+    assert game.knowledge.tunnels[12] == (3, 11, 13)
+    assert mask_rooms(game.knowledge.possible_pits()) == [3, 11, 13]
+    assert mask_rooms(game.knowledge.safe_rooms()) == [12]
+
+
+def test_shortest_paths_follow_known_tunnels():
+    knowledge = CaveKnowledge()
+    for room in (1, 2, 10, 11):
+        knowledge.observe(room, neighbours(room), draft_felt=False, wumpus_smell=False, bat_nearby=False)
+
+    assert knowledge.distance(1, 11) == 3
+    assert knowledge.shortest_path(1, 11) == [2, 10, 11]
+    assert knowledge.arrow_path(1, 19) == [2, 10, 11, 19]
+    # room 7 is only known as a neighbour of room 8, which was never visited
+    assert knowledge.distance(1, 7) is None
+
+    knowledge.observe(8, neighbours(8), draft_felt=False, wumpus_smell=False, bat_nearby=False)
+    assert knowledge.shortest_path(1, 7) == [8, 7]
+
+
+def test_incremental_paths_match_full_cave():
+    knowledge = CaveKnowledge()
+    for room in (7, 3, 20, 1, 15, 11, 5, 18, 9, 13, 2, 17, 4, 6, 8, 10, 12, 14, 16, 19):
+        knowledge.observe(room, neighbours(room), draft_felt=False, wumpus_smell=False, bat_nearby=False)
+
+    for start in range(1, 21):
+        for end in range(1, 21):
+            path = knowledge.shortest_path(start, end)
+            assert len(path) == knowledge.distance(start, end) <= 5
+            if path:
+                assert knowledge.is_valid_arrow_path(start, path)
+
+
+def test_arrow_path_validation():
+    knowledge = CaveKnowledge()
+    for room in (1, 2, 10):
+        knowledge.observe(room, neighbours(room), draft_felt=False, wumpus_smell=False, bat_nearby=False)
+
+    assert knowledge.is_valid_arrow_path(1, [2, 10, 9])
+    # doubling back is not allowed
+    assert not knowledge.is_valid_arrow_path(1, [2, 1, 2])
+    # 2 and 9 are not connected
+    assert not knowledge.is_valid_arrow_path(1, [2, 9])
+    assert not knowledge.is_valid_arrow_path(1, [])
@@ -0,0 +1,64 @@
+import json
+from dataclasses import dataclass
+
+from game_handler import WumpusGameState
+from game_memory import ConversationMemory
+
+
+@dataclass
+class Action:
+    """Stand-in for GameAction with the fields the memory reads."""
+
+    action: str
+    room: int
+    reasoning: str = "Exploring the cave."
+
+    def model_dump_json(self, exclude_none=False):
+        return json.dumps({"action": self.action, "room": self.room, "reasoning": self.reasoning})
+
+
+def play(memory, rooms, smell_in=()):
+    for room, target in zip(rooms, rooms[1:]):
+        state = WumpusGameState(current_room=room, wumpus_smell=room in smell_in)
+        memory.add_turn(state, f"You are in room {room}", Action("move", target))
+
+
+def test_each_request_extends_the_previous_one():
+    memory = ConversationMemory("system", token_budget=10_000)
+    play(memory, [1, 2, 3])
+    first = memory.messages("You are in room 3")
+
+    play(memory, [3, 4])
+    second = memory.messages("You are in room 4")
+
+    assert second[: len(first)] == first
+    assert [m["role"] for m in second] == ["system"] + ["user", "assistant"] * 3 + ["user"]
+    assert json.loads(second[-2]["content"])["room"] == 4
+    assert memory.compactions == 0
+
+
+def test_old_turns_are_compacted_into_a_summary():
+    memory = ConversationMemory("system", token_budget=40, keep_turns=2)
+    play(memory, [1, 2, 3, 4, 5, 6, 7], smell_in={5})
+
+    messages = memory.messages("You are in room 7")
+    summary = messages[1]["content"]
+
+    assert memory.compactions > 0
+    assert memory.compacted_turns + len(memory.turns) == 6
+    assert memory.compacted_turns >= 4
+    assert "Rooms visited in order: 1 -> 2" in summary
+    assert messages[-1] == {"role": "user", "content": "You are in room 7"}
+    assert messages[-3]["content"] == "You are in room 6"
+
+
+def test_summary_lists_hazards_and_shots():
+    memory = ConversationMemory("system", token_budget=0, keep_turns=0)
+    state = WumpusGameState(current_room=4, wumpus_smell=True, draft_felt=True)
+    memory.add_turn(state, "You are in room 4", Action("shoot", 5))
+
+    summary = memory.messages("next")[1]["content"]
+
+    assert "room 4: draft, smell" in summary
+    assert "Arrows shot into rooms: 5" in summary
+    assert memory.turns == []
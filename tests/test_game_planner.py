@@ -0,0 +1,430 @@
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("instructor")
+pytest.importorskip("litellm")
+
+from game_engine import WumpusGameEngine
+from game_handler import WumpusGameInterface, WumpusGameState
+from game_planner import (
+    SYSTEM_PROMPT,
+    ActionGenerationError,
+    GameAction,
+    GamePlanner,
+    LLMCallStats,
+    action_schema,
+)
+
+
+def test_prompt_prefix_is_identical_across_turns():
+    planner = GamePlanner(WumpusGameInterface())
+
+    first = planner.build_messages(WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8]))
+    second = planner.build_messages(
+        WumpusGameState(
+            current_room=6,
+            adjacent_rooms=[5, 7, 15],
+            explored_rooms={5, 6},
+            wumpus_smell=True,
+            last_output=["I SMELL A WUMPUS!", "YOU ARE IN ROOM 6"],
+        )
+    )
+
+    assert first[0] == second[0] == {"role": "system", "content": SYSTEM_PROMPT}
+    assert "You are in room 6" in second[1]["content"]
+    assert "IMMEDIATE DANGER" in second[1]["content"]
+    assert "room 6" not in SYSTEM_PROMPT
+
+
+def test_call_stats_from_llama_cpp_timings():
+    completion = SimpleNamespace(
+        usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=40),
+        timings={"prompt_n": 120, "prompt_ms": 95.0},
+    )
+
+    stats = LLMCallStats.from_completion(completion, latency=1.5)
+
+    assert stats.prompt_tokens == 1000
+    assert stats.completion_tokens == 40
+    assert stats.cached_tokens == 880
+    assert stats.prompt_ms == 95.0
+
+
+def test_call_stats_from_openai_usage_details():
+    completion = SimpleNamespace(
+        usage=SimpleNamespace(
+            prompt_tokens=900,
+            completion_tokens=30,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=768),
+        )
+    )
+
+    stats = LLMCallStats.from_completion(completion, latency=0.5)
+
+    assert stats.cached_tokens == 768
+    assert stats.prompt_ms is None
+
+
+def test_fast_path_moves_to_safe_unvisited_room():
+    game = WumpusGameInterface()
+    game.knowledge.observe(1, [2, 5, 8], draft_felt=False, wumpus_smell=False, bat_nearby=False)
+    planner = GamePlanner(game, fast_path=True)
+
+    action = planner.get_next_action(WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8]))
+
+    assert (action.action, action.room) == ("move", 2)
+    assert planner.fast_path_actions == 1
+    assert planner.llm_calls == []
+
+
+def test_fast_path_shoots_located_wumpus():
+    game = WumpusGameInterface()
+    game.knowledge.observe(1, [2, 5, 8], draft_felt=False, wumpus_smell=True, bat_nearby=False)
+    game.knowledge.observe(3, [2, 4, 12], draft_felt=False, wumpus_smell=True, bat_nearby=False)
+    planner = GamePlanner(game, fast_path=True)
+
+    state = WumpusGameState(current_room=3, adjacent_rooms=[2, 4, 12], wumpus_smell=True)
+    action = planner.deterministic_action(state)
+
+    assert (action.action, action.room) == ("shoot", 2)
+
+
+class ScriptedClient:
+    """LLM stand-in moving to the lowest unexplored adjacent room, after a delay."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.prompts = []
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create_with_completion=self.create_with_completion)
+        )
+
+    def create_with_completion(self, response_model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        time.sleep(self.delay)
+        rooms = re.search(r"UNEXPLORED adjacent rooms: ([\d, ]*)", prompt).group(1)
+        adjacent = re.search(r"Adjacent rooms: \[([\d, ]*)\]", prompt).group(1)
+        room = int((rooms.strip() or adjacent).split(",")[0])
+        action = response_model(action="move", room=room, reasoning="Exploring the cave.")
+        return action, SimpleNamespace(usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5))
+
+
+def play(planner, turns):
+    actions = []
+    for _ in range(turns):
+        if planner.game_handler.get_game_state().game_over:
+            break
+        action, _ = planner.play_turn()
+        actions.append((action.action, action.room))
+    planner.close()
+    return actions
+
+
+def test_speculation_reuses_actions_for_predicted_rooms():
+    baseline = GamePlanner(WumpusGameEngine(seed=25), client=ScriptedClient())
+    baseline.game_handler.start_game()
+    expected = play(baseline, 8)
+
+    game = WumpusGameEngine(seed=25)
+    game.start_game()
+    planner = GamePlanner(game, client=ScriptedClient(delay=0.01), speculate=True)
+    actions = play(planner, 8)
+
+    assert actions == expected
+    assert planner.speculations > 0
+    assert 0 < planner.speculation_hits <= planner.speculations
+    assert planner.speculation_time_saved > 0
+    assert len(planner.llm_calls) == len(actions) + planner.wasted_speculations
+
+
+def test_missed_speculation_gives_up_its_semaphore_slot():
+    semaphore = threading.Semaphore(1)
+    client = ScriptedClient()
+    planner = GamePlanner(
+        WumpusGameInterface(), client=client, speculate=True, llm_semaphore=semaphore
+    )
+    state = WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8], explored_rooms={1})
+
+    # another planner holds the only slot while the speculation waits for it
+    semaphore.acquire()
+    planner._start_speculation(state, GameAction(action="move", room=2, reasoning="Exploring."))
+    assert planner._take_speculation(state) is None
+    semaphore.release()
+    planner.close()
+
+    assert client.prompts == []
+    assert planner.wasted_speculations == 0
+    assert semaphore.acquire(blocking=False)
+
+
+def test_missed_speculation_already_sent_is_counted():
+    client = ScriptedClient(delay=0.2)
+    planner = GamePlanner(WumpusGameInterface(), client=client, speculate=True)
+    state = WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8], explored_rooms={1})
+
+    planner._start_speculation(state, GameAction(action="move", room=2, reasoning="Exploring."))
+    time.sleep(0.05)
+    assert planner._take_speculation(state) is None
+    planner.close()
+
+    assert len(client.prompts) == 1
+    assert planner.wasted_speculations == 1
+    assert [call.prompt_tokens for call in planner.llm_calls] == [10]
+
+
+def test_predicted_state_uses_cave_layout():
+    game = WumpusGameInterface()
+    planner = GamePlanner(game)
+    state = WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8], explored_rooms={1})
+
+    predicted = planner.predict_move_state(state, 2)
+
+    assert predicted.current_room == 2
+    assert sorted(predicted.adjacent_rooms) == [1, 3, 10]
+    assert predicted.explored_rooms == {1, 2}
+    assert not (predicted.draft_felt or predicted.wumpus_smell or predicted.bat_nearby)
+
+
+class FailingClient:
+    """LLM stand-in whose responses never validate."""
+
+    def __init__(self):
+        self.requests = []
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create_with_completion=self.create_with_completion)
+        )
+
+    def create_with_completion(self, response_model, messages, max_retries, **kwargs):
+        self.requests.append(kwargs)
+        for attempt in max_retries:
+            with attempt:
+                raise ValueError("invalid JSON")
+
+
+def test_constrained_request_limits_rooms_to_adjacent():
+    client = ScriptedClient()
+    planner = GamePlanner(WumpusGameInterface(), client=client, constrained=True)
+    state = WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8])
+
+    action, source, _ = planner._decide(state)
+    schema = action_schema(state)
+
+    assert (action.room, source) == (2, "llm")
+    assert schema["properties"]["room"]["enum"] == [2, 5, 8]
+    assert set(schema["required"]) == {"action", "room", "reasoning"}
+
+
+def test_fallback_keeps_game_going_and_counts_retries():
+    game = WumpusGameInterface()
+    game.knowledge.observe(1, [2, 5, 8], draft_felt=True, wumpus_smell=False, bat_nearby=False)
+    game.knowledge.observe(2, [1, 3, 10], draft_felt=False, wumpus_smell=False, bat_nearby=False)
+    client = FailingClient()
+    planner = GamePlanner(game, client=client, constrained=True, fallback=True, max_retries=3)
+
+    action = planner.get_next_action(WumpusGameState(current_room=2, adjacent_rooms=[1, 3, 10]))
+
+    # 3 and 10 are proven safe and unvisited
+    assert (action.action, action.room) == ("move", 3)
+    assert planner.last_decision_source == "fallback"
+    assert planner.fallback_actions == 1
+    assert planner.validation_retries == 2
+    assert planner.action_generation_errors == 1
+    assert client.requests[0]["extra_body"]["response_format"]["type"] == "json_schema"
+
+
+def test_rejected_constrained_response_is_counted():
+    def create_with_completion(response_model, messages, **kwargs):
+        action = response_model(action="move", room=19, reasoning="Ignoring the schema.")
+        usage = SimpleNamespace(prompt_tokens=50, completion_tokens=7)
+        return action, SimpleNamespace(usage=usage)
+
+    completions = SimpleNamespace(create_with_completion=create_with_completion)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    planner = GamePlanner(WumpusGameInterface(), client=client, constrained=True, fallback=True)
+
+    action = planner.get_next_action(WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8]))
+
+    assert action.room in (2, 5, 8)
+    assert planner.last_decision_source == "fallback"
+    assert [(c.prompt_tokens, c.completion_tokens) for c in planner.llm_calls] == [(50, 7)]
+    assert planner.last_llm_call is planner.llm_calls[0]
+
+
+def test_generation_errors_raise_without_fallback():
+    planner = GamePlanner(WumpusGameInterface(), client=FailingClient())
+    with pytest.raises(ActionGenerationError):
+        planner.get_next_action(WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8]))
+
+
+def test_fast_path_shoots_wumpus_through_crooked_path():
+    game = WumpusGameInterface()
+    for room, adjacent in ((1, [2, 5, 8]), (2, [1, 3, 10])):
+        game.knowledge.observe(room, adjacent, draft_felt=False, wumpus_smell=False, bat_nearby=False)
+    game.knowledge.observe(10, [2, 9, 11], draft_felt=False, wumpus_smell=True, bat_nearby=False)
+    game.knowledge.observe(12, [3, 11, 13], draft_felt=False, wumpus_smell=True, bat_nearby=False)
+    planner = GamePlanner(game, fast_path=True)
+
+    # only room 11 is next to both smells, three tunnels away
+    state = WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8])
+    action = planner.deterministic_action(state)
+
+    assert action.action == "shoot"
+    assert action.arrow_path() == [2, 10, 11]
+    assert "room 11: [2, 10, 11]" in planner.build_messages(state)[1]["content"]
+
+
+def test_cached_action_is_not_reused_after_the_wumpus_moved():
+    from action_cache import ActionCache
+
+    game = WumpusGameInterface()
+    for room, adjacent in ((1, [2, 5, 8]), (2, [1, 3, 10])):
+        game.knowledge.observe(room, adjacent, draft_felt=False, wumpus_smell=False, bat_nearby=False)
+    game.knowledge.observe(10, [2, 9, 11], draft_felt=False, wumpus_smell=True, bat_nearby=False)
+    game.knowledge.observe(12, [3, 11, 13], draft_felt=False, wumpus_smell=True, bat_nearby=False)
+    client = ScriptedClient()
+    planner = GamePlanner(game, client=client, cache=ActionCache())
+    state = WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8])
+
+    assert planner._decide(state)[1] == "llm"
+    assert planner._decide(state)[1] == "cache"
+    # the arrow paths in the prompt are gone once the Wumpus woke up
+    game.knowledge.wumpus_moved()
+    assert planner._decide(state)[1] == "llm"
+    assert "Arrow paths" in client.prompts[0] and "Arrow paths" not in client.prompts[1]
+
+
+def test_checked_arrow_path_keeps_valid_prefix():
+    game = WumpusGameInterface()
+    game.knowledge.observe(1, [2, 5, 8], draft_felt=False, wumpus_smell=False, bat_nearby=False)
+    planner = GamePlanner(game)
+    state = WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8])
+
+    action = GameAction(action="shoot", room=2, path=[2, 1, 5], reasoning="Shooting around.")
+
+    assert planner.checked_arrow_path(state, action) == [2]
+    assert GameAction(action="shoot", room=5, path=[4], reasoning="Room 4 via 5.").arrow_path() == [5, 4]
+
+
+class StreamingClient:
+    """Streams an action JSON a few characters per chunk, the reasoning slowly."""
+
+    def __init__(self, content, delay=0.0):
+        self.content = content
+        self.delay = delay
+        self.chunks_sent = 0
+        self.closed = False
+
+    def __call__(self, **kwargs):
+        return self.stream()
+
+    def stream(self):
+        try:
+            for i in range(0, len(self.content), 4):
+                if '"reasoning"' in self.content[:i]:
+                    time.sleep(self.delay)
+                self.chunks_sent += 1
+                delta = SimpleNamespace(content=self.content[i : i + 4])
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+            yield SimpleNamespace(
+                choices=[], usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20)
+            )
+        finally:
+            self.closed = True
+
+
+def test_streamed_action_is_returned_before_the_reasoning():
+    content = '{"action": "move", "room": 5, "reasoning": "Room 5 is unexplored, moving there."}'
+    client = StreamingClient(content, delay=0.01)
+    planner = GamePlanner(WumpusGameInterface(), stream=True, stream_client=client)
+
+    action = planner.get_next_action(WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8]))
+
+    assert (action.action, action.room) == ("move", 5)
+    call = planner.last_llm_call
+    planner.finish_stream()
+    assert action.reasoning == "Room 5 is unexplored, moving there."
+    assert call.decision_latency < call.latency
+    assert (call.prompt_tokens, call.completion_tokens) == (100, 20)
+    assert client.closed
+
+
+def test_streams_are_spread_over_the_router_endpoints():
+    from llm_router import EndpointRouter
+
+    content = '{"action": "move", "room": 5, "reasoning": "Room 5 is unexplored, moving there."}'
+    streams = {url: StreamingClient(content) for url in ("http://a/v1", "http://b/v1")}
+    router = EndpointRouter(
+        list(streams), client_factory=lambda url: SimpleNamespace(stream=streams[url])
+    )
+    planner = GamePlanner(WumpusGameInterface(), client=router, stream=True)
+    state = WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8])
+
+    for _ in range(2):
+        planner.get_next_action(state)
+        planner.finish_stream()
+
+    assert [call.endpoint for call in planner.llm_calls] == list(streams)
+    assert all(stream.closed for stream in streams.values())
+    assert [(s.inflight, s.requests) for s in router.stats()] == [(0, 1), (0, 1)]
+
+
+def test_streamed_reasoning_is_cut_at_token_cap():
+    content = '{"action": "move", "room": 5, "reasoning": "Room 5 is unexplored, moving there."}'
+    client = StreamingClient(content)
+    planner = GamePlanner(
+        WumpusGameInterface(), stream=True, stream_client=client, stream_max_tokens=14
+    )
+
+    action = planner.get_next_action(WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8]))
+    planner.finish_stream()
+
+    assert client.chunks_sent == 14
+    assert action.reasoning == "Room 5 is un"
+    assert client.closed
+
+
+def test_streamed_room_must_be_adjacent():
+    client = StreamingClient('{"action": "move", "room": 7, "reasoning": "Going to 7."}')
+    planner = GamePlanner(WumpusGameInterface(), stream=True, stream_client=client, max_retries=2)
+
+    with pytest.raises(ActionGenerationError) as error:
+        planner.get_next_action(WumpusGameState(current_room=1, adjacent_rooms=[2, 5, 8]))
+    assert error.value.retries == 1
+
+
+def test_conversation_requests_extend_the_history():
+    game = WumpusGameEngine(seed=25)
+    game.start_game()
+    client = ScriptedClient()
+    requests = []
+    client.chat.completions.create_with_completion = lambda **kwargs: (
+        requests.append(kwargs["messages"]) or client.create_with_completion(**kwargs)
+    )
+    planner = GamePlanner(game, client=client, conversation=True, context_budget=100_000)
+
+    actions = play(planner, 4)
+
+    assert len(requests) == len(actions) > 1
+    for previous, current in zip(requests, requests[1:]):
+        assert current[: len(previous)] == previous
+        assert current[len(previous)]["role"] == "assistant"
+    assert requests[0][0] == {"role": "system", "content": SYSTEM_PROMPT}
+
+
+def test_conversation_bypasses_the_action_cache():
+    from action_cache import ActionCache
+
+    game = WumpusGameEngine(seed=25)
+    game.start_game()
+    cache = ActionCache()
+    planner = GamePlanner(game, client=ScriptedClient(), cache=cache, conversation=True)
+
+    actions = play(planner, 3)
+
+    assert len(planner.llm_calls) == len(actions)
+    assert cache.stats().lookups == 0 and cache.stats().memory_entries == 0
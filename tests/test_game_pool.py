@@ -0,0 +1,104 @@
+import textwrap
+import time
+
+from game_handler import GamePrompt, WumpusGameInterface
+from game_pool import GamePool
+
+# stands in for the wumpus binary: every game starts in room 1 and ends with
+# the first move falling into a pit, followed by the play again prompt
+FAKE_GAME = textwrap.dedent("""\
+    printf 'INSTRUCTIONS (Y-N)? '
+    read answer
+    while true; do
+        printf 'HUNT THE WUMPUS\\n\\nYOU ARE IN ROOM 1\\nTUNNELS LEAD TO 2 5 8\\n\\nSHOOT OR MOVE (S-M)? '
+        read action
+        printf 'WHERE TO? '
+        read room
+        printf 'YYYIIIIEEEE . . . FELL IN PIT\\nHA HA HA - YOU LOSE!\\nSAME SETUP (Y-N)? '
+        read again
+    done
+""")
+
+
+def fake_game_cmd(tmp_path):
+    script = tmp_path / "wumpus.sh"
+    script.write_text(FAKE_GAME)
+    return f"/bin/sh {script}"
+
+
+def play(pool):
+    game = WumpusGameInterface(pool=pool)
+    game.echo_output = False
+    game.start_game()
+    assert game.game_state.current_room == 1
+    assert game.game_state.adjacent_rooms == [2, 5, 8]
+    pid = game.game_process.pid
+
+    game.move(2)
+    assert game.game_state.game_over
+    assert game.prompt is GamePrompt.SAME_SETUP
+    assert game.game_process is None
+    return pid
+
+
+def test_finished_games_are_recycled(tmp_path):
+    with GamePool(size=1, game_cmd=fake_game_cmd(tmp_path)) as pool:
+        pids = [play(pool) for _ in range(3)]
+
+        assert len(set(pids)) == 1
+        stats = pool.stats()
+        assert stats.spawns == 1
+        assert stats.acquires == 3
+        # the third game's process is recycled in the background
+        assert stats.recycles >= 2
+
+
+def test_abandoned_and_worn_out_processes_are_replaced(tmp_path):
+    with GamePool(size=1, game_cmd=fake_game_cmd(tmp_path), max_games_per_process=2) as pool:
+        game = WumpusGameInterface(pool=pool)
+        game.echo_output = False
+        game.start_game()
+        first = game.game_process.pid
+        # exiting mid game leaves the process at the move prompt
+        game.exit_game()
+
+        second = play(pool)
+        third = play(pool)
+        fourth = play(pool)
+
+    assert first != second
+    assert second == third
+    assert third != fourth
+    assert pool.stats().spawns == 3
+
+
+def test_failed_spawn_is_raised(tmp_path):
+    pool = GamePool(size=1, game_cmd="/bin/sh -c 'exit 1'", timeout=1)
+    try:
+        game = WumpusGameInterface(pool=pool)
+        try:
+            game.start_game()
+        except Exception as e:
+            assert "instructions prompt" in str(e)
+        else:
+            raise AssertionError("start_game did not fail")
+        assert pool.stats().spawn_failures >= 1
+    finally:
+        pool.close()
+
+
+def test_hung_spawn_does_not_hold_up_the_pool(tmp_path):
+    # the first process started never reaches the instructions prompt
+    script = tmp_path / "hanging.sh"
+    script.write_text(f"mkdir {tmp_path / 'hung'} 2>/dev/null && sleep 30\n" + FAKE_GAME)
+
+    with GamePool(size=2, game_cmd=f"/bin/sh {script}", timeout=3) as pool:
+        start = time.perf_counter()
+        game = pool.acquire(timeout=2)
+        assert time.perf_counter() - start < 2
+        assert pool.stats().queued == 1
+
+        pool.release(game, reusable=False)
+        # the replacement is spawned beside the hung process
+        game = pool.acquire(timeout=2)
+        pool.release(game, reusable=False)
@@ -0,0 +1,81 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from llm_dispatcher import ActionDispatcher
+
+
+class EchoClient:
+    """Minimal stand-in for the instructor client that echoes the request."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create_with_completion=self.create))
+
+    def create(self, **kwargs):
+        with self.lock:
+            self.calls.append(kwargs)
+        time.sleep(self.delay)
+        if kwargs.get("fail"):
+            raise ValueError("invalid action")
+        return kwargs["messages"][-1]["content"], None
+
+
+def test_each_caller_gets_its_own_result():
+    client = EchoClient()
+    with ActionDispatcher(client, window_ms=50, max_batch_size=4) as dispatcher:
+        futures = [
+            dispatcher.submit(messages=[{"role": "user", "content": f"turn {i}"}])
+            for i in range(4)
+        ]
+        results = [f.result(timeout=5)[0] for f in futures]
+        assert results == [f"turn {i}" for i in range(4)]
+
+    stats = dispatcher.stats()
+    assert stats.submitted == 4
+    assert stats.completed == 4
+    assert stats.queue_depth == 0
+
+
+def test_queue_depth_counts_requests_waiting_for_a_worker():
+    client = EchoClient(delay=0.3)
+    with ActionDispatcher(client, window_ms=1, max_concurrency=1) as dispatcher:
+        futures = [
+            dispatcher.submit(messages=[{"role": "user", "content": str(i)}]) for i in range(3)
+        ]
+        time.sleep(0.1)
+        # one request is being sent, the rest of the batch waits for the worker
+        assert dispatcher.stats().queue_depth == 2
+        for future in futures:
+            future.result(timeout=5)
+
+    assert dispatcher.stats().queue_depth == 0
+
+
+def test_requests_within_window_are_batched():
+    client = EchoClient()
+    with ActionDispatcher(client, window_ms=200, max_batch_size=3) as dispatcher:
+        futures = [
+            dispatcher.submit(messages=[{"role": "user", "content": str(i)}]) for i in range(5)
+        ]
+        for future in futures:
+            future.result(timeout=5)
+
+    stats = dispatcher.stats()
+    assert stats.batches == 2
+    assert stats.batch_size_histogram == {2: 1, 3: 1}
+    assert stats.max_batch_size == 3
+    assert stats.mean_batch_size == pytest.approx(2.5)
+
+
+def test_errors_are_returned_to_the_caller():
+    client = EchoClient()
+    with ActionDispatcher(client, window_ms=1) as dispatcher:
+        with pytest.raises(ValueError):
+            dispatcher.create_with_completion(messages=[{"role": "user", "content": "x"}], fail=True)
+
+    assert dispatcher.stats().failed == 1
@@ -0,0 +1,144 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+from llm_router import EndpointRouter, endpoints_from_env
+
+
+class FakeEndpointClient:
+    """Stand-in for an endpoint's instructor client with a fixed delay."""
+
+    def __init__(self, url, delay=0.0, fail=False):
+        self.url = url
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.closed = False
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create_with_completion=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.url} is down")
+        return kwargs["messages"][-1]["content"], SimpleNamespace(_hidden_params={})
+
+    def stream(self, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError(f"{self.url} is down")
+        return iter(["chunk 1", "chunk 2"])
+
+    def close(self):
+        self.closed = True
+
+
+def make_router(clients, **kwargs):
+    return EndpointRouter(list(clients), client_factory=clients.__getitem__, **kwargs)
+
+
+def request(router, content="turn"):
+    return router.create_with_completion(messages=[{"role": "user", "content": content}])
+
+
+def test_requests_go_to_the_least_loaded_endpoint():
+    clients = {url: FakeEndpointClient(url, delay=0.1) for url in ("http://a/v1", "http://b/v1")}
+    router = make_router(clients)
+
+    threads = [threading.Thread(target=request, args=(router,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [client.calls for client in clients.values()] == [2, 2]
+    assert all(stats.inflight == 0 for stats in router.stats())
+
+
+def test_latency_policy_prefers_the_faster_endpoint():
+    clients = {
+        "http://slow/v1": FakeEndpointClient("http://slow/v1", delay=0.05),
+        "http://fast/v1": FakeEndpointClient("http://fast/v1"),
+    }
+    router = make_router(clients, policy="latency")
+
+    for _ in range(6):
+        request(router)
+
+    # each endpoint is measured once, then the fast one takes the rest
+    assert clients["http://slow/v1"].calls == 1
+    assert clients["http://fast/v1"].calls == 5
+
+
+def test_completion_is_tagged_with_the_serving_endpoint():
+    router = make_router({"http://a/v1": FakeEndpointClient("http://a/v1")})
+
+    action, completion = request(router, "move 2")
+
+    assert action == "move 2"
+    assert completion._hidden_params["api_base"] == "http://a/v1"
+
+
+def test_failing_endpoint_is_ejected_and_readmitted():
+    clients = {
+        "http://down/v1": FakeEndpointClient("http://down/v1", fail=True),
+        "http://up/v1": FakeEndpointClient("http://up/v1"),
+    }
+    router = make_router(clients, max_failures=2, eject_seconds=0.05)
+
+    for _ in range(4):
+        request(router)
+    # failed over twice, then ejected
+    assert clients["http://down/v1"].calls == 2
+    down = router.stats()[0]
+    assert (down.healthy, down.failures, down.ejections) == (False, 2, 1)
+
+    clients["http://down/v1"].fail = False
+    time.sleep(0.06)
+    for _ in range(2):
+        request(router)
+    down = router.stats()[0]
+    # the backoff starts over, the ejection count is kept for the batch summary
+    assert down.healthy and down.requests >= 1 and down.ejections == 1
+    assert router.endpoints[0].consecutive_ejections == 0
+
+
+def test_error_is_raised_when_every_endpoint_fails():
+    clients = {url: FakeEndpointClient(url, fail=True) for url in ("http://a/v1", "http://b/v1")}
+    router = make_router(clients)
+
+    with pytest.raises(ConnectionError):
+        request(router)
+    assert [client.calls for client in clients.values()] == [1, 1]
+
+    router.close()
+    assert all(client.closed for client in clients.values())
+
+
+def test_endpoints_from_env(monkeypatch):
+    monkeypatch.setenv("LLM_ENDPOINTS", "http://a/v1, http://b/v1,")
+    assert endpoints_from_env() == ["http://a/v1", "http://b/v1"]
+    assert endpoints_from_env("http://c/v1") == ["http://c/v1"]
+    with pytest.raises(ValueError):
+        EndpointRouter([])
+
+
+def test_streams_fail_over_and_hold_their_endpoint_until_read():
+    clients = {
+        "http://down/v1": FakeEndpointClient("http://down/v1", fail=True),
+        "http://up/v1": FakeEndpointClient("http://up/v1"),
+    }
+    router = make_router(clients)
+
+    stream = router.stream_completion(messages=[{"role": "user", "content": "turn"}])
+
+    assert stream.endpoint == "http://up/v1"
+    assert [stats.inflight for stats in router.stats()] == [0, 1]
+    assert list(stream) == ["chunk 1", "chunk 2"]
+    down, up = router.stats()
+    assert down.failures == 1
+    assert (up.inflight, up.requests) == (0, 1)
@@ -0,0 +1,124 @@
+from datetime import datetime
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from game_db import EndpointMetrics, GameMetrics, TurnEvent, WumpusDB
+from metrics_export import (
+    EXPORT_COLUMNS,
+    INT_NULL,
+    export_all,
+    export_table,
+    load_columns,
+    load_dataframe,
+)
+
+
+def add_game(db, uuid, won, strategy_id="s1", turns=2):
+    for turn in range(1, turns + 1):
+        db.record_turn(
+            TurnEvent(
+                game_uuid=uuid,
+                turn=turn,
+                timestamp=datetime(2024, 11, 20, 12, 0, turn),
+                action="move" if turn < turns else None,
+                room=turn + 1 if turn < turns else None,
+                state_before='{"room": %d}' % turn,
+                state_after='{"room": %d}' % (turn + 1),
+                decision_source="llm",
+                turn_time=0.5,
+                error=None if turn < turns else "invalid action",
+            )
+        )
+    db.add_game_metrics(
+        GameMetrics(
+            timestamp=datetime(2024, 11, 20, 12, 0, 0),
+            num_turns=turns,
+            rooms_explored=turns,
+            death_by_pit=not won,
+            death_by_wumpus=False,
+            death_by_arrows=False,
+            game_won=won,
+            arrows_remaining=5,
+            action_generation_errors=0,
+            average_response_time=1.5,
+            total_response_time=1.5 * turns,
+            strategy_id=strategy_id,
+            game_uuid=uuid,
+        ),
+        [EndpointMetrics(uuid, "http://localhost:8080/v1", turns, 1.5 * turns)],
+    )
+
+
+def test_export_appends_only_new_rows(tmp_path):
+    db = WumpusDB(str(tmp_path / "metrics.db"))
+    out = str(tmp_path / "columns")
+    add_game(db, "a" * 32, won=True)
+
+    assert export_all(db, out) == {"game_metrics": 1, "turn_events": 2, "endpoint_metrics": 1}
+    assert export_all(db, out) == {"game_metrics": 0, "turn_events": 0, "endpoint_metrics": 0}
+
+    add_game(db, "b" * 32, won=False, strategy_id=None, turns=3)
+    assert export_table(db, "game_metrics", out) == 1
+
+    columns = load_columns(out, "game_metrics")
+    assert isinstance(columns["num_turns"], np.memmap)
+    assert columns["num_turns"].tolist() == [2, 3]
+    assert columns["game_won"].dtype == np.bool_
+    assert columns["game_won"].tolist() == [True, False]
+    assert columns["timestamp"].dtype == np.dtype("datetime64[us]")
+    assert columns["strategy_id"].tolist() == [0, -1]
+    db.close()
+
+
+def test_load_dataframe_decodes_columns(tmp_path):
+    db = WumpusDB(str(tmp_path / "metrics.db"))
+    out = str(tmp_path / "columns")
+    add_game(db, "a" * 32, won=True)
+    export_all(db, out)
+    add_game(db, "b" * 32, won=False, turns=3)
+    export_all(db, out)
+
+    games = load_dataframe(out, "game_metrics")
+    assert games["strategy_id"].tolist() == ["s1", "s1"]
+    assert games["game_uuid"].tolist() == ["a" * 32, "b" * 32]
+
+    turns = load_dataframe(out, "turn_events", ["turn", "room", "state_after", "error"])
+    assert turns["turn"].tolist() == [1, 2, 1, 2, 3]
+    assert turns["room"].tolist() == [2, -1, 2, 3, -1]
+    assert turns["state_after"].tolist()[2:] == ['{"room": 2}', '{"room": 3}', '{"room": 4}']
+    assert turns["error"].tolist()[1] == "invalid action"
+    db.close()
+
+
+def test_columns_added_since_last_export_are_backfilled(tmp_path, monkeypatch):
+    db = WumpusDB(str(tmp_path / "metrics.db"))
+    out = str(tmp_path / "columns")
+    add_game(db, "a" * 32, won=True)
+
+    # export as before the model, setup_time, llm_calls and error columns existed
+    added = {
+        "game_metrics": ["model", "setup_time", "llm_calls", "timestamp"],
+        "turn_events": ["error"],
+    }
+    for table, names in added.items():
+        older = {k: v for k, v in EXPORT_COLUMNS[table].items() if k not in names}
+        monkeypatch.setitem(EXPORT_COLUMNS, table, older)
+    export_all(db, out)
+    monkeypatch.undo()
+
+    add_game(db, "b" * 32, won=False, turns=3)
+    assert export_all(db, out) == {"game_metrics": 1, "turn_events": 3, "endpoint_metrics": 1}
+
+    games = load_columns(out, "game_metrics")
+    assert games["num_turns"].tolist() == [2, 3]
+    assert games["model"].tolist() == [-1, -1]
+    assert np.isnan(games["setup_time"][0]) and games["setup_time"][1] == 0.0
+    assert games["llm_calls"].tolist() == [INT_NULL, 0]
+    assert np.isnat(games["timestamp"][0]) and not np.isnat(games["timestamp"][1])
+
+    turns = load_dataframe(out, "turn_events", ["turn", "error"])
+    assert turns["turn"].tolist() == [1, 2, 1, 2, 3]
+    assert turns["error"].tolist() == ["", "", "", "", "invalid action"]
+    db.close()
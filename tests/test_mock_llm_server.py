@@ -0,0 +1,131 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from mock_llm_server import LatencyModel, MockLLMServer, choose_action
+
+
+def post(url, body):
+    request = urllib.request.Request(
+        url + "/chat/completions",
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def state_prompt(explored="1", smell=False):
+    # the fields of game_planner.format_state_prompt the mock policy reads
+    return (
+        "Current game state:\n"
+        "- You are in room 1\n"
+        "- Adjacent rooms: [2, 5, 8]\n"
+        f"- Already explored rooms: {explored}\n"
+        f"  * Wumpus smell: {smell}\n"
+    )
+
+
+def test_choose_action_moves_to_unexplored_room():
+    action = choose_action(state_prompt(explored="1, 2"))
+    assert action["action"] == "move"
+    assert action["room"] == 5
+
+
+def test_choose_action_shoots_on_smell():
+    action = choose_action(state_prompt(smell=True))
+    assert action["action"] == "shoot"
+    assert action["room"] == 2
+
+
+def test_latency_model_parse():
+    assert LatencyModel.parse("uniform:0.1:0.2").params == [0.1, 0.2]
+    with pytest.raises(ValueError):
+        LatencyModel.parse("uniform:0.1")
+
+
+def test_chat_completion_returns_action_json():
+    with MockLLMServer(seed=1) as server:
+        body = {"model": "mock", "messages": [{"role": "user", "content": state_prompt()}]}
+        response = post(server.url, body)
+
+    content = json.loads(response["choices"][0]["message"]["content"])
+    assert content["action"] == "move"
+    assert content["room"] in [2, 5, 8]
+    assert response["usage"]["prompt_tokens"] > 0
+    assert server.stats.requests == 1
+
+
+def test_malformed_responses():
+    with MockLLMServer(malformed_rate=1.0) as server:
+        response = post(server.url, {"messages": [{"role": "user", "content": state_prompt()}]})
+
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(response["choices"][0]["message"]["content"])
+    assert server.stats.malformed == 1
+
+
+def test_constrained_requests_are_never_malformed():
+    with MockLLMServer(malformed_rate=1.0) as server:
+        body = {
+            "messages": [{"role": "user", "content": state_prompt()}],
+            "response_format": {"type": "json_schema", "json_schema": {"schema": {}}},
+        }
+        response = post(server.url, body)
+
+    assert json.loads(response["choices"][0]["message"]["content"])["action"] == "move"
+    assert server.stats.malformed == 0
+
+
+def test_concurrency_limit_rejects_when_busy():
+    server = MockLLMServer(
+        latency=LatencyModel("fixed", [0.2]), max_concurrency=1, reject_when_busy=True
+    )
+    statuses = []
+
+    def request():
+        try:
+            post(server.url, {"messages": [{"role": "user", "content": state_prompt()}]})
+            statuses.append(200)
+        except urllib.error.HTTPError as e:
+            statuses.append(e.code)
+
+    with server:
+        threads = [threading.Thread(target=request) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert sorted(statuses)[0] == 200
+    assert 429 in statuses
+    assert server.stats.max_in_flight == 1
+
+
+def test_streamed_completion_sends_content_in_chunks():
+    with MockLLMServer(seed=1) as server:
+        body = {
+            "messages": [{"role": "user", "content": state_prompt()}],
+            "stream": True,
+        }
+        request = urllib.request.Request(
+            server.url + "/chat/completions",
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=5) as response:
+            events = [
+                line[len(b"data: ") :].decode("utf-8")
+                for line in response.read().splitlines()
+                if line.startswith(b"data: ")
+            ]
+
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(event) for event in events[:-1]]
+    content = "".join(chunk["choices"][0]["delta"].get("content", "") for chunk in chunks)
+    assert json.loads(content)["action"] == "move"
+    assert len(chunks) > 3
+    assert chunks[-1]["usage"]["completion_tokens"] > 0
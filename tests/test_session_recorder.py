@@ -0,0 +1,198 @@
+import json
+import random
+import re
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("instructor")
+pytest.importorskip("litellm")
+
+from game_db import WumpusDB
+from game_engine import WumpusGameEngine
+from main import run_game
+from session_recorder import Transcript, replay_session
+
+
+class ExplorerClient:
+    """Scripted LLM client that explores unvisited rooms, otherwise moves at random."""
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create_with_completion=self.create_with_completion)
+        )
+
+    def create_with_completion(self, response_model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        rooms = [int(r) for r in re.search(r"Adjacent rooms: \[([\d, ]*)\]", prompt).group(1).split(",")]
+        unexplored = re.search(r"UNEXPLORED adjacent rooms: ([\d, ]*)", prompt).group(1)
+        room = int(unexplored.split(",")[0]) if unexplored.strip() else self.rng.choice(rooms)
+        action = response_model(action="move", room=room, reasoning="Exploring.")
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20)
+        return action, SimpleNamespace(usage=usage)
+
+
+def test_recorded_session_replays_with_same_decisions(tmp_path):
+    db = WumpusDB(":memory:")
+    metrics = run_game(
+        db, WumpusGameEngine(seed=3), client=ExplorerClient(), record_dir=str(tmp_path)
+    )
+
+    path = str(tmp_path / f"{metrics.game_uuid}.jsonl")
+    transcript = Transcript.load(path)
+    assert transcript.start["engine"] == "WumpusGameEngine"
+    assert transcript.commands[0] == "N"
+    assert len(transcript.actions) == metrics.num_turns
+    assert transcript.end["game_won"] == metrics.game_won
+
+    result = replay_session(path)
+
+    assert result.unchanged
+    assert result.turns == metrics.num_turns
+    assert result.game_won == metrics.game_won
+
+
+def test_replay_detects_changed_commands(tmp_path):
+    db = WumpusDB(":memory:")
+    metrics = run_game(
+        db, WumpusGameEngine(seed=3), client=ExplorerClient(), record_dir=str(tmp_path)
+    )
+    path = tmp_path / f"{metrics.game_uuid}.jsonl"
+
+    # rewrite the first recorded move target
+    lines = path.read_text().splitlines()
+    for i, line in enumerate(lines):
+        event = json.loads(line)
+        if event["t"] == "cmd" and event["v"] == "M":
+            target = json.loads(lines[i + 2])
+            target["v"] = "99"
+            lines[i + 2] = json.dumps(target)
+            break
+    path.write_text("\n".join(lines) + "\n")
+
+    assert replay_session(str(path)).divergences >= 1
+
+
+class PacingClient:
+    """Scripted LLM client that moves back and forth between two rooms forever."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create_with_completion=self.create_with_completion)
+        )
+
+    def create_with_completion(self, response_model, messages, **kwargs):
+        rooms = re.search(r"Adjacent rooms: \[([\d, ]*)\]", messages[-1]["content"]).group(1)
+        action = response_model(action="move", room=int(rooms.split(",")[0]), reasoning="Pacing back.")
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20)
+        return action, SimpleNamespace(usage=usage)
+
+
+def test_run_game_stops_at_turn_limit():
+    engine = WumpusGameEngine(seed=3)
+
+    metrics = run_game(WumpusDB(":memory:"), engine, client=PacingClient(), max_turns=25)
+
+    assert metrics.num_turns == 25
+    assert not metrics.game_won
+
+
+def test_replay_past_the_recording_diverges(tmp_path):
+    db = WumpusDB(":memory:")
+    metrics = run_game(
+        db, WumpusGameEngine(seed=3), client=ExplorerClient(), record_dir=str(tmp_path)
+    )
+    assert metrics.num_turns > 2
+    path = tmp_path / f"{metrics.game_uuid}.jsonl"
+
+    # keep only the first two recorded decisions
+    lines, actions = [], 0
+    for line in path.read_text().splitlines():
+        if json.loads(line)["t"] == "act":
+            actions += 1
+            if actions > 2:
+                continue
+        lines.append(line)
+    path.write_text("\n".join(lines) + "\n")
+
+    result = replay_session(str(path))
+
+    assert result.turns == 3
+    assert not result.unchanged
+    assert result.divergences >= 1
+
+
+def record_and_replay(tmp_path, **options):
+    db = WumpusDB(":memory:")
+    metrics = run_game(
+        db, WumpusGameEngine(seed=3), client=ExplorerClient(), record_dir=str(tmp_path), **options
+    )
+    path = str(tmp_path / f"{metrics.game_uuid}.jsonl")
+    replay_db = WumpusDB(":memory:")
+    result = replay_session(path, db=replay_db)
+
+    sources = []
+    for games in (db, replay_db):
+        games.flush_turn_events()
+        rows = games.conn.execute("SELECT decision_source FROM turn_events ORDER BY turn")
+        sources.append([row[0] for row in rows])
+    return Transcript.load(path), result, sources
+
+
+def test_replay_uses_the_recorded_policy(tmp_path):
+    np = pytest.importorskip("numpy")
+    from distilled_policy import FEATURES, DistilledPolicy
+
+    weights = np.zeros(len(FEATURES))
+    weights[FEATURES.index("move_unvisited")] = 5.0
+    weights[FEATURES.index("move_rank")] = -1.0
+    policy = DistilledPolicy(weights)
+
+    transcript, result, (recorded, replayed) = record_and_replay(
+        tmp_path, policy=policy, policy_threshold=0.6
+    )
+
+    assert transcript.start["policy_weights"] == weights.tolist()
+    assert "policy" in recorded and "llm" in recorded
+    assert result.unchanged
+    assert replayed == recorded
+
+
+def test_replay_serves_recorded_cache_hits_from_a_cache(tmp_path):
+    from action_cache import ActionCache
+
+    cache = ActionCache()
+    # a first game fills the cache for the recorded one
+    run_game(WumpusDB(":memory:"), WumpusGameEngine(seed=3), client=ExplorerClient(), cache=cache)
+
+    transcript, result, (recorded, replayed) = record_and_replay(tmp_path, cache=cache)
+
+    assert transcript.start["cache"] is True
+    assert "cache" in recorded
+    assert all("key" in event for event in transcript.actions if event["src"] == "cache")
+    assert result.unchanged
+    assert replayed == recorded
+
+
+def test_streamed_session_replays_streamed(tmp_path):
+    from game_planner import GameAction
+
+    explorer = ExplorerClient()
+    streams = []
+
+    def stream_client(messages, **kwargs):
+        streams.append(messages)
+        action, _ = explorer.create_with_completion(GameAction, messages)
+        text = action.model_dump_json()
+        for i in range(0, len(text), 5):
+            yield {"choices": [{"delta": {"content": text[i : i + 5]}}], "usage": None}
+
+    transcript, result, (recorded, replayed) = record_and_replay(
+        tmp_path, stream=True, stream_client=stream_client
+    )
+
+    assert transcript.start["stream"] is True
+    assert len(streams) == recorded.count("llm") > 0
+    assert result.unchanged
+    assert replayed == recorded
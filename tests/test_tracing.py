@@ -0,0 +1,89 @@
+import json
+import threading
+import tracemalloc
+
+import pytest
+
+import tracing
+from tracing import GameProfiler, disable_tracing, enable_tracing, span, traced
+
+
+@pytest.fixture
+def trace_path(tmp_path):
+    path = tmp_path / "trace.json"
+    enable_tracing(str(path))
+    yield path
+    disable_tracing()
+
+
+def load_events(path):
+    return [event for event in json.loads(path.read_text()) if event["ph"] == "X"]
+
+
+@traced("test.work")
+def work(n):
+    return sum(range(n))
+
+
+def test_spans_are_written_as_nested_chrome_trace_events(trace_path):
+    with span("game.run", game_uuid="abc") as game:
+        with span("planner.play_turn", room=1) as turn:
+            assert work(10) == 45
+            turn.set(action="move", target=5)
+        game.set(turns=1)
+    disable_tracing()
+
+    events = {event["name"]: event for event in load_events(trace_path)}
+    assert set(events) == {"game.run", "planner.play_turn", "test.work"}
+    run, turn, inner = events["game.run"], events["planner.play_turn"], events["test.work"]
+    assert run["args"] == {"game_uuid": "abc", "turns": 1, "span_id": run["args"]["span_id"]}
+    assert turn["args"]["parent_id"] == run["args"]["span_id"]
+    assert inner["args"]["parent_id"] == turn["args"]["span_id"]
+    assert turn["args"]["target"] == 5
+    assert run["ts"] <= turn["ts"] and turn["ts"] + turn["dur"] <= run["ts"] + run["dur"]
+    assert run["cat"] == "game"
+
+
+def test_spans_of_other_threads_have_their_own_parents(trace_path):
+    def background():
+        with span("background"):
+            pass
+
+    with span("outer"):
+        thread = threading.Thread(target=background)
+        thread.start()
+        thread.join()
+    disable_tracing()
+
+    events = {event["name"]: event for event in load_events(trace_path)}
+    assert "parent_id" not in events["background"]["args"]
+    assert events["background"]["tid"] != events["outer"]["tid"]
+
+
+def test_errors_are_recorded_on_the_span(trace_path):
+    with pytest.raises(ValueError):
+        with span("failing"):
+            raise ValueError("boom")
+    disable_tracing()
+
+    assert load_events(trace_path)[0]["args"]["error"] == "ValueError"
+
+
+def test_disabled_tracing_uses_a_shared_noop_span():
+    assert not tracing.tracing_enabled()
+    first, second = span("a", room=1), span("b")
+    assert first is second
+    with first as noop:
+        noop.set(tokens=3)
+    assert work(3) == 3
+
+
+def test_game_profiler_writes_cprofile_and_tracemalloc(tmp_path):
+    was_tracing = tracemalloc.is_tracing()
+    with GameProfiler(str(tmp_path), "game-1", cpu=True, memory=True):
+        work(1000)
+    if not was_tracing:
+        tracemalloc.stop()
+
+    assert (tmp_path / "game-1.prof").stat().st_size > 0
+    assert (tmp_path / "game-1.tracemalloc").stat().st_size > 0